@@ -0,0 +1,96 @@
+# bench_admission.py
+"""
+Reply latency during a traffic spike with and without admission control.
+
+Requests arrive as a Poisson process whose rate jumps from --base-rate to
+--spike-rate for the middle third of the run. A fake provider serves at most
+--capacity calls at once with log-normal latency. Without admission control
+every request queues for the provider; with it, unaddressed replies are shed
+while the provider is saturated and addressed ones are always served.
+
+usage: PYTHONPATH=. python benchmarks/bench_admission.py
+"""
+import argparse
+import random
+import threading
+import time
+
+from turing_game_bot.admission import AdmissionController
+
+parser = argparse.ArgumentParser(description='p99 reply latency under a spike, with and without admission control')
+parser.add_argument('--duration', type=float, default=60.0, help='simulated seconds')
+parser.add_argument('--base-rate', type=float, default=2.0, help='requests per second')
+parser.add_argument('--spike-rate', type=float, default=10.0, help='requests per second')
+parser.add_argument('--capacity', type=int, default=4, help='concurrent provider calls')
+parser.add_argument('--addressed', type=float, default=0.25, help='share of requests addressing the bot')
+parser.add_argument('-s', '--speedup', type=float, default=10.0)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+def arrivals(rng):
+    t, result = 0.0, []
+    while t < args.duration:
+        spike = args.duration / 3 <= t < 2 * args.duration / 3
+        t += rng.expovariate(args.spike_rate if spike else args.base_rate)
+        result.append((t, rng.random() < args.addressed))
+    return result
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+def run(controller, rng):
+    provider = threading.Semaphore(args.capacity)
+    latencies = {True: [], False: []}
+    shed = {True: 0, False: 0}
+    lock = threading.Lock()
+    latency_rng = random.Random(args.seed + 1)
+
+    def call_provider():
+        with lock:
+            latency = latency_rng.lognormvariate(0.0, 0.35)
+        with provider:
+            time.sleep(latency / args.speedup)
+
+    def request(addressed):
+        start = time.monotonic()
+        if controller is None:
+            call_provider()
+        elif controller.admit(addressed):
+            with controller.llm_slot():
+                call_provider()
+        else:
+            with lock:
+                shed[addressed] += 1
+            return
+        with lock:
+            latencies[addressed].append((time.monotonic() - start) * args.speedup)
+
+    threads = []
+    start = time.monotonic()
+    for offset, addressed in arrivals(rng):
+        delay = offset / args.speedup - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=request, args=(addressed,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return latencies, shed
+
+
+def report(name, latencies, shed):
+    for addressed in (True, False):
+        label = 'addressed' if addressed else 'other'
+        values = latencies[addressed]
+        print(f"{name:9s} {label:9s} served: {len(values):4d} shed: {shed[addressed]:4d} | "
+              f"p50 {percentile(values, 0.5):6.2f}s  p99 {percentile(values, 0.99):6.2f}s")
+
+
+if __name__ == '__main__':
+    report('fifo', *run(None, random.Random(args.seed)))
+    report('admission', *run(AdmissionController(max_in_flight=args.capacity), random.Random(args.seed)))
@@ -0,0 +1,103 @@
+# bench_async_delivery.py
+"""
+Connection hold time and reply latency of synchronous vs. asynchronous /response.
+
+sync : the caller's connection stays open until the reply (provider + typing delay).
+async: /response returns 202 with a job id; the reply arrives at a stub callback
+       receiver (benchmarks/callback_receiver.py).
+
+By default the bot side runs in-process: turing_game_bot.jobs.JobStore with a
+fake generator sleeping --latency seconds. With --bot-url the requests go to a
+running bot service instead (a game is started first); its BOT_CALLBACK_HOSTS
+must include --callback-host.
+
+usage: PYTHONPATH=. python benchmarks/bench_async_delivery.py [-n 200] [--bot-url http://localhost:8005]
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+
+from callback_receiver import CallbackReceiver
+from turing_game_bot.jobs import JobStore
+
+parser = argparse.ArgumentParser(description='Sync vs. async /response delivery')
+parser.add_argument('-n', '--requests', type=int, default=200)
+parser.add_argument('--latency', type=float, default=1.0, help='mean fake generation time in seconds (local mode)')
+parser.add_argument('--bot-url', type=str, default=None)
+parser.add_argument('--callback-host', type=str, default='127.0.0.1',
+                    help='address the bot service can reach the receiver at')
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+HISTORY = [{"role": "user", "content": "Red: hi everyone"}, {"role": "user", "content": "Green: are you the bot?"}]
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=180) as response:
+        return response.status, response.read()
+
+
+def fake_generate(rng):
+    delay = rng.expovariate(1 / args.latency)
+    time.sleep(delay)
+    return "lol no"
+
+
+def run_sync(index):
+    start = time.monotonic()
+    if args.bot_url:
+        post(f"{args.bot_url}/response", {"game_id": 900000 + index, "chat_history": HISTORY})
+    else:
+        fake_generate(random.Random(args.seed + index))
+    elapsed = time.monotonic() - start
+    return elapsed, elapsed
+
+
+def run_async(index, jobs, receiver):
+    start = time.monotonic()
+    if args.bot_url:
+        _, body = post(f"{args.bot_url}/response", {"game_id": 900000 + index, "chat_history": HISTORY,
+                                                    "callback_url": receiver.url})
+        job_id = json.loads(body)["job_id"]
+    else:
+        rng = random.Random(args.seed + index)
+        job_id = jobs.submit(900000 + index, lambda: fake_generate(rng), receiver.url)
+    held = time.monotonic() - start
+    receiver.wait_for([job_id])
+    return held, receiver.received[job_id][0] - start
+
+
+def measure(name, fn):
+    results = [None] * args.requests
+
+    def worker(i):
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    held = [r[0] * 1000 for r in results]
+    latency = [r[1] * 1000 for r in results]
+    print(f"{name:5s} connection held: mean {statistics.mean(held):8.1f} ms  max {max(held):8.1f} ms | "
+          f"reply latency: mean {statistics.mean(latency):8.1f} ms  max {max(latency):8.1f} ms")
+
+
+if __name__ == '__main__':
+    receiver = CallbackReceiver(args.callback_host).start()
+    jobs = JobStore(max_workers=args.requests, callback_hosts=[args.callback_host])
+    if args.bot_url:
+        for i in range(args.requests):
+            post(f"{args.bot_url}/start-game", {"game_id": 900000 + i, "botColor": "Blue",
+                                                "player1Color": "Red", "player2Color": "Green"})
+    print(f"{args.requests} concurrent requests, {'bot at ' + args.bot_url if args.bot_url else 'in-process fake bot'}")
+    measure('sync', run_sync)
+    measure('async', lambda i: run_async(i, jobs, receiver))
+    receiver.stop()
@@ -0,0 +1,104 @@
+# bench_coalescing.py
+"""
+Replay message timings and count LLM calls and prompt tokens with and without
+per-game request coalescing (turing_game_bot.coalescer.RequestCoalescer).
+
+Every human message triggers a /response request carrying the history so far.
+A fake provider sleeps for a log-normal latency, then the typing delay; time is
+compressed by --speedup so a 5 minute game replays in seconds.
+
+usage: PYTHONPATH=. python benchmarks/bench_coalescing.py --db ./turing_chat_server/database/turing.db
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.coalescer import RequestCoalescer
+
+parser = argparse.ArgumentParser(description='LLM calls per game with and without coalescing')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('-g', '--games', type=int, default=30)
+parser.add_argument('-s', '--speedup', type=float, default=20.0)
+parser.add_argument('-w', '--window', type=float, default=0.75, help='debounce window in (uncompressed) seconds')
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+SYSTEM_PROMPT_CHARS = 5000  # prompt files are ~5000 chars
+CHARS_PER_TOKEN = 4
+
+
+class FakeProvider:
+
+    def __init__(self, speedup: float, seed: int):
+        self.speedup = speedup
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.tokens = {}
+
+    def on_message(self, game_id, chat_history, cancel_event=None) -> str:
+        if cancel_event is not None and cancel_event.is_set():
+            return ""
+        prompt_chars = SYSTEM_PROMPT_CHARS + sum(len(m['content']) for m in chat_history)
+        with self.lock:
+            self.calls[game_id] = self.calls.get(game_id, 0) + 1
+            self.tokens[game_id] = self.tokens.get(game_id, 0) + prompt_chars // CHARS_PER_TOKEN
+            latency = self.rng.lognormvariate(0.2, 0.4)
+            typing_delay = self.rng.uniform(2.0, 6.0)
+        time.sleep(latency / self.speedup)
+        if cancel_event is not None:
+            if cancel_event.wait(typing_delay / self.speedup):
+                return ""
+        else:
+            time.sleep(typing_delay / self.speedup)
+        return "lol idk"
+
+
+def replay(games, use_coalescer: bool):
+    provider = FakeProvider(args.speedup, args.seed)
+    coalescer = RequestCoalescer(window=args.window / args.speedup)
+    requests = []
+    for game in games:
+        history = []
+        for offset, color, content, is_bot in game['messages']:
+            history.append({"role": "assistant" if is_bot else "user", "content": f"{color}: {content}"})
+            if not is_bot:
+                requests.append((offset, game['game_id'], list(history)))
+    requests.sort(key=lambda r: r[0])
+
+    def send(game_id, history):
+        if use_coalescer:
+            coalescer.submit(game_id, history, provider.on_message)
+        else:
+            provider.on_message(game_id, history)
+
+    threads = []
+    start = time.monotonic()
+    for offset, game_id, history in requests:
+        delay = offset / args.speedup - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=send, args=(game_id, history))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return len(requests), provider
+
+
+def report(name, games, num_requests, provider):
+    calls = [provider.calls.get(g['game_id'], 0) for g in games]
+    tokens = [provider.tokens.get(g['game_id'], 0) for g in games]
+    print(f"{name:10s} requests: {num_requests:5d} | LLM calls: {sum(calls):5d} "
+          f"(mean {statistics.mean(calls):5.1f}/game) | prompt tokens: {sum(tokens):9d} "
+          f"(mean {statistics.mean(tokens):8.0f}/game)")
+
+
+if __name__ == '__main__':
+    games = get_games(args.db, limit=args.games, seed=args.seed)
+    print(f"{len(games)} games, speedup x{args.speedup}, debounce window {args.window}s")
+    report('baseline', games, *replay(games, use_coalescer=False))
+    report('coalesced', games, *replay(games, use_coalescer=True))
@@ -0,0 +1,78 @@
+# bench_cold_start.py
+"""
+Cold start of the bot service.
+
+1. Import-time profile: runs `python -X importtime -c "import <module>"` in a
+   fresh interpreter and summarises the slowest top-level imports.
+2. With --serve: starts gunicorn with turing_chat_server/gunicorn.conf.py and
+   reports the time until /health first answers 200.
+
+usage: PYTHONPATH=. python benchmarks/bench_cold_start.py [--module turing_chat_server.bot] [--serve]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+parser = argparse.ArgumentParser(description='Import-time profile and time-to-healthy of the bot service')
+parser.add_argument('-m', '--module', type=str, default='turing_chat_server.bot')
+parser.add_argument('-n', '--top', type=int, default=15)
+parser.add_argument('--serve', action='store_true', help='also start gunicorn and time /health')
+parser.add_argument('--port', type=int, default=8015)
+parser.add_argument('--timeout', type=float, default=30.0)
+args = parser.parse_args()
+
+
+def import_profile(module: str):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ['.', os.getenv('PYTHONPATH')])))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else 'import failed')
+        return
+
+    # lines look like: "import time:       123 |       4567 |   package.module"
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # nested imports are indented by two spaces per level
+        if name.startswith('   '):
+            continue
+        top_level[name.strip()] = int(cumulative_us)
+
+    total_ms = sum(top_level.values()) / 1000
+    print(f"import {module}: {total_ms:.1f} ms cumulative imports, {wall * 1000:.1f} ms interpreter wall time")
+    for name, cumulative_us in sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+
+def time_to_healthy(port: int):
+    env = dict(os.environ, BOT_PORT=str(port), PYTHONPATH='.')
+    start = time.perf_counter()
+    process = subprocess.Popen(['gunicorn', '-c', 'turing_chat_server/gunicorn.conf.py', 'turing_chat_server.bot:app'],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < args.timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1) as response:
+                    if response.status == 200:
+                        print(f"/health ready after {(time.perf_counter() - start) * 1000:.0f} ms")
+                        return
+            except OSError:
+                time.sleep(0.02)
+        print(f"/health not ready after {args.timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    import_profile(args.module)
+    if args.serve:
+        time_to_healthy(args.port)
@@ -0,0 +1,97 @@
+# bench_local_llm.py
+"""
+Latency of the in-process llama.cpp backend (turing_game_bot.local_llm) on
+this machine's CPU, per thread count.
+
+For each --threads value the model is loaded and --games games are played
+through TuringBot.complete_openai with the casual system prompt, one reply per
+human message for the first --turns messages. Reports
+  - load: time to load the model,
+  - cold: the first reply of the first game, which evaluates the system prompt,
+  - first reply of the other games, resumed from the cached system prompt
+    (or evaluated again with --cache-mb 0),
+  - later replies, which reuse the game's own previous call,
+  - generation speed in completion tokens per second.
+Needs llama-cpp-python and a GGUF model, e.g. a 4-bit Llama 3.2 1B/3B Instruct.
+
+usage: PYTHONPATH=. python benchmarks/bench_local_llm.py --model models/Llama-3.2-1B-Instruct-Q4_K_M.gguf --threads 2,4,8
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot import local_llm
+from turing_game_bot.Turing_bot import TuringBot
+from turing_game_bot.local_llm import LocalChatClient
+from turing_game_bot.output_budget import OutputBudget
+
+parser = argparse.ArgumentParser(description='Latency of the in-process llama.cpp backend per thread count')
+parser.add_argument('--model', type=str, required=True, help='GGUF model file')
+parser.add_argument('--threads', type=str, default='4', help='comma separated thread counts')
+parser.add_argument('--prompt', type=str, default='./turing_chat_server/prompts/system_prompt_casual.txt')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('-g', '--games', type=int, default=5)
+parser.add_argument('--turns', type=int, default=4)
+parser.add_argument('--context', type=int, default=4096)
+parser.add_argument('--cache-mb', type=int, default=1024)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+class TokenCounter:
+    """Wraps the client to add up completion tokens."""
+
+    def __init__(self, client: LocalChatClient):
+        self.client = client
+        self.tokens = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        response = self.client.chat.completions.create(**kwargs)
+        self.tokens += response.usage.completion_tokens
+        return response
+
+
+def run(threads: int, games):
+    client = LocalChatClient(args.model, n_threads=threads, n_ctx=args.context, cache_bytes=args.cache_mb << 20)
+    started = time.perf_counter()
+    client.model()
+    load = time.perf_counter() - started
+    bot = TuringBot(model_name='local', prompt_file_path=args.prompt, output_budget=OutputBudget())
+    counter = bot._openai_client = TokenCounter(client)
+
+    first, later = [], []
+    generating = 0.0
+    for game in games:
+        game_id = game['game_id']
+        bot.start_game(game_id, game['bot_color'], game['player1_color'], game['player2_color'])
+        history = []
+        human = [(color, content) for _, color, content, is_bot in game['messages'] if not is_bot][:args.turns]
+        for turn, (color, content) in enumerate(human):
+            history.append({'role': 'user', 'content': f"{color}: {content}"})
+            started = time.perf_counter()
+            reply = bot.complete_openai(bot.games.get(game_id), history)
+            elapsed = time.perf_counter() - started
+            generating += elapsed
+            (first if turn == 0 else later).append(elapsed)
+            history.append({'role': 'assistant', 'content': f"{game['bot_color']}: {reply}"})
+        bot.end_game(game_id)
+    # drop this thread count's model before loading the next
+    local_llm._models.clear()
+    return load, first, later, counter.tokens / generating
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.WARNING)
+    games = get_games(args.db, limit=args.games, seed=args.seed)
+    print(f"{args.model}, {len(games)} games x {args.turns} replies, context {args.context}, cache {args.cache_mb} MB")
+    for threads in (int(t) for t in args.threads.split(',')):
+        load, first, later, speed = run(threads, games)
+        warm = first[1:]
+        print(f"{threads:3d} threads | load {load:5.1f}s | cold {first[0]:5.2f}s | "
+              f"first reply of a game {statistics.median(warm) if warm else float('nan'):5.2f}s | "
+              f"later replies p50 {statistics.median(later) if later else float('nan'):5.2f}s "
+              f"max {max(later, default=float('nan')):5.2f}s | {speed:5.1f} tokens/s")
@@ -0,0 +1,130 @@
+# bench_logging.py
+"""
+Compare the logging cost of one simulated game under the old and the new bot logging.
+
+old: f-strings, full history at INFO, synchronous RotatingFileHandler + console.
+new: lazy %-formatting, sampled history dumps, bounded queue -> listener thread that
+     formats and writes, JSON lines.
+
+The request thread's CPU time (time.thread_time) is what a /response call pays;
+process CPU time additionally includes the listener thread.
+
+usage: PYTHONPATH=. python benchmarks/bench_logging.py -t 50
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from turing_game_bot import bot_logging
+
+parser = argparse.ArgumentParser(description='Logging cost per bot message')
+parser.add_argument('-t', '--turns', type=int, default=50)
+parser.add_argument('-r', '--repeats', type=int, default=5)
+args = parser.parse_args()
+
+SYSTEM_PROMPT = "You are a casual player in a chat game. " * 120  # ~5000 chars, like the prompt files
+COLORS = ['Orange', 'Purple', 'Blue']
+
+
+def build_history(turns: int) -> list:
+    return [{"role": "user" if i % 3 else "assistant",
+             "content": f"{COLORS[i % 3]}: message number {i} saying something short"}
+            for i in range(turns)]
+
+
+def old_setup(log_dir: str):
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    file_handler = RotatingFileHandler(os.path.join(log_dir, 'old.log'), maxBytes=1024 * 1024, backupCount=5)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler(io.StringIO())  # stdout stand-in
+    console_handler.setFormatter(formatter)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.handlers = [file_handler, console_handler]
+
+
+def old_message(game_id, chat_store, history, answer):
+    logging.info('Inside the on_message_openai function')
+    logging.info(f"On Message for the game with the ID {game_id}")
+    message = chat_store + history
+    logging.info(f"Bot send the data to OpenAI: {message}")
+    logging.debug(f"### model name: gpt-4o")
+    logging.debug(f'2 - {answer}')
+    logging.debug('#######')
+    logging.debug(answer)
+    logging.debug('#######')
+    logging.info(f'Bot\'s response: {answer}')
+    logging.debug(f'answer type is: {type(answer)}')
+    logging.info(f'Applying typing delay of {1.234:.2f} seconds for message length {len(answer)}')
+
+
+def new_message(game_id, chat_store, history, answer):
+    logging.info('Inside the on_message_openai function')
+    logging.info("On Message for the game with the ID %s", game_id, extra={"game_id": game_id})
+    message = chat_store + history
+    if bot_logging.is_history_sampled(game_id):
+        logging.debug("Bot send the data to OpenAI: %s", message, extra={"game_id": game_id})
+    logging.debug("### model name: %s", "gpt-4o")
+    logging.info("Bot's response: %s", answer, extra={"game_id": game_id})
+    logging.info('Applying typing delay of %.2f seconds for message length %d', 1.234, len(answer))
+
+
+def run_game(on_message, turns: int, game_id: int):
+    chat_store = [{"role": "developer", "content": SYSTEM_PROMPT}]
+    history = build_history(turns)
+    answer = "lol no, I'm just bad at typing"
+    thread_cpu = 0.0
+    for turn in range(1, turns + 1):
+        start = time.thread_time()
+        on_message(game_id, chat_store, history[:turn], answer)
+        thread_cpu += time.thread_time() - start
+    return thread_cpu
+
+
+def measure(name, setup, on_message, teardown):
+    results = []
+    for game_id in range(args.repeats):
+        with tempfile.TemporaryDirectory() as log_dir:
+            setup(log_dir)
+            process_start = time.process_time()
+            thread_cpu = run_game(on_message, args.turns, game_id)
+            teardown()
+            process_cpu = time.process_time() - process_start
+            log_bytes = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir))
+        results.append((thread_cpu, process_cpu, log_bytes))
+    thread_cpu = sum(r[0] for r in results) / len(results)
+    process_cpu = sum(r[1] for r in results) / len(results)
+    log_bytes = sum(r[2] for r in results) / len(results)
+    print(f"{name:4s} request-thread CPU/message: {thread_cpu / args.turns * 1e6:9.1f} us | "
+          f"process CPU/message: {process_cpu / args.turns * 1e6:9.1f} us | "
+          f"log bytes/game: {log_bytes / 1024:9.1f} KiB")
+
+
+def new_setup(log_dir):
+    bot_logging.LOG_DIR = log_dir
+    bot_logging.setup_logging('new.log')
+    # keep stdout clean for the report
+    bot_logging._listener.handlers[0].setStream(io.StringIO())
+
+
+def teardown_old():
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    logging.getLogger().handlers = []
+
+
+def teardown_new():
+    bot_logging.stop_logging()
+    logging.getLogger().handlers = []
+
+
+if __name__ == '__main__':
+    print(f"{args.turns}-turn game, {args.repeats} repeats, "
+          f"history sample rate {bot_logging.HISTORY_SAMPLE_RATE}", file=sys.stderr)
+    measure('old', old_setup, old_message, teardown_old)
+    measure('new', new_setup, new_message, teardown_new)
@@ -0,0 +1,82 @@
+# bench_ollama_warmup.py
+"""
+First-reply latency of Llama_Bot after an idle period, with and without the
+Ollama warm-up (turing_game_bot/ollama_backend.py).
+
+Runs fake_llm_server.py in-process with a simulated model load. Each trial
+starts with the model unloaded, as after an idle period, starts a game, and
+asks for a reply when the first player message arrives --first-message
+seconds later:
+  before  the request Llama_Bot used to send: a plain /api/chat post,
+  after   OllamaBackend: the model is warmed when the game starts, and the
+          reply uses the same backend.
+
+usage: PYTHONPATH=. python benchmarks/bench_ollama_warmup.py --load-seconds 3 --first-message 2 --trials 5
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+import requests
+
+from fake_llm_server import FakeLLM, FakeLLMServer
+
+sys.path.append('./turing_game_bot')
+from ollama_backend import OllamaBackend  # noqa: E402
+
+parser = argparse.ArgumentParser(description='First-reply latency after an idle period with and without warm-up')
+parser.add_argument('--load-seconds', type=float, default=3.0, help='simulated Ollama model load time')
+parser.add_argument('--first-message', type=float, default=2.0, help='seconds from game start to the first message')
+parser.add_argument('--latency', type=str, default='fixed:0.3', help='time to first token of the fake server')
+parser.add_argument('--trials', type=int, default=5)
+parser.add_argument('--model', type=str, default='llama3.2')
+args = parser.parse_args()
+
+SYSTEM_PROMPT = "You are a player in a chat game. Answer casually in one short sentence."
+
+
+def messages(game_id: int) -> list:
+    return [{"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Blue: hi everyone, game {game_id} here"}]
+
+
+def unload(endpoint: str) -> None:
+    requests.post(endpoint, json={"model": args.model, "messages": [], "keep_alive": 0})
+
+
+def before(endpoint: str, game_id: int) -> float:
+    time.sleep(args.first_message)
+    started = time.perf_counter()
+    requests.post(endpoint, json={"model": args.model, "messages": messages(game_id), "stream": False})
+    return time.perf_counter() - started
+
+
+def after(endpoint: str, game_id: int) -> float:
+    backend = OllamaBackend(endpoint, args.model, SYSTEM_PROMPT, ping_interval=0)
+    backend.game_started(game_id)
+    time.sleep(args.first_message)
+    started = time.perf_counter()
+    backend.chat(messages(game_id))
+    elapsed = time.perf_counter() - started
+    backend.game_ended(game_id)
+    return elapsed
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.WARNING)
+    llm = FakeLLM(latency=args.latency, load_seconds=args.load_seconds)
+    server = FakeLLMServer(llm).start()
+    endpoint = f"{server.url}/api/chat"
+    print(f"model load {args.load_seconds:.1f}s, first message {args.first_message:.1f}s after the game starts, "
+          f"{args.trials} trials")
+    for name, play in (('before', before), ('after', after)):
+        latencies = []
+        loads = llm.stats['model_loads']
+        for trial in range(args.trials):
+            unload(endpoint)
+            latencies.append(play(endpoint, trial))
+        print(f"{name:7s} first reply p50 {statistics.median(latencies):5.2f}s  max {max(latencies):5.2f}s | "
+              f"model loads {llm.stats['model_loads'] - loads}")
+    server.shutdown()
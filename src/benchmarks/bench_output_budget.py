@@ -0,0 +1,121 @@
+# bench_output_budget.py
+"""
+Provider latency and tokens per reply with and without the output budget
+(turing_game_bot.output_budget).
+
+Games are replayed through TuringBot.on_message_openai, one provider call per
+human message, against an in-process stub that behaves like an unconstrained
+chat model: it writes a paragraph of 2-5 sentences (from a Markov chain over
+the games' messages), cut by the request's max_tokens and stop sequences as in
+fake_llm_server.py, and takes a log-normal time to first token plus its tokens
+at --tokens-per-second. Reports provider latency, completion tokens and the
+length of the reply the players see, and how many replies max_tokens stopped.
+Time is compressed by --speedup.
+
+usage: PYTHONPATH=. python benchmarks/bench_output_budget.py --games 30 --speedup 20
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fake_llm_server import MarkovReplies, apply_limits, count_tokens
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.Turing_bot import TuringBot
+from turing_game_bot.output_budget import OutputBudget, human_message_length
+
+parser = argparse.ArgumentParser(description='Provider latency and tokens per reply with and without the output budget')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('-g', '--games', type=int, default=30)
+parser.add_argument('-s', '--speedup', type=float, default=20.0)
+parser.add_argument('--latency', type=str, default='0.4,0.4', help='median,sigma of the log-normal time to first token (s)')
+parser.add_argument('--tokens-per-second', type=float, default=50.0)
+parser.add_argument('--headroom', type=float, default=1.5)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+class VerboseCompletions:
+
+    def __init__(self, markov: MarkovReplies, seed: int):
+        median, sigma = (float(x) for x in args.latency.split(','))
+        self.markov = markov
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.mu, self.sigma = math.log(median), sigma
+        self.latencies = []
+        self.tokens = []
+        self.cut = 0  # replies stopped by max_tokens
+
+    def create(self, messages, model, max_tokens=None, stop=None, **kwargs):
+        with self.lock:
+            first_token = self.rng.lognormvariate(self.mu, self.sigma)
+            sentences = self.rng.randint(2, 5)
+        text = ". ".join(self.markov(max_words=16) for _ in range(sentences))
+        text, finish_reason = apply_limits(text, max_tokens, stop)
+        tokens = count_tokens(text)
+        latency = first_token + tokens / args.tokens_per_second
+        time.sleep(latency / args.speedup)
+        with self.lock:
+            self.latencies.append(latency)
+            self.tokens.append(tokens)
+            self.cut += finish_reason == 'length'
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)],
+                               usage=SimpleNamespace(completion_tokens=tokens))
+
+
+def play(bot: TuringBot, game: dict, shown: list, lock: threading.Lock) -> None:
+    game_id = game['game_id']
+    bot.start_game(game_id, game['bot_color'], game['player1_color'], game['player2_color'])
+    history = []
+    for _, color, content, is_bot in game['messages']:
+        if is_bot:
+            continue
+        history.append({'role': 'user', 'content': f"{color}: {content}"})
+        reply = bot.on_message_openai(game_id, list(history))
+        if reply:
+            with lock:
+                shown.append(len(reply))
+            history.append({'role': 'assistant', 'content': f"{game['bot_color']}: {reply}"})
+    bot.end_game(game_id)
+
+
+def run(games, markov: MarkovReplies, budget):
+    bot = TuringBot(prompt_file_path=os.devnull, rng=random.Random(args.seed), output_budget=budget)
+    stub = VerboseCompletions(markov, args.seed)
+    bot._openai_client = SimpleNamespace(chat=SimpleNamespace(completions=stub))
+    bot.calculate_typing_delay = lambda length: 0.0
+    shown, lock = [], threading.Lock()
+    with ThreadPoolExecutor(max_workers=16) as players:
+        for game in games:
+            players.submit(play, bot, game, shown, lock)
+    return stub, shown
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.CRITICAL)
+    games = get_games(args.db, limit=args.games, seed=args.seed)
+    markov = MarkovReplies([content for game in games for _, _, content, _ in game['messages']], seed=args.seed)
+    human = [human_message_length([{'role': 'user', 'content': content}])
+             for game in games for _, _, content, is_bot in game['messages'] if not is_bot]
+    print(f"{len(games)} games, human messages {sum(human) / max(len(human), 1):.0f} characters on average, "
+          f"time to first token lognormal({args.latency}), {args.tokens_per_second:.0f} tokens/s, speedup x{args.speedup}")
+    for name, budget in (('unbounded', None), ('output budget', OutputBudget(headroom=args.headroom))):
+        stub, shown = run(games, markov, budget)
+        calls = len(stub.latencies)
+        print(f"{name:14s} calls: {calls:5d} | provider latency p50 {percentile(stub.latencies, 0.5):5.2f}s  "
+              f"p90 {percentile(stub.latencies, 0.9):5.2f}s  mean {sum(stub.latencies) / max(calls, 1):5.2f}s | "
+              f"completion tokens per reply {sum(stub.tokens) / max(calls, 1):5.1f} | "
+              f"shown reply {sum(shown) / max(len(shown), 1):5.1f} characters on average | "
+              f"stopped by max_tokens {stub.cut / max(calls, 1):5.1%}")
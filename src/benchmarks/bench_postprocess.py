@@ -0,0 +1,190 @@
+# bench_postprocess.py
+"""
+Microbenchmarks of the per-message Python work in TuringBot, with baselines.
+
+Cases run over a corpus of chat messages from turing.db (synthetic messages when
+the database is missing), with the bot's rng seeded so every run does the same
+work. Times are normalised by a fixed calibration workload measured in the same
+run, so a baseline recorded on one machine can be checked on another, and
+divided by the number of messages (history_concat_50: of concatenations), so
+a baseline recorded on another corpus compares too. Each case is measured in
+--repeats rounds, interleaved with the calibration, and the best time of each
+is kept. A case more than --threshold slower per message than its baseline is
+reported as a regression and the script exits with status 1.
+
+`postprocess_chain` and `cleanup_replace_chain` are the string-replace chain
+TuringBot used before the reply Pipeline (turing_game_bot/postprocess.py);
+`pipeline_chain` and `cleanup_pipeline` are the Pipeline doing the same work, and
+turning newlines into spaces and collapsing the spaces left by removed words.
+
+usage:
+  PYTHONPATH=. python benchmarks/bench_postprocess.py                 # compare to the baseline
+  PYTHONPATH=. python benchmarks/bench_postprocess.py --save-baseline # record a new baseline
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.Turing_bot import TuringBot
+from turing_game_bot.postprocess import Pipeline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'bench_postprocess.json')
+
+parser = argparse.ArgumentParser(description='TuringBot post-processing microbenchmarks')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--games', type=int, default=100, help='games read into the message corpus')
+parser.add_argument('--baseline', type=str, default=BASELINE_PATH)
+parser.add_argument('--save-baseline', action='store_true')
+parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timing round')
+parser.add_argument('--repeats', type=int, default=3, help='rounds over all cases; the best of each is kept')
+parser.add_argument('-k', type=str, default=None, help='only cases whose name contains this')
+args = parser.parse_args()
+
+
+def build_corpus(games, bot_color: str = 'Blue') -> list:
+    """Messages shaped like provider replies: some with the color prefix, a trailing newline or a blocked word."""
+    rng = random.Random(0)
+    corpus = []
+    for game in games:
+        for _, _, content, _ in game['messages']:
+            message = content
+            roll = rng.random()
+            if roll < 0.3:
+                message = f"{bot_color}: {message}"
+            elif roll < 0.4:
+                message = message + "\n"
+            elif roll < 0.45:
+                message = message + " wbu"
+            corpus.append(message)
+    return corpus
+
+
+def strip_color(message: str, bot_color: str = 'Blue') -> str:
+    # the cleanup in TuringBot.on_message_groq before clear_blocked_words
+    return message.strip().replace("\n", "").replace(bot_color + ":", "").replace(bot_color, "")
+
+
+def make_cases(bot: TuringBot, corpus: list, history: list, prompt: list) -> dict:
+    pipeline = bot.reply_pipeline('Blue')
+    cleanup = Pipeline(*pipeline.stages[:4])  # newlines, color, blocked words, spacing
+
+    def over_corpus(function):
+        def run():
+            bot.rng.seed(0)  # every call makes the same typo draws
+            for message in corpus:
+                function(message)
+        return run
+
+    return {
+        'strip_color': over_corpus(strip_color),
+        'clear_blocked_words': over_corpus(bot.clear_blocked_words),
+        'introduce_typo': over_corpus(bot.introduce_typo),
+        'typo._swap_adjacent_chars': over_corpus(bot._swap_adjacent_chars),
+        'typo._repeat_letter': over_corpus(lambda m: m and bot._repeat_letter(m)),
+        'typo._remove_space': over_corpus(bot._remove_space),
+        'typo._add_space': over_corpus(bot._add_space),
+        'typo._remove_letter': over_corpus(bot._remove_letter),
+        'typo._double_punctuation': over_corpus(bot._double_punctuation),
+        'typo._capitalize_random': over_corpus(bot._capitalize_random),
+        'calculate_typing_delay': over_corpus(lambda m: bot.calculate_typing_delay(len(m))),
+        'postprocess_chain': over_corpus(
+            lambda m: bot.calculate_typing_delay(len(bot.introduce_typo(bot.clear_blocked_words(strip_color(m)))))),
+        'cleanup_replace_chain': over_corpus(lambda m: bot.clear_blocked_words(strip_color(m))),
+        'cleanup_pipeline': over_corpus(cleanup),
+        'pipeline_chain': over_corpus(lambda m: bot.calculate_typing_delay(len(pipeline(m.strip())))),
+        'history_concat_50': lambda: [prompt + history[:50] for _ in range(len(corpus) // 50 or 1)],
+    }
+
+
+def calls_per_run(name: str, messages: int) -> int:
+    """Messages (or concatenations) one run of a case goes through."""
+    return messages // 50 or 1 if name.startswith('history') else messages
+
+
+def load_baseline(path: str) -> dict:
+    """Units per message of each case. Older baselines hold units per corpus and its message count."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        baseline = json.load(file)
+    if baseline.get('per') == 'message':
+        return baseline['cases']
+    return {name: units / calls_per_run(name, baseline['messages']) for name, units in baseline['cases'].items()}
+
+
+def calibration():
+    # fixed mix of the operations the cases use: slicing, find, replace, small loops
+    text = "hey are you the bot or not, i think Blue is wbu " * 4
+    for i in range(200):
+        text.replace("Blue", "").find("wbu", i % 20)
+        text[:i] + text[i + 1:]
+
+
+_numbers = {}  # calls per round of each function, found once and reused by every repeat
+
+
+def time_per_call(function, seed: int = 0) -> float:
+    """Best seconds per call over 5 rounds, together about --min-time."""
+    timer = timeit.Timer(function)
+    number = _numbers.get(function)
+    if number is None:
+        number, elapsed = 1, 0.0
+        while elapsed < args.min_time / 5:
+            number *= 2
+            elapsed = timer.timeit(number)
+        _numbers[function] = number
+    best = float('inf')
+    for _ in range(5):
+        random.seed(seed)
+        best = min(best, timer.timeit(number) / number)
+    return best
+
+
+if __name__ == '__main__':
+    games = get_games(args.db, limit=args.games)
+    corpus = build_corpus(games)
+    bot = TuringBot(prompt_file_path=os.devnull)
+    bot.rng = random.Random(0)
+    prompt = bot.game_prompt('Blue', 'Red', 'Green')
+    history = [{"role": "user", "content": f"Red: {m}"} for m in (corpus * 2)[:200]]
+    cases = make_cases(bot, corpus, history, prompt)
+    if args.k:
+        cases = {name: case for name, case in cases.items() if args.k in name}
+
+    messages = len(corpus)
+    unit = float('inf')
+    best = dict.fromkeys(cases, float('inf'))
+    for _ in range(args.repeats):
+        unit = min(unit, time_per_call(calibration))
+        for name, case in cases.items():
+            best[name] = min(best[name], time_per_call(case) / calls_per_run(name, messages))
+    results = {name: seconds / unit for name, seconds in best.items()}  # units per message
+
+    baseline = load_baseline(args.baseline)
+    print(f"{messages} messages, calibration unit {unit * 1e6:.1f} µs, best of {args.repeats} rounds")
+    print(f"{'case':28} | {'µs/msg':>8} | {'u/1k msg':>8} | {'baseline':>8} | change")
+    regressions = []
+    for name, units in results.items():
+        reference = baseline.get(name)
+        change = f"{units / reference - 1:+6.1%}" if reference else "   new"
+        if reference and units > reference * (1 + args.threshold):
+            regressions.append(name)
+            change += "  REGRESSION"
+        print(f"{name:28} | {best[name] * 1e6:8.2f} | {units * 1e3:8.3f} | {(reference or float('nan')) * 1e3:8.3f} | "
+              f"{change}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump({'per': 'message', 'messages': messages, 'cases': results}, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
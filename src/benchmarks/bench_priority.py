@@ -0,0 +1,92 @@
+# bench_priority.py
+"""
+Simulated contention for provider slots: FIFO vs. urgency-ordered scheduling.
+
+Requests of three kinds - accusations ("are you the bot?"), mentions of the
+bot's color, and idle chatter - arrive faster than --capacity slots can serve
+them for the middle of the run. With priorities, accusations and mentions wait
+less while aging keeps chatter from starving (see the max wait column).
+
+usage: PYTHONPATH=. python benchmarks/bench_priority.py
+"""
+import argparse
+import random
+import threading
+import time
+
+from turing_game_bot.admission import AdmissionController, urgency
+
+parser = argparse.ArgumentParser(description='Reply latency by request kind, FIFO vs. priority scheduling')
+parser.add_argument('--duration', type=float, default=90.0, help='simulated seconds')
+parser.add_argument('--rate', type=float, default=2.0, help='requests per second outside the burst')
+parser.add_argument('--burst-rate', type=float, default=4.0, help='requests per second in the burst')
+parser.add_argument('--capacity', type=int, default=3, help='concurrent provider calls')
+parser.add_argument('-s', '--speedup', type=float, default=10.0)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+BOT_COLOR = 'Blue'
+KINDS = {
+    'accusation': (0.1, "Red: are you the bot?"),
+    'mention': (0.15, "Red: Blue what do you think"),
+    'chatter': (0.75, "Red: i had pasta for lunch"),
+}
+
+
+def arrivals(rng):
+    t, result = 0.0, []
+    names = list(KINDS)
+    weights = [KINDS[name][0] for name in names]
+    while t < args.duration:
+        burst = args.duration / 4 <= t < 3 * args.duration / 4
+        t += rng.expovariate(args.burst_rate if burst else args.rate)
+        kind = rng.choices(names, weights)[0]
+        remaining = rng.uniform(0, 300)
+        result.append((t, kind, remaining))
+    return result
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+def run(use_priority: bool):
+    rng = random.Random(args.seed)
+    latency_rng = random.Random(args.seed + 1)
+    controller = AdmissionController(max_in_flight=args.capacity, clock=lambda: time.monotonic() * args.speedup)
+    waits = {kind: [] for kind in KINDS}
+    lock = threading.Lock()
+
+    def request(kind, remaining):
+        history = [{"role": "user", "content": KINDS[kind][1]}]
+        priority = urgency(history, BOT_COLOR, remaining) if use_priority else 0.0
+        with lock:
+            latency = latency_rng.lognormvariate(0.0, 0.35)
+        start = time.monotonic()
+        with controller.llm_slot(priority):
+            waited = (time.monotonic() - start) * args.speedup
+            time.sleep(latency / args.speedup)
+        with lock:
+            waits[kind].append(waited)
+
+    threads = []
+    start = time.monotonic()
+    for offset, kind, remaining in arrivals(rng):
+        delay = offset / args.speedup - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=request, args=(kind, remaining))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return waits
+
+
+if __name__ == '__main__':
+    print(f"queue wait (simulated seconds), capacity {args.capacity}")
+    for name, use_priority in (('fifo', False), ('priority', True)):
+        for kind, values in run(use_priority).items():
+            print(f"{name:8s} {kind:10s} n={len(values):4d} | p50 {percentile(values, 0.5):6.2f}s  "
+                  f"p99 {percentile(values, 0.99):6.2f}s  max {max(values):6.2f}s")
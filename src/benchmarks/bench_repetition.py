@@ -0,0 +1,103 @@
+# bench_repetition.py
+"""
+Cost and accuracy of the repetition detector (turing_game_bot.repetition).
+
+The detector is filled with --stored distinct replies, then measured on
+  - new, unrelated replies: time per check() and false positives,
+  - stored replies passed through the bot's typo and filler perturbations,
+    and with a few words changed: share detected as repetitions.
+Replies are generated from the synthetic games' phrases and a Zipf vocabulary,
+or taken from the bot messages of turing.db. Also reports the time to fill the
+detector and its memory (growth of the peak RSS).
+
+usage: PYTHONPATH=. python benchmarks/bench_repetition.py --stored 100000
+"""
+import argparse
+import os
+import random
+import time
+import resource
+
+from game_traces import DEFAULT_DB_PATH, SYNTHETIC_MESSAGES, load_games
+from turing_game_bot.Turing_bot import TuringBot
+from turing_game_bot.repetition import RepetitionDetector
+
+parser = argparse.ArgumentParser(description='Repetition detector latency, memory and accuracy')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--stored', type=int, default=100000)
+parser.add_argument('--probes', type=int, default=2000)
+parser.add_argument('--threshold', type=float, default=0.6)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+MIN_LENGTH = 20  # shorter replies are not checked
+
+
+def generated_replies(count: int, rng: random.Random) -> list:
+    words = [word for message in SYNTHETIC_MESSAGES for word in message.split()]
+    vocabulary = [f"w{i}" for i in range(20000)]
+    cumulative, total = [], 0.0
+    for rank in range(len(vocabulary)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    replies = set()
+    while len(replies) < count:
+        length = rng.randint(5, 16)
+        reply = rng.choices(words, k=length // 2) + rng.choices(vocabulary, cum_weights=cumulative,
+                                                                 k=length - length // 2)
+        rng.shuffle(reply)
+        reply = " ".join(reply)
+        if len(reply) >= MIN_LENGTH:
+            replies.add(reply)
+    return list(replies)
+
+
+def replace_words(reply: str, rng: random.Random, count: int = 2) -> str:
+    words = reply.split()
+    for _ in range(count):
+        words[rng.randrange(len(words))] = rng.choice(["tbh", "honestly", "lol", "really"])
+    return " ".join(words)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == '__main__':
+    rng = random.Random(args.seed)
+    try:
+        replies = list({content for game in load_games(args.db) for _, _, content, is_bot in game['messages']
+                        if is_bot and len(content) >= MIN_LENGTH})
+        rng.shuffle(replies)
+        source = 'turing.db bot messages'
+    except Exception:
+        replies = generated_replies(args.stored + args.probes, rng)
+        source = 'generated replies'
+    stored, fresh = replies[:args.stored], replies[args.stored:args.stored + args.probes]
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    detector = RepetitionDetector(capacity=args.stored, threshold=args.threshold, min_length=MIN_LENGTH)
+    started = time.perf_counter()
+    for reply in stored:
+        detector.add(reply)
+    fill_seconds = time.perf_counter() - started
+    memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) * 1024
+    print(f"{len(stored)} {source} stored in {fill_seconds:.1f}s, detector memory {memory / 1e6:.0f} MB")
+
+    latencies, false_positives = [], 0
+    for reply in fresh:
+        started = time.perf_counter()
+        false_positives += detector.check(reply) >= args.threshold
+        latencies.append((time.perf_counter() - started) * 1e6)
+    print(f"unrelated replies: check p50 {percentile(latencies, 0.5):.0f} µs p99 {percentile(latencies, 0.99):.0f} µs, "
+          f"false positives {false_positives / len(fresh):.2%}")
+
+    bot = TuringBot(prompt_file_path=os.devnull, rng=random.Random(args.seed))
+    probes = rng.sample(stored, min(args.probes, len(stored)))
+    for name, perturb in (('verbatim', lambda r: r),
+                          ('typo', bot.introduce_typo),
+                          ('filler word', bot.perturb),
+                          ('2 words replaced', lambda r: replace_words(r, rng))):
+        detected = sum(detector.check(perturb(reply)) >= args.threshold for reply in probes)
+        print(f"{name:>18}: {detected / len(probes):6.1%} detected")
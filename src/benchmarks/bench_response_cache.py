@@ -0,0 +1,70 @@
+# bench_response_cache.py
+"""
+Hit rate of the response cache (turing_game_bot.response_cache) on historical
+games, and the provider time it saves.
+
+Games are replayed one after the other; at every human message the cache is
+asked for a reply to the history so far, and on a miss a (colorless) provider
+reply is stored. Provider latency is drawn from a log-normal distribution, so
+"saved" is the expected provider time of the hits. Runs without network.
+
+usage: PYTHONPATH=. python benchmarks/bench_response_cache.py --db ./turing_chat_server/database/turing.db
+"""
+import argparse
+import random
+from collections import Counter
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.response_cache import ResponseCache, cache_key
+
+parser = argparse.ArgumentParser(description='Response cache hit rate on historical games')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('-g', '--games', type=int, default=None)
+parser.add_argument('--latency', type=str, default='0.6,0.4', help='mu,sigma of the log-normal provider latency (s)')
+parser.add_argument('--max-entries', type=int, default=5000)
+parser.add_argument('--variants', type=int, default=4)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+def replay(games, turns: int):
+    mu, sigma = (float(x) for x in args.latency.split(','))
+    rng = random.Random(args.seed)
+    cache = ResponseCache(max_entries=args.max_entries, max_variants=args.variants, turns=turns,
+                          clock=lambda: 0.0)
+    lookups = hits = opener_lookups = opener_hits = 0
+    saved = spent = 0.0
+    keys = Counter()
+    for game in games:
+        history, humans = [], 0
+        for _, color, content, is_bot in game['messages']:
+            history.append({"role": "assistant" if is_bot else "user", "content": f"{color}: {content}"})
+            if is_bot:
+                continue
+            humans += 1
+            latency = rng.lognormvariate(mu, sigma)
+            lookups += 1
+            opener_lookups += humans <= 3
+            if cache.get(game['game_id'], history, rng) is not None:
+                hits += 1
+                opener_hits += humans <= 3
+                saved += latency
+                keys[cache_key(history, turns)] += 1
+            else:
+                spent += latency
+                cache.put(game['game_id'], history, f"reply {lookups}")
+        cache.end_game(game['game_id'])
+    return lookups, hits, opener_lookups, opener_hits, saved, spent, keys, len(cache)
+
+
+if __name__ == '__main__':
+    games = get_games(args.db, limit=args.games, seed=args.seed)
+    print(f"{len(games)} games, provider latency lognormal({args.latency}), {args.variants} variants per entry")
+    for turns in (1, 2, 3):
+        lookups, hits, opener_lookups, opener_hits, saved, spent, keys, entries = replay(games, turns)
+        print(f"last {turns} turn(s): hit rate {hits / max(lookups, 1):6.1%} of {lookups} replies, "
+              f"openers (first 3 messages) {opener_hits / max(opener_lookups, 1):6.1%} | "
+              f"provider time saved {saved:7.0f}s of {saved + spent:7.0f}s "
+              f"({saved / max(hits, 1):.2f}s per hit) | {entries} entries")
+        for key, count in keys.most_common(3):
+            print(f"    {count:5d} hits  {key}")
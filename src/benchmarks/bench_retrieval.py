@@ -0,0 +1,84 @@
+# bench_retrieval.py
+"""
+Build time, file size and query latency of the phrase index
+(turing_game_bot.retrieval) of human messages.
+
+The corpus is the human messages of turing.db. Without the database, messages
+are generated from the synthetic games' phrases mixed with a Zipf-distributed
+vocabulary, at the sizes given by --sizes. Queries are other human messages,
+as TuringBot issues them (the latest human message of a game).
+
+usage: PYTHONPATH=. python benchmarks/bench_retrieval.py --db ./turing_chat_server/database/turing.db
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from game_traces import DEFAULT_DB_PATH, SYNTHETIC_MESSAGES
+from turing_game_bot.retrieval import PhraseIndex, build_index, human_messages
+
+parser = argparse.ArgumentParser(description='Phrase index build time, size and query latency')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--sizes', type=str, default='10000,100000', help='synthetic corpus sizes without the database')
+parser.add_argument('--queries', type=int, default=2000)
+parser.add_argument('-k', type=int, default=3)
+parser.add_argument('--max-postings', type=int, default=256)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+def synthetic_messages(count: int, rng: random.Random) -> list:
+    words = [word for message in SYNTHETIC_MESSAGES for word in message.split()]
+    vocabulary = [f"w{i}" for i in range(20000)]
+    cumulative, total = [], 0.0
+    for rank in range(len(vocabulary)):
+        total += 1 / (rank + 1)
+        cumulative.append(total)
+    messages = []
+    for _ in range(count):
+        length = rng.randint(2, 12)
+        common = rng.choices(words, k=length // 2)
+        rare = rng.choices(vocabulary, cum_weights=cumulative, k=length - length // 2)
+        message = common + rare
+        rng.shuffle(message)
+        messages.append(" ".join(message))
+    return list(dict.fromkeys(messages))  # distinct, as human_messages returns them
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def measure(name: str, messages: list, rng: random.Random):
+    path = os.path.join(tempfile.mkdtemp(), 'phrases.idx')
+    started = time.perf_counter()
+    stats = build_index(messages, path, args.max_postings)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    index = PhraseIndex(path)
+    open_ms = (time.perf_counter() - started) * 1000
+    queries = rng.choices(messages, k=args.queries)
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.query(query, args.k)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    print(f"{name:>18}: {stats['documents']:7d} messages, {stats['terms']:6d} terms | build {build_seconds:6.2f}s | "
+          f"{stats['bytes'] / 1e6:6.1f} MB | open {open_ms:5.1f} ms | query p50 {percentile(latencies, 0.5):6.0f} µs "
+          f"p99 {percentile(latencies, 0.99):6.0f} µs")
+    print(f"{'':>18}  e.g. {queries[0]!r} -> {index.query(queries[0], args.k)}")
+    index.close()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    rng = random.Random(args.seed)
+    try:
+        measure('turing.db', human_messages(args.db), rng)
+    except Exception as e:
+        print(f"Could not read messages from {args.db} ({e}); using synthetic messages.")
+        for size in (int(size) for size in args.sizes.split(',')):
+            measure(f"synthetic {size}", synthetic_messages(size, rng), rng)
@@ -0,0 +1,218 @@
+# bench_sharding.py
+"""
+Throughput of the consistent-hash router (turing_chat_server/router.py) in front
+of 1..8 bot processes, and games moved when a process joins.
+
+Then, with --churn-games games on 3 processes: one process is removed and a new
+one added (DELETE/POST /backends), one is killed, and the killed one is
+restarted on its port and must be probed back onto the ring. Every game gets a
+/response after each step; failed ones are reported.
+
+Each fake bot process serves --threads requests at a time, each taking
+--latency seconds (the provider call), like one gthread worker of bot.py, and
+rejects /response for games it never saw with 404 - so misrouted requests show
+up as errors.
+
+usage: PYTHONPATH=. python benchmarks/bench_sharding.py --processes 1,2,4,8
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from turing_chat_server.router import serve
+from turing_game_bot.hash_ring import HashRing
+
+parser = argparse.ArgumentParser(description='Router throughput from 1 to N bot processes')
+parser.add_argument('--processes', type=str, default='1,2,4,8')
+parser.add_argument('--threads', type=int, default=4, help='concurrent requests per bot process')
+parser.add_argument('--latency', type=float, default=0.25, help='seconds per fake LLM call')
+parser.add_argument('--games', type=int, default=2000)
+parser.add_argument('--clients', type=int, default=160)
+parser.add_argument('--duration', type=float, default=5.0)
+parser.add_argument('--churn-games', type=int, default=300)
+args = parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fake_bot(port: int, threads: int, latency: float):
+    games = set()
+    slots = threading.Semaphore(threads)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200 if self.path == '/health' else 404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            status, body = 200, b'ok'
+            if self.path == '/start-game':
+                games.add(data['game_id'])
+            elif data['game_id'] not in games:
+                status, body = 404, b'unknown game'
+            else:
+                with slots:
+                    time.sleep(latency)
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def start_bots(count: int, ports=None):
+    ports = ports or [free_port() for _ in range(count)]
+    processes = [multiprocessing.Process(target=fake_bot, args=(port, args.threads, args.latency), daemon=True)
+                 for port in ports]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)
+    return [f"http://127.0.0.1:{port}" for port in ports], processes
+
+
+def post(connection, path, payload, method='POST'):
+    body = json.dumps(payload).encode()
+    connection.request(method, path, body, {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def ring_nodes(connection) -> list:
+    connection.request('GET', '/backends')
+    return json.loads(connection.getresponse().read())
+
+
+def run(count: int):
+    backends, processes = start_bots(count)
+    port = free_port()
+    router = serve(port, backends, host='127.0.0.1')
+    threading.Thread(target=router.serve_forever, daemon=True).start()
+
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    for game_id in range(args.games):
+        post(connection, '/start-game', {'game_id': game_id, 'botColor': 'Blue',
+                                         'player1Color': 'Red', 'player2Color': 'Green'})
+    connection.close()
+
+    counts = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.monotonic() < deadline:
+            status = post(conn, '/response', {'game_id': rng.randrange(args.games),
+                                              'chat_history': [{'role': 'user', 'content': 'Red: hi'}]})
+            if time.monotonic() > deadline:
+                break  # finished while draining
+            with lock:
+                counts['ok' if status == 200 else 'errors'] += 1
+        conn.close()
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    router.shutdown()
+    router.server_close()
+    for process in processes:
+        process.terminate()
+    return counts['ok'] / args.duration, counts['errors'], hottest_share(backends)
+
+
+def hottest_share(backends) -> float:
+    """Load of the busiest process relative to a perfectly even split."""
+    ring = HashRing(backends)
+    owners = [ring.get(g) for g in range(args.games)]
+    return max(owners.count(b) for b in backends) * len(backends) / args.games
+
+
+def moved_on_join(count: int) -> float:
+    nodes = [f"bot{i}" for i in range(count)]
+    before = HashRing(nodes)
+    after = HashRing(nodes + [f"bot{count}"])
+    return sum(before.get(g) != after.get(g) for g in range(10000)) / 10000
+
+
+def churn():
+    backends, processes = start_bots(3)
+    port = free_port()
+    router = serve(port, backends, host='127.0.0.1', probe_interval=0.5)
+    threading.Thread(target=router.serve_forever, daemon=True).start()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for game_id in range(args.churn_games):
+        post(connection, '/start-game', {'game_id': game_id, 'botColor': 'Blue',
+                                         'player1Color': 'Red', 'player2Color': 'Green'})
+
+    def respond(game_id) -> int:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        status = post(conn, '/response', {'game_id': game_id, 'chat_history': []})
+        conn.close()
+        return status
+
+    def failed_responses() -> int:
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            return sum(status != 200 for status in clients.map(respond, range(args.churn_games)))
+
+    spare, spare_processes = start_bots(1)
+    post(connection, '/backends', {'url': backends[0]}, method='DELETE')
+    post(connection, '/backends', {'url': spare[0]})
+    print(f"{args.churn_games} games, one of 3 processes replaced: {failed_responses()} failed /response")
+
+    processes[1].terminate()
+    processes[1].join()
+    failed = failed_responses()
+    print(f"one process killed: {failed} failed /response, {len(ring_nodes(connection))} processes left on the ring")
+
+    port_of_killed = int(backends[1].rsplit(':', 1)[1])
+    started = time.monotonic()
+    _, restarted = start_bots(1, [port_of_killed])
+    while backends[1] not in ring_nodes(connection) and time.monotonic() - started < 10:
+        time.sleep(0.1)
+    back = backends[1] in ring_nodes(connection)
+    print(f"killed process restarted: {'back on the ring' if back else 'NOT back on the ring'} after "
+          f"{time.monotonic() - started:.1f}s, {failed_responses()} failed /response")
+    connection.close()
+    router.shutdown()
+    router.server_close()
+    for process in processes + spare_processes + restarted:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    counts = [int(c) for c in args.processes.split(',')]
+    capacity = args.threads / args.latency
+    print(f"per process capacity: {capacity:.0f} req/s ({args.threads} threads x {args.latency}s)")
+    base = None
+    for count in counts:
+        throughput, errors, hottest = run(count)
+        base = base or throughput / count
+        print(f"{count} process(es): {throughput:7.1f} req/s ({throughput / base:4.2f}x of one process) "
+              f"| hottest process {hottest:4.2f}x fair share | misrouted/errors: {errors} "
+              f"| games moved when one joins: {moved_on_join(count):5.1%}")
+    churn()
@@ -0,0 +1,165 @@
+# bench_speculation.py
+"""
+Share of replies served from speculation, and the /response latency it saves.
+
+Replays games through TuringBot.on_message_openai the way server.js drives the
+bot: a poll 2-4s after the start and then every 8-10s while the last message is
+not the bot's, replies appended unless they would be a second bot message in a
+row. With speculation on, every human message is preceded by a typing signal
+(TuringBot.speculate) sent when the player starts typing it, at 3-6 characters
+per second. The provider is a stub sleeping a log-normal latency; the typing
+delay is left out, as it is the same in both modes. Time is compressed by
+--speedup.
+
+usage: PYTHONPATH=. python benchmarks/bench_speculation.py --games 30 --speedup 20
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.Turing_bot import TuringBot
+from turing_game_bot.admission import AdmissionController
+
+parser = argparse.ArgumentParser(description='Replies served from speculation and /response latency')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('-g', '--games', type=int, default=30)
+parser.add_argument('-s', '--speedup', type=float, default=20.0)
+parser.add_argument('--latency', type=str, default='0.6,0.4', help='mu,sigma of the log-normal provider latency (s)')
+parser.add_argument('--duration', type=float, default=300.0)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+TICK = 0.25  # game seconds
+
+
+class StubCompletions:
+
+    def __init__(self, speedup: float, seed: int):
+        mu, sigma = (float(x) for x in args.latency.split(','))
+        self.speedup = speedup
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.mu, self.sigma = mu, sigma
+        self.calls = 0
+
+    def create(self, messages, model, **kwargs):
+        with self.lock:
+            self.calls += 1
+            latency = self.rng.lognormvariate(self.mu, self.sigma)
+        time.sleep(latency / self.speedup)
+        message = SimpleNamespace(content=f"haha not sure, {len(messages)} messages in and still no idea")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class Counters:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.speculative = 0
+        self.replies = 0
+
+
+def play(bot: TuringBot, game: dict, speculate: bool, counters: Counters, polls: ThreadPoolExecutor):
+    rng = random.Random(game['game_id'])
+    game_id, bot_color = game['game_id'], game['bot_color']
+    bot.start_game(game_id, bot_color, game['player1_color'], game['player2_color'])
+    human = [(offset, color, content) for offset, color, content, is_bot in game['messages']
+             if not is_bot and offset < args.duration]
+    # typing starts len/cps seconds before the message lands, but not before the previous one
+    typing, previous = [], 0.0
+    for offset, _, content in human:
+        typing.append(max(previous, offset - len(content) / rng.uniform(3.0, 6.0)))
+        previous = offset
+    history, lock = [], threading.Lock()
+    state = {'last_is_bot': False, 'signalled': -1}
+
+    def poll():
+        with lock:
+            snapshot = list(history)
+        started = time.monotonic()
+        reply = bot.on_message_openai(game_id, snapshot)
+        latency = (time.monotonic() - started) * args.speedup
+        with lock, counters.lock:
+            counters.latencies.append(latency)
+            if reply and (not state['last_is_bot'] or rng.random() > 0.9):
+                history.append({'role': 'assistant', 'content': f"{bot_color}: {reply}"})
+                state['last_is_bot'] = True
+                counters.replies += 1
+
+    started = time.monotonic()
+    next_poll = rng.randint(2, 4)
+    step = 0
+    while step * TICK < args.duration:
+        step += 1
+        now = step * TICK
+        time.sleep(max(0.0, started + now / args.speedup - time.monotonic()))
+        with lock:
+            while typing and typing[0] <= now:
+                typing.pop(0)
+                # server.js sends one signal per chat state
+                if speculate and state['signalled'] != len(history):
+                    state['signalled'] = len(history)
+                    bot.speculate(game_id, list(history))
+            while human and human[0][0] <= now:
+                _, color, content = human.pop(0)
+                history.append({'role': 'user', 'content': f"{color}: {content}"})
+                state['last_is_bot'] = False
+            due = now >= next_poll and history and not state['last_is_bot']
+        if now >= next_poll:
+            next_poll = now + rng.randint(8, 10)
+        if due:
+            polls.submit(poll)
+    bot.end_game(game_id)
+
+
+def run(games, speculate: bool):
+    bot = TuringBot(prompt_file_path=os.devnull, admission=AdmissionController(8),
+                    rng=random.Random(args.seed), speculation_workers=16 if speculate else 0)
+    stub = StubCompletions(args.speedup, args.seed)
+    bot._openai_client = SimpleNamespace(chat=SimpleNamespace(completions=stub))
+    bot.calculate_typing_delay = lambda length: 0.0
+    counters = Counters()
+    if speculate:
+        take = bot.speculator.take
+
+        def counting_take(*take_args):
+            answer = take(*take_args)
+            if answer is not None:
+                with counters.lock:
+                    counters.speculative += 1
+            return answer
+        bot.speculator.take = counting_take
+
+    polls = ThreadPoolExecutor(max_workers=64)
+    players = [threading.Thread(target=play, args=(bot, game, speculate, counters, polls)) for game in games]
+    for player in players:
+        player.start()
+    for player in players:
+        player.join()
+    polls.shutdown(wait=True)
+    return counters, stub.calls
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.CRITICAL)  # polls racing the end of a game log errors
+    games = get_games(args.db, limit=args.games, seed=args.seed)
+    print(f"{len(games)} games, speedup x{args.speedup}, provider latency lognormal({args.latency})")
+    for name, speculate in (('baseline', False), ('speculative', True)):
+        counters, calls = run(games, speculate)
+        polls = len(counters.latencies)
+        print(f"{name:12s} polls: {polls:5d} | provider calls: {calls:5d} | "
+              f"served from speculation: {counters.speculative / max(polls, 1):5.1%} | /response latency "
+              f"p50 {percentile(counters.latencies, 0.5):5.2f}s  p90 {percentile(counters.latencies, 0.9):5.2f}s  "
+              f"mean {sum(counters.latencies) / max(polls, 1):5.2f}s")
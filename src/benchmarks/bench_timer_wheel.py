@@ -0,0 +1,96 @@
+# bench_timer_wheel.py
+"""
+Silence timers for many concurrent games: the hashed timer wheel used by MyBot
+against one asyncio task per game that is cancelled and recreated on every message.
+
+Reports resets per second and the memory held per armed timer (tracemalloc),
+and checks that wheel timers fire on time.
+
+usage: PYTHONPATH=. python benchmarks/bench_timer_wheel.py -g 10000 -r 200000
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from turing_game_bot.timer_wheel import TimerWheel
+
+parser = argparse.ArgumentParser(description='Timer wheel vs. asyncio task per game')
+parser.add_argument('-g', '--games', type=int, default=10000)
+parser.add_argument('-r', '--resets', type=int, default=200000)
+parser.add_argument('-t', '--threshold', type=float, default=60.0, help='silence threshold in seconds')
+args = parser.parse_args()
+
+
+async def bench_wheel(rng):
+    wheel = TimerWheel(lambda key: None, tick=1.0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for game_id in range(args.games):
+        wheel.arm(game_id, args.threshold)
+    per_timer = (tracemalloc.get_traced_memory()[0] - before) / args.games
+    tracemalloc.stop()
+
+    keys = [rng.randrange(args.games) for _ in range(args.resets)]
+    start = time.perf_counter()
+    for key in keys:
+        wheel.arm(key, args.threshold)
+    elapsed = time.perf_counter() - start
+    return args.resets / elapsed, per_timer
+
+
+async def bench_tasks(rng):
+    async def silence_handler(game_id):
+        await asyncio.sleep(args.threshold)
+
+    tasks = {}
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for game_id in range(args.games):
+        tasks[game_id] = asyncio.create_task(silence_handler(game_id))
+    await asyncio.sleep(0)  # let the tasks reach their sleep
+    per_timer = (tracemalloc.get_traced_memory()[0] - before) / args.games
+    tracemalloc.stop()
+
+    keys = [rng.randrange(args.games) for _ in range(args.resets)]
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        tasks[key].cancel()
+        tasks[key] = asyncio.create_task(silence_handler(key))
+        if i % 1000 == 0:
+            await asyncio.sleep(0)  # let cancellations run, as a live event loop would
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    for task in tasks.values():
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return args.resets / elapsed, per_timer
+
+
+async def check_firing():
+    fired = {}
+    start = time.monotonic()
+    wheel = TimerWheel(lambda key: fired.setdefault(key, time.monotonic() - start), tick=0.01, num_slots=64)
+    wheel.start()
+    delays = {key: 0.05 + 0.01 * key for key in range(100)}  # up to two wheel rotations
+    for key, delay in delays.items():
+        wheel.arm(key, delay)
+    await asyncio.sleep(1.3)
+    wheel.stop()
+    late = max(fired[key] - delay for key, delay in delays.items())
+    return len(fired), late
+
+
+async def main():
+    rng = random.Random(0)
+    rate, memory = await bench_wheel(rng)
+    print(f"timer wheel : {rate:12,.0f} resets/s | {memory:7.1f} bytes per armed timer")
+    rate, memory = await bench_tasks(rng)
+    print(f"asyncio task: {rate:12,.0f} resets/s | {memory:7.1f} bytes per armed timer")
+    fired, late = await check_firing()
+    print(f"wheel firing: {fired}/100 timers fired, at most {late * 1000:.1f} ms after their deadline")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+# bench_wire_format.py
+"""
+Bytes on the wire and encode/decode cost of a /response body as JSON vs. msgpack,
+for chat histories of 10, 50 and 200 messages taken from recorded games.
+
+Decoding goes through turing_game_bot.wire.decode_payload, the path bot.py uses,
+including the chat_history schema check.
+
+usage: PYTHONPATH=. python benchmarks/bench_wire_format.py [--db path/to/turing.db]
+"""
+import argparse
+import timeit
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.wire import JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, decode_payload, encode_payload
+
+parser = argparse.ArgumentParser(description='JSON vs. msgpack /response bodies')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--sizes', type=str, default='10,50,200')
+parser.add_argument('--repeat', type=int, default=2000)
+args = parser.parse_args()
+
+
+def history_of(size: int, games) -> list:
+    """The first `size` messages of the recorded games, in the server's chat_store format."""
+    history = []
+    for game in games:
+        for _, color, content, is_bot in game['messages']:
+            history.append({"role": "assistant" if is_bot else "user", "content": f"{color}: {content}"})
+            if len(history) == size:
+                return history
+    return history
+
+
+def per_call_us(statement) -> float:
+    return min(timeit.repeat(statement, number=args.repeat, repeat=5)) / args.repeat * 1e6
+
+
+if __name__ == '__main__':
+    games = get_games(args.db, limit=200)
+    print(f"{'messages':>8} | {'format':7} | {'bytes':>6} | {'encode µs':>9} | {'decode µs':>9}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        payload = {"game_id": 1234, "chat_history": history_of(size, games)}
+        for name, content_type in (("json", JSON_CONTENT_TYPE), ("msgpack", MSGPACK_CONTENT_TYPE)):
+            body = encode_payload(payload, content_type)
+            assert decode_payload(content_type, body) == payload
+            encode = per_call_us(lambda: encode_payload(payload, content_type))
+            decode = per_call_us(lambda: decode_payload(content_type, body))
+            print(f"{size:8d} | {name:7} | {len(body):6d} | {encode:9.1f} | {decode:9.1f}")
@@ -0,0 +1,71 @@
+# callback_receiver.py
+"""
+Stub receiver for async /response callbacks: records every POSTed reply with
+its arrival time. Used by bench_async_delivery.py, or on its own to watch a
+running bot service deliver replies.
+
+usage: python benchmarks/callback_receiver.py --port 9000
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CallbackReceiver:
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, verbose: bool = False):
+        self.verbose = verbose
+        self.received = {}  # job_id -> (arrival time, payload)
+        self.condition = threading.Condition()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with receiver.condition:
+                    receiver.received[payload.get('job_id')] = (time.monotonic(), payload)
+                    receiver.condition.notify_all()
+                if receiver.verbose:
+                    print(f"callback: {payload}")
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/callback"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> 'CallbackReceiver':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def wait_for(self, job_ids, timeout: float = 60.0) -> bool:
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not all(job_id in self.received for job_id in job_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub receiver for async bot replies')
+    parser.add_argument('--host', type=str, default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=9000)
+    args = parser.parse_args()
+    receiver = CallbackReceiver(args.host, args.port, verbose=True).start()
+    print(f"listening on {receiver.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        receiver.stop()
@@ -0,0 +1,179 @@
+# crash_restart_journal.py
+"""
+Kill-and-restart harness for the game journal (turing_game_bot/journal.py).
+
+A child process runs a TuringBot with a journal and starts, skips and ends
+games from several threads, printing every acknowledged start and end. The
+parent SIGKILLs it at a random moment, starts a new child on the same journal
+and checks that every game acknowledged as started (and not as ended) was
+resumed. Reports replay time per restart.
+
+With --fork the child is a master process the way gunicorn runs the bot with
+preload_app: it builds the TuringBot once, forks a worker that replays the
+journal (as post_fork does) and serves, and forks a new one from the same
+snapshot whenever the worker dies. The parent SIGKILLs only the workers.
+
+usage: PYTHONPATH=. python benchmarks/crash_restart_journal.py --rounds 10 [--fork]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description='SIGKILL the bot repeatedly and check the journal resumes its games')
+parser.add_argument('--rounds', type=int, default=10)
+parser.add_argument('--threads', type=int, default=8, help='request threads in the bot process')
+parser.add_argument('--min-run', type=float, default=0.5, help='seconds before the kill, at least')
+parser.add_argument('--max-run', type=float, default=2.0, help='seconds before the kill, at most')
+parser.add_argument('--prefill', type=int, default=5000, help='games started before the first kill')
+parser.add_argument('--journal', type=str, default=None, help='journal path (default: temporary file)')
+parser.add_argument('--fork', action='store_true', help='kill forked workers of a live master')
+parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+def child():
+    from turing_game_bot.Turing_bot import TuringBot
+    from turing_game_bot.journal import GameJournal
+
+    logging.basicConfig(level=logging.ERROR)
+    # no cap: evicted games are rightly not resumed and would count as missing
+    bot = TuringBot(prompt_file_path=os.devnull, max_games=10 ** 9, journal=GameJournal(args.journal))
+    if not args.fork:
+        serve(bot)
+    while True:
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            serve(bot)
+        os.waitpid(pid, 0)
+
+
+def serve(bot):
+    from turing_game_bot.journal import GameJournal
+
+    started = time.perf_counter()
+    bot.restore_games()
+    replay_ms = (time.perf_counter() - started) * 1000
+    out_lock = threading.Lock()
+
+    def emit(*fields):
+        with out_lock:
+            sys.stdout.write(" ".join(str(f) for f in fields) + "\n")
+            sys.stdout.flush()
+
+    # the journal was compacted to the resumed games, so reading it again lists them
+    live_ids = list(GameJournal(args.journal).replay())
+    emit("resumed", replay_ms, os.getpid(), json.dumps(live_ids))
+    if not live_ids:
+        for game_id in range(args.prefill):
+            bot.add_game(game_id, "Blue", "Red", "Green")
+            bot.journal.record_start(game_id, "Blue", "Red", "Green", wait=False)
+        bot.journal.sync()
+        live_ids = list(range(args.prefill))
+        emit("prefilled", json.dumps(live_ids))
+    ids_lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while True:
+            op = rng.random()
+            game_id = rng.randrange(1 << 40)
+            if op < 0.3:
+                emit("starting", game_id)
+                bot.start_game(game_id, "Blue", "Red", "Green")  # returns once the start is fsynced
+                emit("start", game_id)
+                with ids_lock:
+                    live_ids.append(game_id)
+                continue
+            with ids_lock:
+                if not live_ids:
+                    continue
+                index = rng.randrange(len(live_ids))
+                game_id = live_ids[index]
+                if op >= 0.7:
+                    live_ids[index] = live_ids[-1]
+                    live_ids.pop()
+            if op < 0.7:
+                game = bot.games.get(game_id)
+                if game is not None:
+                    bot.skip_reply(game_id, game)
+            else:
+                emit("ending", game_id)
+                bot.end_game(game_id)
+                bot.journal.sync()
+                emit("end", game_id)
+
+    for i in range(args.threads):
+        threading.Thread(target=worker, args=(os.getpid() * 100 + i,), daemon=True).start()
+    threading.Event().wait()
+
+
+def track(line: str, live: set, in_doubt: set) -> None:
+    kind, _, game_id = line.strip().partition(" ")
+    if kind == "prefilled":
+        live.update(json.loads(game_id))
+    elif kind == "starting":
+        in_doubt.add(int(game_id))
+    elif kind == "start":
+        live.add(int(game_id))
+        in_doubt.discard(int(game_id))
+    elif kind == "ending":
+        in_doubt.add(int(game_id))
+    elif kind == "end":
+        live.discard(int(game_id))
+        in_doubt.discard(int(game_id))
+
+
+def parent():
+    rng = random.Random(args.seed)
+    journal = args.journal or os.path.join(tempfile.mkdtemp(), 'games.journal')
+    live, in_doubt = set(), set()  # acknowledged live games; games with an unacknowledged start or end
+    failures = 0
+    command = [sys.executable, __file__, '--child', '--journal', journal, '--threads', str(args.threads),
+               '--prefill', str(args.prefill)] + (['--fork'] if args.fork else [])
+    env = {**os.environ, 'PYTHONPATH': os.getcwd()}
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env)
+    line = process.stdout.readline()
+    for round_number in range(args.rounds + 1):
+        _, replay_ms, pid, resumed = line.split(" ", 3)
+        resumed = set(json.loads(resumed))
+        missing = live - in_doubt - resumed
+        ghosts = resumed - live - in_doubt
+        failures += bool(missing or ghosts)
+        print(f"restart {round_number:2d}: resumed {len(resumed):5d} games in {float(replay_ms):6.1f} ms "
+              f"| missing {len(missing)} | unexpected {len(ghosts)} | journal {os.path.getsize(journal) / 1024:.0f} KiB")
+        live, in_doubt = set(resumed), set()
+        if round_number == args.rounds:
+            os.kill(int(pid), signal.SIGKILL)
+            break
+
+        # SIGKILL the worker; in --fork mode the master forks the next one, otherwise a new process starts
+        timer = threading.Timer(rng.uniform(args.min_run, args.max_run), os.kill, (int(pid), signal.SIGKILL))
+        timer.start()
+        if args.fork:
+            for line in process.stdout:
+                if line.startswith("resumed "):
+                    break
+                track(line, live, in_doubt)
+        else:
+            for line in process.stdout:
+                track(line, live, in_doubt)
+            process.wait()
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env)
+            line = process.stdout.readline()
+        timer.cancel()
+    process.kill()
+    print("OK: every acknowledged game was resumed" if not failures else f"FAILED in {failures} restarts")
+
+
+if __name__ == '__main__':
+    child() if args.child else parent()
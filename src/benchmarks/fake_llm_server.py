@@ -0,0 +1,383 @@
+# fake_llm_server.py
+"""
+A local stand-in for the LLM providers, for load tests without network or keys.
+
+Serves
+  POST .../chat/completions   OpenAI and Groq chat completions (the SDKs append
+                              this to their base URL), with "stream": true as SSE
+  POST /api/chat              Ollama chat, with "stream": true as NDJSON
+  GET  /health, GET /stats    liveness and request/429 counters
+
+Each reply takes a time-to-first-token drawn from --latency plus its tokens at
+--tokens-per-second. The request's max_tokens and stop sequences (Ollama:
+options.num_predict and options.stop) cut the reply, and its time, short.
+--rpm / --tpm enforce provider-like rate limits with 429 and Retry-After,
+--error-rate injects extra 429s. Replies are canned lines or
+generated by a word-level Markov chain trained on recorded game messages.
+
+With --load-seconds the Ollama endpoint also simulates model residency: a
+request for a model that is not loaded waits for it to load, and a model stays
+loaded for the request's keep_alive (default 5m) after it, as in Ollama. A
+request without messages only loads the model, or unloads it with keep_alive 0.
+
+Point the components at it with
+  OPENAI_BASE_URL=http://127.0.0.1:8800/v1   GROQ_BASE_URL=http://127.0.0.1:8800
+  OLLAMA_CHAT_ENDPOINT=http://127.0.0.1:8800/api/chat
+
+usage: PYTHONPATH=. python benchmarks/fake_llm_server.py --port 8800 --latency lognormal:0.6,0.5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REPLIES = [
+    "lol no im just slow at typing", "where are you guys from", "idk honestly",
+    "why would i be the bot", "thats exactly what a bot would say", "haha same",
+    "i think its the quiet one", "nah im from ankara", "ok but who asked",
+]
+
+
+def parse_latency(spec: str):
+    """'fixed:0.5', 'uniform:0.2,1.0', 'exponential:0.5' or 'lognormal:median,sigma' -> sampler(rng)."""
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',') if v]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'exponential':
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == 'lognormal':
+        import math
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def count_tokens(text: str) -> int:
+    # about four characters per token for English chat
+    return max(1, len(text) // 4)
+
+
+def parse_keep_alive(value, default: float = 300.0) -> float:
+    """Ollama's keep_alive - seconds, or a duration such as "5m" - in seconds; negative is forever."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        value = str(value).strip()
+        units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        unit = next((u for u in ('ms', 's', 'm', 'h') if value.endswith(u)), '')
+        seconds = float(value[:len(value) - len(unit)]) * units.get(unit, 1)
+    return float('inf') if seconds < 0 else seconds
+
+
+def apply_limits(text: str, max_tokens: int = None, stop=None):
+    """(text cut at the first stop sequence and after max_tokens, finish_reason)."""
+    if isinstance(stop, str):
+        stop = [stop]
+    finish_reason = "stop"
+    for sequence in stop or ():
+        index = text.find(sequence)
+        if index >= 0:
+            text = text[:index]
+    if max_tokens and count_tokens(text) > max_tokens:
+        text = text[:max_tokens * 4]
+        finish_reason = "length"
+    return text, finish_reason
+
+
+class MarkovReplies:
+    """Word-level Markov chain of order 2 over chat messages."""
+
+    def __init__(self, messages, seed: int = 0):
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.transitions = defaultdict(list)
+        self.starts = []
+        for message in messages:
+            words = message.split()
+            if len(words) < 2:
+                continue
+            self.starts.append((words[0], words[1]))
+            for a, b, c in zip(words, words[1:], words[2:] + [None]):
+                self.transitions[(a, b)].append(c)
+
+    def __call__(self, max_words: int = 20) -> str:
+        with self._lock:
+            if not self.starts:
+                return self.rng.choice(CANNED_REPLIES)
+            a, b = self.rng.choice(self.starts)
+            words = [a, b]
+            while len(words) < max_words:
+                following = self.transitions.get((a, b))
+                c = self.rng.choice(following) if following else None
+                if c is None:
+                    break
+                words.append(c)
+                a, b = b, c
+            return " ".join(words)
+
+
+class RateLimiter:
+    """Requests and tokens per minute, as token buckets refilled continuously."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._requests = rpm
+        self._tokens = tpm
+        self._last = clock()
+
+    def acquire(self, tokens: int) -> float:
+        """0 if the request may run now, else seconds until it could (its Retry-After)."""
+        with self._lock:
+            now = self.clock()
+            elapsed, self._last = now - self._last, now
+            if self.rpm:
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+            if self.tpm:
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+            wait = 0.0
+            if self.rpm and self._requests < 1:
+                wait = (1 - self._requests) * 60 / self.rpm
+            if self.tpm and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            if wait:
+                return wait
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+            return 0.0
+
+
+class FakeLLM:
+    """Reply generation, timing and limits shared by all endpoints."""
+
+    def __init__(self, latency: str = 'lognormal:0.6,0.5', tokens_per_second: float = 80.0, rpm: float = 0,
+                 tpm: float = 0, error_rate: float = 0.0, replies=None, seed: int = 0, load_seconds: float = 0.0):
+        self.sample_latency = parse_latency(latency)
+        self.load_seconds = load_seconds
+        self._resident = {}  # model -> (loaded at, unloaded at)
+        self.tokens_per_second = tokens_per_second
+        self.limiter = RateLimiter(rpm, tpm)
+        self.error_rate = error_rate
+        canned = random.Random(seed)
+        self.replies = replies or (lambda: canned.choice(CANNED_REPLIES))
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def admit(self, messages) -> float:
+        """0 to serve the request, else the Retry-After of a 429."""
+        prompt_tokens = sum(count_tokens(m.get('content', '')) for m in messages)
+        with self._lock:
+            injected = self.rng.random() < self.error_rate
+        retry_after = 1.0 if injected else self.limiter.acquire(prompt_tokens)
+        self.count('rate_limited' if retry_after else 'served')
+        return retry_after
+
+    def load(self, model: str, keep_alive=None) -> float:
+        """Seconds this request waits for `model` to load; keeps it loaded keep_alive seconds past the wait."""
+        keep_alive = parse_keep_alive(keep_alive)
+        with self._lock:
+            now = time.monotonic()
+            loaded_at, unloaded_at = self._resident.get(model, (0.0, 0.0))
+            if now >= unloaded_at:
+                loaded_at = now + self.load_seconds
+                self.stats['model_loads'] += 1
+            self._resident[model] = (loaded_at, max(loaded_at, now) + keep_alive)
+            return max(0.0, loaded_at - now)
+
+    def unload(self, model: str) -> None:
+        with self._lock:
+            self._resident.pop(model, None)
+
+    def reply(self):
+        """(text, seconds to first token, seconds per token)."""
+        with self._lock:
+            first_token = self.sample_latency(self.rng)
+        return self.replies(), first_token, 1.0 / self.tokens_per_second
+
+
+def make_handler(llm: FakeLLM):
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_stream(self, content_type: str):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+        def _chunk(self, data: bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == '/health':
+                return self._send_json(200, {"status": "healthy"})
+            if self.path == '/stats':
+                return self._send_json(200, dict(llm.stats))
+            self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            messages = request.get('messages') or []
+            ollama = self.path.rstrip('/') == '/api/chat'
+            if not ollama and not self.path.endswith('/chat/completions'):
+                return self._send_json(404, {"error": "not found"})
+            llm.count('requests')
+            model = request.get('model', 'fake')
+            if ollama and llm.load_seconds:
+                unload = not messages and parse_keep_alive(request.get('keep_alive')) == 0
+                if unload:
+                    llm.unload(model)
+                else:
+                    time.sleep(llm.load(model, request.get('keep_alive')))
+                if not messages:
+                    return self._send_json(200, {"model": model, "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                                 "message": {"role": "assistant", "content": ""}, "done": True,
+                                                 "done_reason": "unload" if unload else "load"})
+
+            retry_after = llm.admit(messages)
+            if retry_after:
+                if ollama:
+                    return self._send_json(429, {"error": "rate limit exceeded"})
+                return self._send_json(429, {"error": {"message": "Rate limit reached. Please try again later.",
+                                                       "type": "requests", "code": "rate_limit_exceeded"}},
+                                       {'Retry-After': f"{retry_after:.2f}"})
+
+            text, first_token, per_token = llm.reply()
+            options = request.get('options') or {}
+            text, finish_reason = apply_limits(text, request.get('max_tokens') or options.get('num_predict'),
+                                               request.get('stop') or options.get('stop'))
+            prompt_tokens = sum(count_tokens(m.get('content', '')) for m in messages)
+            words = text.split(' ')
+            time.sleep(first_token)
+            if request.get('stream'):
+                if ollama:
+                    self._stream_ollama(model, words, per_token)
+                else:
+                    self._stream_openai(model, words, per_token, finish_reason)
+                return
+            time.sleep(per_token * count_tokens(text))
+            if ollama:
+                return self._send_json(200, {"model": model, "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                             "message": {"role": "assistant", "content": text}, "done": True,
+                                             "prompt_eval_count": prompt_tokens, "eval_count": count_tokens(text)})
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": count_tokens(text),
+                          "total_tokens": prompt_tokens + count_tokens(text)},
+            })
+
+        def _stream_openai(self, model: str, words, per_token: float, finish_reason: str = "stop"):
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            created = int(time.time())
+            self._start_stream('text/event-stream')
+            pieces = [{"role": "assistant", "content": ""}] + [
+                {"content": word if i == 0 else " " + word} for i, word in enumerate(words)]
+            for i, delta in enumerate(pieces):
+                if i > 1:
+                    time.sleep(per_token * count_tokens(delta["content"]))
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self._chunk(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}
+            self._chunk(b"data: " + json.dumps(chunk).encode() + b"\n\ndata: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _stream_ollama(self, model: str, words, per_token: float):
+            self._start_stream('application/x-ndjson')
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(per_token * count_tokens(word))
+                line = {"model": model, "message": {"role": "assistant", "content": word if i == 0 else " " + word},
+                        "done": False}
+                self._chunk(json.dumps(line).encode() + b"\n")
+            self._chunk(json.dumps({"model": model, "message": {"role": "assistant", "content": ""},
+                                    "done": True}).encode() + b"\n")
+            self._chunk(b"")
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeLLMHandler
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, llm: FakeLLM, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), make_handler(llm))
+        self.llm = llm
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+
+def markov_from_games(db_path: str = None, seed: int = 0) -> MarkovReplies:
+    from game_traces import DEFAULT_DB_PATH, get_games
+    games = get_games(db_path or DEFAULT_DB_PATH, seed=seed)
+    return MarkovReplies([content for game in games for _, _, content, _ in game['messages']], seed=seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake OpenAI/Groq/Ollama chat server')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=str, default='lognormal:0.6,0.5',
+                        help="time to first token: fixed:S, uniform:A,B, exponential:MEAN or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--tokens-per-second', type=float, default=80.0)
+    parser.add_argument('--rpm', type=float, default=0, help='requests per minute before 429 (0: unlimited)')
+    parser.add_argument('--tpm', type=float, default=0, help='prompt tokens per minute before 429 (0: unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--replies', choices=('canned', 'markov'), default='markov')
+    parser.add_argument('--db', type=str, default=None, help='turing.db to train the Markov replies on')
+    parser.add_argument('--load-seconds', type=float, default=0.0,
+                        help='Ollama model load time; 0 keeps every model loaded')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    replies = markov_from_games(args.db, args.seed) if args.replies == 'markov' else (lambda: rng.choice(CANNED_REPLIES))
+    server = FakeLLMServer(FakeLLM(args.latency, args.tokens_per_second, args.rpm, args.tpm, args.error_rate,
+                                   replies, args.seed, args.load_seconds), args.host, args.port)
+    print(f"Fake LLM listening on {server.url}")
+    server.serve_forever()
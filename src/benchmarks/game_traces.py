@@ -0,0 +1,87 @@
+# game_traces.py
+"""
+Load historical games from turing.db for the benchmark scripts.
+
+A game is returned as a dict with its colors and a list of messages, each a
+(offset_seconds, color, content, is_bot) tuple relative to the first message.
+When no database is available, `synthetic_games` produces games with a similar
+shape (bursty human messages, ~5 minute duration) so the scripts still run.
+"""
+import random
+import sqlite3
+from datetime import datetime
+
+DEFAULT_DB_PATH = "./turing_chat_server/database/turing.db"
+
+COLORS = ['Orange', 'Purple', 'Blue', 'Red', 'Green', 'Black']
+
+SYNTHETIC_MESSAGES = [
+    "hi", "hello", "hey everyone", "are you the bot", "where are you from",
+    "lol", "who is the bot", "I'm not the bot", "what do you study", "idk",
+    "you type too fast", "haha", "Blue is the bot for sure", "why do you think so",
+    "what's your favorite movie", "I'm from istanbul", "same", "ok", "nope",
+]
+
+
+def _parse_time(value: str) -> float:
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+
+
+def load_games(db_path: str = DEFAULT_DB_PATH, min_messages: int = 5, limit: int = None) -> list:
+    """Read completed games and their messages, ordered by message_id."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        games = {}
+        for game_id, p1, p2, bot, duration in conn.execute(
+                "SELECT game_id, player1_color, player2_color, bot_color, duration FROM games "
+                "WHERE is_completed = 1 ORDER BY game_id"):
+            games[game_id] = {'game_id': game_id, 'bot_color': bot, 'player1_color': p1,
+                              'player2_color': p2, 'duration': duration or 300, 'messages': []}
+        for game_id, color, content, sent_time in conn.execute(
+                "SELECT game_id, player_username, message_content, sent_time FROM messages "
+                "ORDER BY game_id, message_id"):
+            game = games.get(game_id)
+            if game is not None and sent_time:
+                game['messages'].append((_parse_time(sent_time), color, content, color == game['bot_color']))
+    finally:
+        conn.close()
+
+    result = []
+    for game in games.values():
+        if len(game['messages']) < min_messages:
+            continue
+        start = game['messages'][0][0]
+        game['messages'] = [(t - start, c, m, b) for t, c, m, b in game['messages']]
+        result.append(game)
+    return result[:limit] if limit else result
+
+
+def synthetic_games(num_games: int = 50, seed: int = 0, duration: int = 300) -> list:
+    """Games with Poisson bursts of human messages and a bot answer every ~10s."""
+    rng = random.Random(seed)
+    games = []
+    for game_id in range(num_games):
+        p1, p2, bot = rng.sample(COLORS, 3)
+        t, messages = 0.0, []
+        while t < duration:
+            # humans write in bursts: a quick reply follows often
+            t += rng.expovariate(1 / 2.5) if rng.random() < 0.4 else rng.expovariate(1 / 9.0)
+            if rng.random() < 0.25:
+                messages.append((t, bot, rng.choice(SYNTHETIC_MESSAGES), True))
+            else:
+                messages.append((t, rng.choice([p1, p2]), rng.choice(SYNTHETIC_MESSAGES), False))
+        games.append({'game_id': 100000 + game_id, 'bot_color': bot, 'player1_color': p1,
+                      'player2_color': p2, 'duration': duration, 'messages': messages})
+    return games
+
+
+def get_games(db_path: str = DEFAULT_DB_PATH, limit: int = None, seed: int = 0) -> list:
+    """Historical games if the database can be opened, synthetic ones otherwise."""
+    try:
+        games = load_games(db_path, limit=limit)
+        if games:
+            return games
+    except sqlite3.Error:
+        pass
+    print(f"Could not read games from {db_path}; using synthetic games.")
+    return synthetic_games(limit or 50, seed=seed)
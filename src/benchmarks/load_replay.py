@@ -0,0 +1,151 @@
+# load_replay.py
+"""
+Trace-driven load generator for the bot service.
+
+Replays historical games from turing.db (or synthetic ones) against a running
+bot the way server.js drives it: /start-game when a game begins, human
+messages appended to the chat history at their recorded offsets, a /response
+poll 2-4s after the start and then every 8-10s while the last message is not
+the bot's, replies truncated to 120 characters and kept unless they would be a
+second bot message in a row, and /end-game when the game is over. The bot
+messages of the trace are replaced by the live bot's replies.
+
+--games concurrent games are cycled from the trace and their starts spread over
+--ramp seconds; --speedup compresses the game clock (the bot's own typing delay
+is not compressed). Reports /response latency percentiles, errors and the
+share of polls answered.
+
+usage: PYTHONPATH=. python benchmarks/load_replay.py --url http://127.0.0.1:8005 --games 50 --speedup 5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from game_traces import DEFAULT_DB_PATH, get_games
+
+parser = argparse.ArgumentParser(description='Replay recorded games against the bot service')
+parser.add_argument('--url', type=str, default='http://127.0.0.1:8005')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--games', type=int, default=20, help='concurrent games')
+parser.add_argument('--ramp', type=float, default=10.0, help='seconds over which game starts are spread')
+parser.add_argument('--speedup', type=float, default=1.0, help='game clock compression')
+parser.add_argument('--duration', type=float, default=300.0, help='game length in game seconds')
+parser.add_argument('--timeout', type=float, default=180.0, help='/response timeout, as in server.js')
+parser.add_argument('--first-game-id', type=int, default=900000)
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+
+class Stats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {'start-game': [], 'response': [], 'end-game': []}
+        self.errors = {'start-game': 0, 'response': 0, 'end-game': 0}
+        self.empty = 0
+        self.accepted = 0
+        self.dropped = 0  # replies server.js would drop: a second bot message in a row
+
+    def record(self, endpoint: str, latency: float, ok: bool) -> None:
+        with self.lock:
+            if ok:
+                self.latencies[endpoint].append(latency)
+            else:
+                self.errors[endpoint] += 1
+
+
+def post(endpoint: str, payload: dict, stats: Stats, timeout: float = 30.0):
+    request = urllib.request.Request(f"{args.url}/{endpoint}", data=json.dumps(payload).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read().decode()
+        stats.record(endpoint, time.monotonic() - start, True)
+        return body
+    except (urllib.error.URLError, OSError):
+        stats.record(endpoint, time.monotonic() - start, False)
+        return None
+
+
+def play(trace: dict, game_id: int, delay: float, stats: Stats, polls: ThreadPoolExecutor, rng: random.Random):
+    time.sleep(delay)
+    bot_color = trace['bot_color']
+    post('start-game', {'game_id': game_id, 'botColor': bot_color, 'player1Color': trace['player1_color'],
+                        'player2Color': trace['player2_color']}, stats)
+    history = []
+    state = {'last_is_bot': False}
+    lock = threading.Lock()
+
+    def poll():
+        # server.js does not await sendChatHistoryToBot, so polls may overlap
+        with lock:
+            snapshot = list(history)
+        reply = post('response', {'game_id': game_id, 'chat_history': snapshot}, stats, args.timeout)
+        if reply is None:
+            return
+        reply = reply[:120]
+        with lock, stats.lock:
+            if not reply:
+                stats.empty += 1
+            elif not state['last_is_bot'] or rng.random() > 0.9:
+                history.append({'role': 'assistant', 'content': f"{bot_color}: {reply}"})
+                state['last_is_bot'] = True
+                stats.accepted += 1
+            else:
+                stats.dropped += 1
+
+    human = [(offset, color, content) for offset, color, content, is_bot in trace['messages']
+             if not is_bot and offset < args.duration]
+    started = time.monotonic()
+    next_poll = rng.randint(2, 4)
+    for second in range(1, int(args.duration) + 1):
+        time.sleep(max(0.0, started + second / args.speedup - time.monotonic()))
+        with lock:
+            while human and human[0][0] <= second:
+                _, color, content = human.pop(0)
+                history.append({'role': 'user', 'content': f"{color}: {content}"})
+                state['last_is_bot'] = False
+            due = second >= next_poll and history and not state['last_is_bot']
+        if second >= next_poll:
+            next_poll = second + rng.randint(8, 10)
+        if due:
+            polls.submit(poll)
+    post('end-game', {'game_id': game_id}, stats)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+if __name__ == '__main__':
+    traces = get_games(args.db, seed=args.seed)
+    rng = random.Random(args.seed)
+    stats = Stats()
+    polls = ThreadPoolExecutor(max_workers=max(4, args.games * 2))
+    players = [threading.Thread(target=play, args=(traces[i % len(traces)], args.first_game_id + i,
+                                                   rng.uniform(0, args.ramp), stats, polls, random.Random(i)))
+               for i in range(args.games)]
+    wall = time.monotonic()
+    for player in players:
+        player.start()
+    for player in players:
+        player.join()
+    polls.shutdown(wait=True)
+    wall = time.monotonic() - wall
+
+    print(f"{args.games} games from {len(traces)} traces, speedup {args.speedup}x, {wall:.1f}s wall time")
+    for endpoint, latencies in stats.latencies.items():
+        print(f"{endpoint:>10}: {len(latencies):6d} ok, {stats.errors[endpoint]:4d} errors | "
+              f"p50 {percentile(latencies, 0.5) * 1000:7.0f} ms  p90 {percentile(latencies, 0.9) * 1000:7.0f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.0f} ms  max {max(latencies, default=float('nan')) * 1000:7.0f} ms")
+    polled = len(stats.latencies['response'])
+    print(f"  replies: {stats.accepted} shown, {stats.dropped} dropped as a second bot message, "
+          f"{stats.empty} empty ({stats.empty / max(polled, 1):.0%} of answered polls)")
+    print(f"  /response throughput: {polled / wall:.1f} req/s")
@@ -0,0 +1,53 @@
+# play_games.py
+"""
+Play recorded games through TuringBot.on_message_openai, one call per human
+message, and print the bot's replies and a digest of all of them.
+
+Meant to run under the cassette (turing_game_bot/cassette.py): record once
+against a provider or benchmarks/fake_llm_server.py, then replay offline as
+often as needed - the digest is the same on every replay.
+
+usage:
+  OPENAI_BASE_URL=http://127.0.0.1:8800/v1 PYTHONPATH=. python -m turing_game_bot.cassette record \
+      --cassette /tmp/games.cassette benchmarks/play_games.py --games 20
+  PYTHONPATH=. python -m turing_game_bot.cassette replay --cassette /tmp/games.cassette --repeat 10 \
+      --skip-sleep benchmarks/play_games.py --games 20
+"""
+import argparse
+import hashlib
+import logging
+import os
+
+from game_traces import DEFAULT_DB_PATH, get_games
+from turing_game_bot.Turing_bot import TuringBot
+
+parser = argparse.ArgumentParser(description='Play recorded games through TuringBot')
+parser.add_argument('--db', type=str, default=DEFAULT_DB_PATH)
+parser.add_argument('--games', type=int, default=20)
+parser.add_argument('--model', type=str, default='gpt-4o')
+parser.add_argument('--prompt', type=str, default='./turing_chat_server/prompts/system_prompt.txt')
+parser.add_argument('-q', '--quiet', action='store_true', help='print only the digest')
+args = parser.parse_args()
+
+logging.getLogger().setLevel(logging.ERROR)
+bot = TuringBot(model_name=args.model, prompt_file_path=args.prompt,
+                openai_api_key=os.getenv('OPENAI_API_KEY', 'replay'))
+digest = hashlib.blake2b(digest_size=8)
+replies = 0
+for game in get_games(args.db, limit=args.games):
+    game_id = game['game_id']
+    bot.start_game(game_id, game['bot_color'], game['player1_color'], game['player2_color'])
+    history = []
+    for _, color, content, is_bot in game['messages']:
+        if is_bot:
+            continue
+        history.append({"role": "user", "content": f"{color}: {content}"})
+        reply = bot.on_message_openai(game_id, history)
+        digest.update(reply.encode() + b'\0')
+        if reply:
+            replies += 1
+            history.append({"role": "assistant", "content": f"{game['bot_color']}: {reply}"})
+            if not args.quiet:
+                print(f"{game_id} {game['bot_color']}: {reply}")
+    bot.end_game(game_id)
+print(f"{replies} replies, digest {digest.hexdigest()}")
@@ -0,0 +1,66 @@
+# soak_game_state.py
+"""
+Soak test for TuringBot per-game state: start many games, abandon most of them
+without /end-game, and print the process RSS as games accumulate.
+
+With eviction the RSS stays flat once the TTL window is full; with
+--no-eviction (TTL and cap effectively disabled) it grows with every game.
+A fake clock advances --game-spacing seconds per game so 100k games take seconds.
+
+usage: PYTHONPATH=. python benchmarks/soak_game_state.py -g 100000
+"""
+import argparse
+import gc
+import os
+import random
+
+from turing_game_bot.Turing_bot import TuringBot
+
+parser = argparse.ArgumentParser(description='RSS of TuringBot over many (mostly abandoned) games')
+parser.add_argument('-g', '--games', type=int, default=100000)
+parser.add_argument('-p', '--prompt', type=str, default='./turing_chat_server/prompts/system_prompt_casual.txt')
+parser.add_argument('--ttl', type=float, default=1800.0)
+parser.add_argument('--max-games', type=int, default=10000)
+parser.add_argument('--game-spacing', type=float, default=1.0, help='simulated seconds between game starts')
+parser.add_argument('--abandon-rate', type=float, default=0.7)
+parser.add_argument('--no-eviction', action='store_true')
+args = parser.parse_args()
+
+COLORS = ['Orange', 'Purple', 'Blue', 'Red', 'Green', 'Black']
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def rss_mib() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    ttl, max_games = (float('inf'), 2 ** 62) if args.no_eviction else (args.ttl, args.max_games)
+    bot = TuringBot(model_name='soak', prompt_file_path=args.prompt, game_ttl=ttl, max_games=max_games)
+    clock = FakeClock()
+    bot.games.clock = clock
+    bot.games.sweep_interval = None  # swept explicitly below, on the fake clock
+
+    print(f"{'games':>8s} {'held':>8s} {'RSS MiB':>8s}")
+    for game_id in range(1, args.games + 1):
+        clock.now += args.game_spacing
+        bot.start_game(game_id, *rng.sample(COLORS, 3))
+        for _ in range(3):
+            bot.games.get(game_id)
+        if rng.random() >= args.abandon_rate:
+            bot.end_game(game_id)
+        if game_id % 1000 == 0:
+            bot.games.sweep()
+        if game_id % (args.games // 10) == 0:
+            gc.collect()
+            print(f"{game_id:8d} {len(bot.games):8d} {rss_mib():8.1f}")
@@ -7,6 +7,8 @@ import os
 import time
 from groq import Groq
 
+from turing_game_bot.postprocess import CollapseSpaces, Pipeline, Remove, Replace, StripPrefix
+
 # logging.basicConfig(
 #     level=logging.DEBUG,
 #     format='%(asctime)s [%(levelname)s] %(message)s',
@@ -21,7 +23,7 @@ class DetectorBot:
                  model_name: str = 'llama3.2',
                  prompt_file_path: str = './system_prompt.txt'):
         self.chat_history = {}
-        self.endpoint = "http://localhost:11434/api/chat"
+        self.endpoint = os.getenv("OLLAMA_CHAT_ENDPOINT", "http://localhost:11434/api/chat")
         self.data = {"model": model_name, "messages": None, "stream": False}
         self.model_name = model_name
         self.system_prompt = self.read_from_file(prompt_file_path)
@@ -33,6 +35,9 @@ class DetectorBot:
         self.num_of_keys = len(self.groq_api_keys)
         logging.info(f"Number of GROQ API keys: {self.num_of_keys}")
         self.current_key = 0
+        # "Assistant:" anywhere and a leading "A:" are artifacts of the chat format
+        self.clean_response = Pipeline(Remove("Assistant:"), CollapseSpaces(), StripPrefix("A:"))
+        self.clean_answer = Pipeline(Replace("\n", " "), CollapseSpaces())
         logging.info('DetectorBot initialized.')
 
     def read_from_file(self, file_path: str) -> str:
@@ -113,10 +118,7 @@ class DetectorBot:
             llm_response.raise_for_status()
             response = json.loads(llm_response.text)['message']['content']
 
-            # Remove any "Assistant:" prefix if present
-            response = response.replace("Assistant:", "").strip()
-            if response.startswith("A:"):
-                response = response[2:].strip()
+            response = self.clean_response(response)
             # logging.debug(f"LLM detector's response: {response}\n")
             # Store bot's response in chat history
             self.chat_history[game_id]['messages'].append({
@@ -150,8 +152,7 @@ class DetectorBot:
                 messages=messages,
                 model=self.model_name,
             )
-            answer = chat_completion.choices[0].message.content.replace(
-                "\n", " ")
+            answer = self.clean_answer(chat_completion.choices[0].message.content)
             # logging.info(f'Bot\'s response: {answer}')
             return answer
         except Exception as e:
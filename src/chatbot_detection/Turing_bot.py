@@ -8,6 +8,8 @@ import os
 from groq import Groq
 import time
 
+from turing_game_bot.postprocess import CollapseSpaces, Pipeline, Replace
+
 # logging.basicConfig(
 #     level=logging.DEBUG,
 #     format='%(asctime)s [%(levelname)s] %(message)s',
@@ -36,7 +38,8 @@ class TuringBot:
         self.current_key = 0
         self.model_name = model_name
         self.data = {"model": model_name, "messages": None, "stream": False}
-        self.endpoint = "http://localhost:11434/api/chat"
+        self.endpoint = os.getenv("OLLAMA_CHAT_ENDPOINT", "http://localhost:11434/api/chat")
+        self.clean_answer = Pipeline(Replace("\n", " "), CollapseSpaces())
         logging.info('TuringBot initialized.')
 
     def read_from_file(self,
@@ -107,7 +110,7 @@ class TuringBot:
                 model=self.model_name,
                 # model="gemma2-9b-it",
             )
-            answer = chat_completion.choices[0].message.content.replace("\n", " ")
+            answer = self.clean_answer(chat_completion.choices[0].message.content)
             # logging.info(f'Bot\'s response: {answer}')
             return answer
             # return self.introduce_typo(answer)
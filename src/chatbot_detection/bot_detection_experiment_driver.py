@@ -3,8 +3,8 @@ import argparse
 import random
 import logging
 import time
-from Detector_bot import DetectorBot
-from Turing_bot import TuringBot
+from chatbot_detection.Detector_bot import DetectorBot
+from chatbot_detection.Turing_bot import TuringBot
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -2,37 +2,21 @@ from flask import Flask, request, jsonify
 import os
 import logging
 from turing_game_bot.Turing_bot import TuringBot 
-
-from logging.handlers import RotatingFileHandler
-import sys
-
-# Create a formatter
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-# Create and configure the file handler (with rotation)
-file_handler = RotatingFileHandler(
-    '/usr/src/app/bot/logs/bot.py.log',               # Log file name
-    maxBytes=1024 * 1024,    # 1MB per file
-    backupCount=5            # Keep 5 backup files
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.DEBUG)
-
-# Create and configure the console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.DEBUG)
-
-# Get the root logger and configure it
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.DEBUG)
-
-# Remove any existing handlers (to avoid duplicates)
-root_logger.handlers = []
-
-# Add both handlers to the logger
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
+from turing_game_bot.bot_logging import setup_logging, is_history_sampled
+from turing_game_bot.metrics import METRICS
+from turing_game_bot.coalescer import RequestCoalescer
+from turing_game_bot.idempotency import IdempotentResponses, make_idempotency_key
+from turing_game_bot.admission import AdmissionController
+from turing_game_bot.jobs import JobStore
+from turing_game_bot.journal import GameJournal
+from turing_game_bot.response_cache import ResponseCache
+from turing_game_bot.retrieval import PhraseIndex
+from turing_game_bot.repetition import RepetitionDetector
+from turing_game_bot.output_budget import OutputBudget
+from turing_game_bot.local_llm import LocalChatClient
+from turing_game_bot.wire import PayloadError, decode_payload, validate_chat_history
+
+setup_logging('bot.py.log')
 
 # prompt is around 5000 char.
 # model gemma2-9b-it    ->  15000 token per minute -> 60000 chars per minute
@@ -45,31 +29,90 @@ def read_from_file(file_path: str = "/usr/src/app/groq_api_keys.txt") -> str:
                 logging.info("Groq API key is read.")
             return prompt
         except FileNotFoundError:
-            logging.error(f"Error: The file {file_path} was not found.")
+            logging.error("Error: The file %s was not found.", file_path)
             return ""
 
 app = Flask(__name__)
 BOT_PORT = os.getenv("BOT_PORT")
 GROQ_MODEL_NAME = os.getenv("GROQ_MODEL_NAME")
 OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME")
+# Requests of the same game arriving within this window are answered once.
+DEBOUNCE_SECONDS = float(os.getenv("BOT_DEBOUNCE_SECONDS", "0.75"))
+# Games without activity for this long are dropped (abandoned games never reach /end-game).
+GAME_TTL_SECONDS = float(os.getenv("BOT_GAME_TTL_SECONDS", "1800"))
+MAX_GAMES = int(os.getenv("BOT_MAX_GAMES", "10000"))
+# Concurrent provider calls; beyond this, unaddressed replies are shed.
+MAX_LLM_CALLS = int(os.getenv("BOT_MAX_LLM_CALLS", "8"))
+# Background threads generating replies for async /response requests.
+ASYNC_WORKERS = int(os.getenv("BOT_ASYNC_WORKERS", "16"))
+# Hosts async replies may be POSTed to (callback_url); empty allows polling /result/<job_id> only.
+CALLBACK_HOSTS = [host.strip() for host in os.getenv("BOT_CALLBACK_HOSTS", "").split(",") if host.strip()]
+# Threads generating replies while players type (/typing); 0 disables speculation.
+SPECULATION_WORKERS = int(os.getenv("BOT_SPECULATION_WORKERS", "0"))
+# Cached replies to recurring conversation states (openers), e.g. 5000; 0 entries (the default) disables the cache.
+RESPONSE_CACHE_SIZE = int(os.getenv("BOT_RESPONSE_CACHE_SIZE", "0"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("BOT_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+# Index of human messages from turing.db (python -m turing_game_bot.retrieval build); empty disables it.
+PHRASE_INDEX_PATH = os.getenv("BOT_PHRASE_INDEX_PATH", "")
+STYLE_EXAMPLES = int(os.getenv("BOT_STYLE_EXAMPLES", "3"))
+# Replies remembered to catch the bot repeating itself; 0 disables the check.
+REPETITION_CAPACITY = int(os.getenv("BOT_REPETITION_CAPACITY", "100000"))
+REPETITION_THRESHOLD = float(os.getenv("BOT_REPETITION_THRESHOLD", "0.6"))
+# Reply budget as a multiple of the players' average message length; 0 sets no max_tokens or stop sequences.
+OUTPUT_HEADROOM = float(os.getenv("BOT_OUTPUT_HEADROOM", "1.5"))
+# GGUF model run in-process by llama.cpp instead of the OpenAI API; empty uses the API.
+LOCAL_MODEL_PATH = os.getenv("BOT_LOCAL_MODEL_PATH", "")
+LOCAL_THREADS = int(os.getenv("BOT_LOCAL_THREADS", "0"))
+LOCAL_CONTEXT = int(os.getenv("BOT_LOCAL_CONTEXT", "4096"))
+LOCAL_CACHE_MB = int(os.getenv("BOT_LOCAL_CACHE_MB", "1024"))
+if LOCAL_MODEL_PATH:
+    OPENAI_MODEL_NAME = os.path.basename(LOCAL_MODEL_PATH)
+# Journal of game state, replayed at start-up so a restarted bot resumes its games; empty disables it.
+JOURNAL_PATH = os.getenv("BOT_JOURNAL_PATH", "/usr/src/app/bot/state/games.journal")
 PROMPT_FILE_PATH="/usr/src/app/turing_chat_server/prompts/system_prompt_casual.txt"
 GROQ_API_KEY = read_from_file('/usr/src/app/groq_api_keys.txt').split('\n')[0]
 OPENAI_API_KEY = read_from_file('/usr/src/app/openai_api_keys.txt').split('\n')[0]
 # logging.debug(f'GROQ_API_KEY: {GROQ_API_KEY}')
 # logging.debug(f'OPENAI_API_KEY: {OPENAI_API_KEY}')
 
+def read_payload() -> dict:
+    """The request body, sent as JSON or msgpack."""
+    return decode_payload(request.content_type, request.get_data(cache=False))
+
+@app.errorhandler(PayloadError)
+def invalid_payload(e):
+    logging.warning("Rejected request body: %s", e)
+    return jsonify({"error": str(e)}), e.status
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"}), 200
 
-logging.info(f"Model {OPENAI_MODEL_NAME} is being used ppl!")
-llm_bot = TuringBot(model_name=OPENAI_MODEL_NAME, prompt_file_path = PROMPT_FILE_PATH, groq_api_key=GROQ_API_KEY, openai_api_key=OPENAI_API_KEY)
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return METRICS.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+logging.info("Model %s is being used ppl!", OPENAI_MODEL_NAME)
+llm_bot = TuringBot(model_name=OPENAI_MODEL_NAME, prompt_file_path = PROMPT_FILE_PATH, groq_api_key=GROQ_API_KEY, openai_api_key=OPENAI_API_KEY,
+                    game_ttl=GAME_TTL_SECONDS, max_games=MAX_GAMES, admission=AdmissionController(MAX_LLM_CALLS),
+                    journal=GameJournal(JOURNAL_PATH) if JOURNAL_PATH else None, speculation_workers=SPECULATION_WORKERS,
+                    response_cache=ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS) if RESPONSE_CACHE_SIZE > 0 else None,
+                    phrase_index=PhraseIndex(PHRASE_INDEX_PATH) if PHRASE_INDEX_PATH else None, style_examples=STYLE_EXAMPLES,
+                    repetition=RepetitionDetector(REPETITION_CAPACITY, threshold=REPETITION_THRESHOLD) if REPETITION_CAPACITY > 0 else None,
+                    output_budget=OutputBudget(headroom=OUTPUT_HEADROOM) if OUTPUT_HEADROOM > 0 else None,
+                    local_client=LocalChatClient(LOCAL_MODEL_PATH, LOCAL_THREADS, LOCAL_CONTEXT, LOCAL_CACHE_MB << 20)
+                    if LOCAL_MODEL_PATH else None)
+coalescer = RequestCoalescer(window=DEBOUNCE_SECONDS)
+recent_responses = IdempotentResponses()
+llm_bot.games.eviction_listeners.append(coalescer.end_game)
+llm_bot.games.eviction_listeners.append(recent_responses.end_game)
+jobs = JobStore(max_workers=ASYNC_WORKERS, callback_hosts=CALLBACK_HOSTS)
 
 @app.route('/start-game', methods=['POST'])
 def initialize_game():
     logging.info("Game initialization data received by the bot.")
-    data = request.json
-    logging.info(f"Received data: {data}") 
+    data = read_payload()
+    logging.info("Received data: %s", data) 
     game_id = data.get("game_id")
     bot_color = data.get("botColor")
     player1_color = data.get("player1Color")
@@ -77,19 +120,64 @@ def initialize_game():
     llm_bot.start_game(game_id, bot_color, player1_color, player2_color)
     return jsonify({"message": "Game initialized successfully"}), 200
 
+@app.route('/end-game', methods=['POST'])
+def end_game():
+    game_id = read_payload().get("game_id")
+    llm_bot.end_game(game_id)
+    coalescer.end_game(game_id)
+    recent_responses.end_game(game_id)
+    return jsonify({"message": "Game ended successfully"}), 200
+
+def generate_response(game_id, chat_history, key: str) -> str:
+    with METRICS.in_flight('bot_in_flight_requests'), \
+            METRICS.timer('bot_phase_seconds', phase='total', provider='openai', model=OPENAI_MODEL_NAME):
+        # A retried request with the same key reuses the reply instead of superseding it.
+        # return recent_responses.get_or_compute(game_id, key, lambda: coalescer.submit(game_id, chat_history, llm_bot.on_message_groq))
+        return recent_responses.get_or_compute(
+            game_id, key, lambda: coalescer.submit(game_id, chat_history, llm_bot.on_message_openai))
+
 @app.route('/response', methods=['POST'])
 def bot_response():
     logging.info("Data received by the bot.")
-    data = request.json
-    logging.info(f"Received data: {data}") 
+    data = read_payload()
     game_id = data.get("game_id")
     chat_history = data.get("chat_history")
-    logging.info(f"Bot: game_ID is {game_id} and message is {chat_history}")
-    # response = llm_bot.on_message_groq(game_id, chat_history)
-    response = llm_bot.on_message_openai(game_id, chat_history)
-    logging.info(f"bot.py: game {game_id}: The bot\'s response: {type(response)} -> {response}") 
+    if chat_history is None:
+        raise PayloadError("chat_history is required.")
+    validate_chat_history(chat_history)
+    if is_history_sampled(game_id):
+        logging.debug("Bot: game_ID is %s and message is %s", game_id, chat_history, extra={"game_id": game_id})
+    key = request.headers.get('Idempotency-Key') or make_idempotency_key(chat_history)
+
+    # Async mode: answer 202 now, deliver the reply to callback_url and/or /result/<job_id>.
+    callback_url = data.get("callback_url")
+    if callback_url and not jobs.allows_callback(callback_url):
+        raise PayloadError("callback_url must be an http(s) URL on a host in BOT_CALLBACK_HOSTS")
+    if callback_url or data.get("async"):
+        job_id = jobs.submit(game_id, lambda: generate_response(game_id, chat_history, key), callback_url)
+        return jsonify({"job_id": job_id}), 202
+
+    response = generate_response(game_id, chat_history, key)
+    logging.info("bot.py: game %s: The bot's response: %s", game_id, response, extra={"game_id": game_id}) 
     return response
 
+@app.route('/typing', methods=['POST'])
+def player_typing():
+    # A player started typing: generate a candidate reply to the history so far,
+    # which the next /response uses unless the new message changes the context.
+    data = read_payload()
+    started = llm_bot.speculate(data.get("game_id"), data.get("chat_history"))
+    return jsonify({"speculating": started}), 202
+
+@app.route('/result/<job_id>', methods=['GET'])
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "unknown"}), 404
+    if not job.done:
+        return jsonify({"status": "pending"}), 202
+    return jsonify({"status": "done", "game_id": job.game_id, "response": job.response}), 200
+
 # add timeout for Ollama connection:
 # TODO: Ollama connection still not working..
 if __name__ == "__main__":
@@ -99,11 +187,10 @@ if __name__ == "__main__":
 
     class GunicornApplication(Application):
         def init(self, parser, opts, args):
-            return {
-                'timeout': 120,  # Set the timeout to 120 seconds (2 minutes)
-                'worker_class': 'sync',
-                'workers': 4
-            }
+            return {}
+
+        def load_config(self):
+            self.load_config_from_file(os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
 
         def load(self):
             return app
@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+# Gunicorn settings for the bot service:
+#   gunicorn -c turing_chat_server/gunicorn.conf.py turing_chat_server.bot:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('BOT_PORT', '8005')}"
+timeout = 120  # Set the timeout to 120 seconds (2 minutes)
+
+# Threads let a newer request of a game supersede an older one (see RequestCoalescer);
+# one process keeps per-game state in one place.
+worker_class = 'gthread'
+workers = int(os.getenv('BOT_WORKERS', '1'))
+threads = int(os.getenv('BOT_THREADS', '16'))
+
+# The game journal is one file per bot process: several workers would append to the same
+# file, each replay every game, and compact it from under the others. Scale out with more
+# bot processes behind turing_chat_server/router.py instead.
+if workers > 1 and os.getenv('BOT_JOURNAL_PATH', '/usr/src/app/bot/state/games.journal'):
+    raise RuntimeError("The game journal needs BOT_WORKERS=1; set BOT_JOURNAL_PATH= to run more workers "
+                       "without it, or run more bot processes behind the router.")
+
+# Import the app (prompt files, key files, TuringBot) once in the master; workers
+# share those pages copy-on-write instead of repeating the work after fork.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # the logging listener thread of the master does not exist in the worker
+    from turing_game_bot.bot_logging import restart_after_fork
+    restart_after_fork()
+    from turing_chat_server.bot import llm_bot
+    # the master never replays the journal: a worker respawned after a crash would start from its
+    # boot-time snapshot and miss every game started since, so each worker replays it itself
+    llm_bot.restore_games()
+    # the local model is loaded per worker, as llama.cpp's threads do not survive fork
+    import threading
+    threading.Thread(target=llm_bot.warm_up, name="bot-warm-up", daemon=True).start()
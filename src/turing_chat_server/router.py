@@ -0,0 +1,228 @@
+# router.py
+"""
+Router in front of several bot processes.
+
+Games are assigned to bot processes by consistent hashing on game_id, so all
+requests of a game reach the process holding its state. The router remembers
+each game's /start-game payload; when processes join or leave and a game
+changes owner, the payload is replayed to the new owner before the request is
+forwarded. A backend that refuses connections is taken off the ring, and
+put back once its /health answers again (probed every `probe_interval`
+seconds). A request that times out is answered with 504; its backend stays.
+
+usage: python -m turing_chat_server.router --port 8005 --backends http://bot1:8005,http://bot2:8005
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from turing_game_bot.hash_ring import HashRing
+from turing_game_bot.wire import JSON_CONTENT_TYPE, PayloadError, decode_payload
+
+FORWARDED_HEADERS = ('Content-Type', 'Idempotency-Key')
+
+
+class GameRouter:
+
+    def __init__(self, backends, max_games: int = 10000, timeout: float = 180.0, probe_interval: float = 5.0):
+        self.ring = HashRing(backends)
+        self.max_games = max_games
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._unreachable = set()  # backends taken off the ring until their /health answers
+        self._prober = None
+        self._games = OrderedDict()  # game_id -> [start-game body, its Content-Type, owner]
+        self._jobs = OrderedDict()  # async job id -> backend
+
+    def forward(self, backend: str, method: str, path: str, body: bytes = None, headers: dict = None):
+        request = urllib.request.Request(f"{backend}{path}", data=body, method=method, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read(), response.headers.get('Content-Type', 'text/html')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers.get('Content-Type', 'text/html')
+
+    def handle(self, method: str, path: str, body: bytes, headers: dict):
+        if path.startswith('/result/'):
+            with self._lock:
+                backend = self._jobs.get(path[len('/result/'):])
+            if backend is None:
+                return 404, b'{"status": "unknown"}', 'application/json'
+            try:
+                return self.forward(backend, method, path)
+            except (OSError, urllib.error.URLError) as e:
+                logging.error("Could not fetch %s from bot process %s: %s", path, backend, e)
+                return 504 if isinstance(e, TimeoutError) else 503, b'{"status": "unavailable"}', 'application/json'
+
+        content_type = headers.get('Content-Type', JSON_CONTENT_TYPE)
+        try:
+            game_id = decode_payload(content_type, body).get('game_id')
+        except PayloadError as e:
+            logging.warning("Rejected request body: %s", e)
+            return e.status, json.dumps({"error": str(e)}).encode(), 'application/json'
+        for _ in range(max(1, len(self.ring))):
+            backend = self.ring.get(game_id)
+            if backend is None:
+                return 503, b'{"error": "no bot process available"}', 'application/json'
+            try:
+                if path == '/start-game':
+                    self._remember(game_id, body, content_type, backend)
+                else:
+                    self._ensure_started(game_id, backend)
+                status, response_body, content_type = self.forward(backend, method, path, body, headers)
+            except TimeoutError:
+                logging.error("Bot process %s did not answer %s within %gs.", backend, path, self.timeout)
+                return 504, b'{"error": "bot process timed out"}', 'application/json'
+            except urllib.error.URLError as e:
+                if isinstance(e.reason, TimeoutError):
+                    logging.error("Bot process %s did not answer %s within %gs.", backend, path, self.timeout)
+                    return 504, b'{"error": "bot process timed out"}', 'application/json'
+                self._take_off(backend, e.reason)
+                continue
+            except ConnectionError as e:
+                self._take_off(backend, e)
+                continue
+            if path == '/end-game':
+                with self._lock:
+                    self._games.pop(game_id, None)
+            elif status == 202 and path == '/response':
+                self._remember_job(json.loads(response_body).get('job_id'), backend)
+            return status, response_body, content_type
+        return 503, b'{"error": "no bot process available"}', 'application/json'
+
+    def remove_backend(self, backend: str) -> None:
+        """Take a backend off the ring for good (DELETE /backends)."""
+        with self._lock:
+            self._unreachable.discard(backend)
+        self.ring.remove(backend)
+
+    def _take_off(self, backend: str, reason) -> None:
+        logging.error("Bot process %s is unreachable (%s); removing it from the ring.", backend, reason)
+        self.ring.remove(backend)
+        with self._lock:
+            self._unreachable.add(backend)
+            if self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name="router-prober", daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                backends = list(self._unreachable)
+                if not backends:
+                    self._prober = None
+                    return
+            for backend in backends:
+                try:
+                    with urllib.request.urlopen(f"{backend}/health", timeout=2.0) as response:
+                        healthy = response.status == 200
+                except (OSError, urllib.error.URLError):
+                    healthy = False
+                if not healthy:
+                    continue
+                with self._lock:
+                    if backend not in self._unreachable:
+                        continue  # removed with DELETE /backends meanwhile
+                    self._unreachable.discard(backend)
+                logging.info("Bot process %s is healthy again; adding it back to the ring.", backend)
+                self.ring.add(backend)
+
+    def _remember(self, game_id, body: bytes, content_type: str, owner: str) -> None:
+        with self._lock:
+            self._games[game_id] = [body, content_type, owner]
+            self._games.move_to_end(game_id)
+            while len(self._games) > self.max_games:
+                self._games.popitem(last=False)
+
+    def _remember_job(self, job_id: str, backend: str) -> None:
+        with self._lock:
+            self._jobs[job_id] = backend
+            while len(self._jobs) > self.max_games:
+                self._jobs.popitem(last=False)
+
+    def _ensure_started(self, game_id, owner: str) -> None:
+        """Replay /start-game if the game moved to another process since it started."""
+        with self._lock:
+            record = self._games.get(game_id)
+            if record is None or record[2] == owner:
+                return
+            start_body, content_type = record[0], record[1]
+        logging.info("Game %s moved to %s; replaying /start-game.", game_id, owner)
+        self.forward(owner, 'POST', '/start-game', start_body, {'Content-Type': content_type})
+        with self._lock:
+            if game_id in self._games:
+                self._games[game_id][2] = owner
+
+
+def make_handler(router: GameRouter):
+
+    class RouterHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_GET(self):
+            if self.path == '/health':
+                healthy = len(router.ring) > 0
+                return self._send(200 if healthy else 503, json.dumps({"status": "healthy" if healthy else "no backends"}).encode())
+            if self.path == '/backends':
+                return self._send(200, json.dumps(router.ring.nodes).encode())
+            self._send(*router.handle('GET', self.path, b'', {}))
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == '/backends':
+                router.ring.add(json.loads(body)['url'])
+                return self._send(200, json.dumps(router.ring.nodes).encode())
+            headers = {h: self.headers[h] for h in FORWARDED_HEADERS if self.headers.get(h)}
+            self._send(*router.handle('POST', self.path, body, headers))
+
+        def do_DELETE(self):
+            if self.path == '/backends':
+                router.remove_backend(json.loads(self._body())['url'])
+                return self._send(200, json.dumps(router.ring.nodes).encode())
+            self._send(404, b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    return RouterHandler
+
+
+class RouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the game server opens a connection per poll
+
+
+def serve(port: int, backends, host: str = '0.0.0.0', probe_interval: float = 5.0) -> ThreadingHTTPServer:
+    return RouterServer((host, port), make_handler(GameRouter(backends, probe_interval=probe_interval)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    parser = argparse.ArgumentParser(description='Consistent-hash router for bot processes')
+    parser.add_argument('--port', type=int, default=int(os.getenv('ROUTER_PORT', '8005')))
+    parser.add_argument('--backends', type=str, default=os.getenv('BOT_BACKENDS', ''),
+                        help='comma separated bot process URLs')
+    args = parser.parse_args()
+    server = serve(args.port, [b for b in args.backends.split(',') if b])
+    logging.info("Router listening on %d with backends %s", args.port, args.backends)
+    server.serve_forever()
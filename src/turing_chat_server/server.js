@@ -9,6 +9,11 @@ const path = require("path");
 const io = socketIo(server);
 
 const PORT = process.env.SERVER_PORT;
+// Chat histories go to the bot as JSON, or as msgpack with BOT_WIRE_FORMAT=msgpack (smaller, cheaper to decode)
+const BOT_WIRE_FORMAT = process.env.BOT_WIRE_FORMAT || 'json';
+const msgpack = BOT_WIRE_FORMAT === 'msgpack' ? require('@msgpack/msgpack') : null;
+// Tell the bot when a player starts typing, so it can prepare a reply (BOT_SPECULATION_WORKERS on the bot)
+const BOT_TYPING_SIGNAL = process.env.BOT_TYPING_SIGNAL === '1';
 
 const COLORS = ['Orange', 'Purple', 'Blue', 'Red', 'Green', 'Black'];       // Pool of colors
 const chat_store = {};                              // Chat store to hold chat history per game
@@ -640,6 +645,21 @@ io.on('connection', (socket) => {
         console.log(`--- DB: message ${message} is added by the user ${color} in the game ${game_id} as the message number ${nextMessageId}`);
     });
 
+    // A player started typing: let the bot prepare a reply to the chat so far
+    socket.on('typing', ({ game_id }) => {
+        const game = games[game_id];
+        if (!BOT_TYPING_SIGNAL || !game || !game.gameInitialized || game.accusationMade) {
+            return;
+        }
+        // once per chat state: every player typing on the same history would prepare the same reply
+        const historyLength = chat_store[game_id].length;
+        if (game.typingSignalLength === historyLength) {
+            return;
+        }
+        game.typingSignalLength = historyLength;
+        sendTypingToBot(game_id);
+    });
+
     // Handle user disconnection
     socket.on('disconnect', () => {
         console.log('A user disconnected:', socket.id);
@@ -1124,11 +1144,30 @@ async function endGame(game_id, reason = null) {
         delete activeAccusations[game_id];
         delete gameTimers[game_id];
         delete botTimers[game_id];
+        endGameOnBot(game_id);
     } catch (error) {
         console.error('Error ending game:', error);
     }
 }
 
+// Let the bot free the game's state; games that never get here expire on the bot after a TTL
+async function endGameOnBot(game_id) {
+    try {
+        const response = await fetch('http://bot:8005/end-game', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ game_id }),
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+    } catch (error) {
+        console.error('Error ending the game on the bot:', error.message);
+    }
+}
+
 // Helper function to split messages
 function splitBotMessage(message) {
     // 30% chance to split the message
@@ -1176,6 +1215,23 @@ const RETRY_ATTEMPTS = 3;
 const INITIAL_TIMEOUT = 8000; // 8 seconds
 const MAX_TIMEOUT = 12000;    // 12 seconds
 
+// Send the chat history to the bot's /typing; the answer carries no reply
+async function sendTypingToBot(game_id) {
+    const payload = { game_id, chat_history: chat_store[game_id] };
+    try {
+        await fetch('http://bot:8005/typing', {
+            method: 'POST',
+            headers: {
+                'Content-Type': msgpack ? 'application/msgpack' : 'application/json',
+            },
+            body: msgpack ? msgpack.encode(payload) : JSON.stringify(payload),
+            signal: AbortSignal.timeout(5000),
+        });
+    } catch (error) {
+        console.error('BOT ERROR - typing signal failed:', error.message);
+    }
+}
+
 // Send chat history to the bot
 async function sendChatHistoryToBot(game_id) {
 
@@ -1190,15 +1246,13 @@ async function sendChatHistoryToBot(game_id) {
         const controller = new AbortController(); // For timeout handling
         const timeout = setTimeout(() => controller.abort(), 180000); // 120,000 ms timeout
     
+        const payload = { game_id, chat_history: chatHistory };
         const response = await fetch('http://bot:8005/response', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json',
+                'Content-Type': msgpack ? 'application/msgpack' : 'application/json',
             },
-            body: JSON.stringify({
-                game_id,
-                chat_history: chatHistory,
-            }),
+            body: msgpack ? msgpack.encode(payload) : JSON.stringify(payload),
             signal: controller.signal, // Attach the signal for aborting
         });
     
@@ -11,6 +11,8 @@ import os
 from openai import OpenAI
 import random
 import asyncio
+from timer_wheel import TimerWheel
+from postprocess import CollapseSpaces, Pipeline, Replace
 
 load_dotenv()
 
@@ -33,7 +35,10 @@ class MyBot(TuringBotClient):
         self.add_bots_color = False
         self.silence_message = "It seems quiet here... is everyone still interested in finding the bot?"
         self.silence_threshold = silence_threshold
-        self.silence_tasks = {}  # Store the asyncio tasks for each game
+        # One wheel tracks the inactivity deadline of every game
+        self.silence_timers = TimerWheel(self.silence_handler, tick=1.0)
+        # replies as players write them: one line, single spaces, an occasional typo
+        self.clean_reply = Pipeline(Replace("\n", " "), CollapseSpaces(), self.introduce_typo)
 
     def read_prompt_from_file(self, file_path: str) -> str:
         try:
@@ -66,7 +71,7 @@ class MyBot(TuringBotClient):
         self.active_games.discard(game_id)
         del self.chat_store[game_id]
         del self.language_store[game_id]
-        # del self.silence_tasks[game_id]
+        self.stop_silence_timer(game_id)
 
     def on_gamemaster_message(self, game_id: int, message: str, player: str,
                               bot: str) -> None:
@@ -146,7 +151,7 @@ class MyBot(TuringBotClient):
             typing_delay = random.uniform(1, len(answer)/20 + 2) # Dynamic delay depending on the length of the answer
             # time.sleep(typing_delay)
             # await asyncio.sleep(typing_delay)
-            return self.introduce_typo(answer)
+            return self.clean_reply(answer)
     
     def introduce_typo(self, message):
         # Add occasional typos to the bot's messages
@@ -181,45 +186,41 @@ class MyBot(TuringBotClient):
 
     def on_shutdown(self):
         print("Shutting down the bot.")
-        # Cancel all silence tasks on shutdown
-        for task in self.silence_tasks.values():
-            task.cancel()
-
-    # async def silence_handler(self, game_id: int):
-    #     """Triggered when there is no message for a while."""
-    #     await asyncio.sleep(self.silence_threshold
-    #                         )  # Wait for silence_threshold seconds
-    #     print(
-    #         f"Breaking the silence in game {game_id} after {self.silence_threshold} seconds of inactivity."
-    #     )
-
-    #     # Send the predefined silence-breaking message
-    #     silence_message = "It seems quiet here... is everyone still interested in finding the bot?"
-    #     self.chat_store[game_id].append({
-    #         "role": "assistant",
-    #         "content": silence_message
-    #     })
-    #     await self.send_game_message(game_id, message=silence_message)
-    #     print(f"Bot sends the silence breaker message: {silence_message}")
+        # Stop the silence timers on shutdown
+        self.silence_timers.stop()
+
+    async def silence_handler(self, game_id: int):
+        """Triggered by the timer wheel when there is no message for a while."""
+        if game_id not in self.active_games:
+            return
+        print(
+            f"Breaking the silence in game {game_id} after {self.silence_threshold} seconds of inactivity."
+        )
+
+        # Send the predefined silence-breaking message
+        self.chat_store[game_id].append({
+            "role": "assistant",
+            "content": self.silence_message
+        })
+        await self.send_game_message(game_id, message=self.silence_message)
+        print(f"Bot sends the silence breaker message: {self.silence_message}")
 
     def start_silence_timer(self, game_id: int):
-        """Start the silence timer using asyncio tasks."""
-        if game_id in self.silence_tasks:
-            self.silence_tasks[game_id].cancel()  # Cancel any existing task
-        # self.silence_tasks[game_id] = asyncio.create_task(
-        #     self.silence_handler(game_id))  # Create a new asyncio task
+        """Arm the game's inactivity deadline on the timer wheel."""
+        self.silence_timers.arm(game_id, self.silence_threshold)
+        try:
+            self.silence_timers.start()
+        except RuntimeError:
+            # no running event loop yet; the wheel starts with the next message
+            pass
 
     def reset_silence_timer(self, game_id: int):
         """Reset the silence timer when a new message is received."""
-        if game_id in self.silence_tasks:
-            self.silence_tasks[game_id].cancel()  # Cancel the old task
-        self.start_silence_timer(game_id)  # Start a new one
+        self.start_silence_timer(game_id)  # re-arming replaces the old deadline
 
     def stop_silence_timer(self, game_id: int):
         """Stop the silence timer for the game."""
-        if game_id in self.silence_tasks:
-            self.silence_tasks[game_id].cancel()
-            del self.silence_tasks[game_id]
+        self.silence_timers.cancel(game_id)
 
 
 # bot = MyBot(api_key=os.getenv("turinggame_api_key_1"),
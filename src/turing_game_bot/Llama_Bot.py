@@ -7,8 +7,7 @@ This bot implementation uses the OLLaMA API to generate responses to the user's
 __author__ = "Ebrar Kiziloglu"
 
 from Bot import *
-import requests
-import json
+from ollama_backend import OllamaBackend
 
 load_dotenv()
 
@@ -26,9 +25,31 @@ class Llama_Bot(MyBot):
                          languages=languages,
                          silence_threshold=silence_threshold,
                          prompt_file_path=prompt_file_path)
-        # create a new Llama instance
-        self.data = {'model': 'llama3.2', 'messages': None, 'stream': False}
-        self.endpoint = "http://localhost:11434/api/chat"
+        # the Ollama model, preloaded at start and kept loaded while games run
+        num_ctx = int(os.getenv("OLLAMA_NUM_CTX", "0"))
+        self.backend = OllamaBackend(endpoint=os.getenv("OLLAMA_CHAT_ENDPOINT", "http://localhost:11434/api/chat"),
+                                     model=os.getenv("OLLAMA_MODEL", "llama3.2"),
+                                     system_prompt=self.system_prompt,
+                                     idle_timeout=float(os.getenv("OLLAMA_IDLE_TIMEOUT", "600")),
+                                     ping_interval=float(os.getenv("OLLAMA_PING_INTERVAL", "60")),
+                                     options={"num_ctx": num_ctx} if num_ctx else None)
+
+    def start(self):
+        self.backend.start()
+        super().start()
+
+    def start_game(self, game_id: int, bot: str, player1: str, player2: str,
+                   language: str) -> bool:
+        self.backend.game_started(game_id)
+        return super().start_game(game_id, bot, player1, player2, language)
+
+    def end_game(self, game_id: int) -> None:
+        super().end_game(game_id)
+        self.backend.game_ended(game_id)
+
+    def on_shutdown(self):
+        super().on_shutdown()
+        self.backend.close()
 
     def on_message(self, game_id: int, message: str, player: str,
                          bot: str) -> str:
@@ -39,14 +60,14 @@ class Llama_Bot(MyBot):
             f"On Message for the game with the ID {game_id}: Player: {player} -> {message}, Bot: {bot}"
         )
 
-        if not self.add_bots_color:
-            self.chat_store[game_id] = [{
+        # after the system prompt, which every game shares and Ollama keeps evaluated
+        if len(self.chat_store[game_id]) == 1:
+            self.chat_store[game_id].append({
                 "role":
                 "system",
                 "content":
                 f"Your color is {bot}. Do not ever refer to your own color, that is weird. But you can use other players' colors to refer to them in your messages."
-            }]
-            self.add_bots_color = True
+            })
 
         if player == bot:
             print('Bot is speaking')
@@ -69,14 +90,9 @@ class Llama_Bot(MyBot):
             # time.sleep(typing_delay)
             # await asyncio.sleep(typing_delay)
 
-            self.data['messages'] = self.chat_store[game_id]
-            response = requests.post(self.endpoint,
-                                     json=self.data,
-                                     verify=False)
-            response_json = json.loads(response.text)
-            answer = response_json['message']['content']
+            answer = self.backend.chat(self.chat_store[game_id])
             # print(f'Answer: {answer}')
-            return self.introduce_typo(answer)
+            return self.clean_reply(answer)
 
 
 llama_bot = Llama_Bot(api_key=os.getenv("turinggame_api_key_2"),
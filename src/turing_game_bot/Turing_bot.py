@@ -1,59 +1,66 @@
-from flask import jsonify
 import logging
 import random
 import json
 import os
 import time 
-from groq import Groq
-from openai import OpenAI
-from logging.handlers import RotatingFileHandler
-import sys
+from contextlib import nullcontext
+from turing_game_bot.bot_logging import is_history_sampled
+from turing_game_bot.metrics import METRICS
+from turing_game_bot.game_state import GameStateStore
+from turing_game_bot.admission import is_addressed_to_bot, last_user_message, urgency
+from turing_game_bot.postprocess import CollapseSpaces, Pipeline, Remove, Replace, Truncate
+from turing_game_bot.speculation import Speculator
+from turing_game_bot.output_budget import trim_cut
 
-# Create a formatter
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-# Create and configure the file handler (with rotation)
-file_handler = RotatingFileHandler(
-    '/usr/src/app/bot/logs/Turing_bot.py.log',               # Log file name
-    maxBytes=1024 * 1024,    # 1MB per file
-    backupCount=5            # Keep 5 backup files
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.DEBUG)
-
-# Create and configure the console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.DEBUG)
-
-# Get the root logger and configure it
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.DEBUG)
-
-# Remove any existing handlers (to avoid duplicates)
-root_logger.handlers = []
-
-# Add both handlers to the logger
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
+# server.js shows at most this many characters of a reply
+REPLY_MAX_LENGTH = 120
 
 
 class TuringBot:
-    def __init__(self, model_name: str='llama3-8b-8192', prompt_file_path: str='./system_prompt.txt', groq_api_key: str='', openai_api_key: str=''):
-        self.chat_store = {}
-        self.active_games = set()
-        self.bot_colors = {}
+    def __init__(self, model_name: str='llama3-8b-8192', prompt_file_path: str='./system_prompt.txt', groq_api_key: str='', openai_api_key: str='',
+                 game_ttl: float=1800.0, max_games: int=10000, admission=None, game_duration: float=300.0, journal=None, rng=None,
+                 speculation_workers: int=0, response_cache=None, phrase_index=None, style_examples: int=3,
+                 repetition=None, output_budget=None, local_client=None):
+        # prompt, bot color and skip count per game; idle games expire after game_ttl seconds
+        self.games = GameStateStore(ttl=game_ttl, max_games=max_games)
+        self.games.eviction_listeners.append(self._on_game_evicted)
         self.system_prompt = self.read_prompt_from_file(prompt_file_path)
         self.add_bots_color = False
         self.silence_message = "It seems quiet here... is everyone still interested in finding the bot_color?"
         # self.silence_threshold = silence_threshold
         # self.silence_tasks = {}  
         self.model_name = model_name
-        logging.info(f"TuringBot is initialized with the model {model_name}")
+        logging.info("TuringBot is initialized with the model %s", model_name)
         self.groq_api_key = groq_api_key
         self.openai_api_key = openai_api_key
-        self.bot_not_responding = {}
+        # optional AdmissionController limiting and prioritising concurrent provider calls
+        self.admission = admission
+        self.game_duration = game_duration
+        # Provider clients are created on first use, after gunicorn forks the workers.
+        self._groq_client = None
+        self._openai_client = None
+        # optional LocalChatClient (llama.cpp on the CPU) used instead of the OpenAI API
+        self.local_client = local_client
         self.blocked_words = ['iParam', 'abi', 'wbu', 'hbu']
+        # reply Pipeline per bot color, compiled from blocked_words on first use
+        self._pipelines = {}
+        # source of skips, typos and typing delays; pass random.Random(seed) for reproducible runs
+        self.rng = rng if rng is not None else random
+        # replies generated while players type; speculation_workers=0 disables it
+        self.speculator = Speculator(self._speculative_reply, max_workers=speculation_workers) if speculation_workers > 0 else None
+        # optional ResponseCache of replies to recurring conversation states
+        self.response_cache = response_cache
+        # optional PhraseIndex of human messages; style_examples similar ones go into each prompt
+        self.phrase_index = phrase_index
+        self.style_examples = style_examples
+        # optional RepetitionDetector; a reply close to an earlier one is regenerated or perturbed
+        self.repetition = repetition
+        # optional OutputBudget; sets max_tokens and stop sequences of every provider call
+        self.output_budget = output_budget
+        # optional GameJournal; restore_games() resumes the games of a previous run of the process.
+        # Not called here: with gunicorn's preload_app the constructor runs once in the master, and
+        # each worker - also one respawned after a crash - replays the journal from post_fork.
+        self.journal = journal
 
     def read_prompt_from_file(self, file_path: str = "./system_prompt.txt") -> str:
         try:
@@ -62,138 +69,353 @@ class TuringBot:
                 logging.info("Prompt is read.")
             return prompt
         except FileNotFoundError:
-            logging.error(f"Error: The file {file_path} was not found.")
+            logging.error("Error: The file %s was not found.", file_path)
             return ""
         
-    def start_game(self, game_id: int, bot_color: str, player1: str, player2: str) -> bool:
-        logging.info(f"Starting the game with the ID {game_id}.")
-        self.active_games.add(game_id)
-        self.bot_colors[game_id] = bot_color
-        self.bot_not_responding[game_id] = 0
-        self.chat_store[game_id] = [{
+    def get_groq_client(self):
+        if self._groq_client is None:
+            from groq import Groq  # imported lazily to keep worker start-up fast
+            self._groq_client = Groq(api_key=self.groq_api_key)
+        return self._groq_client
+
+    def get_openai_client(self):
+        if self._openai_client is None and self.local_client is not None:
+            self._openai_client = self.local_client
+        if self._openai_client is None:
+            from openai import OpenAI  # imported lazily to keep worker start-up fast
+            self._openai_client = OpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+
+    def warm_up(self):
+        """Load the local model and cache the system prompt's KV state; seconds taken, None without a local model."""
+        if self.local_client is None:
+            return None
+        seconds = self.local_client.warm_up([{"role": "developer", "content": self.system_prompt}])
+        logging.info("Local model warmed up in %.1fs", seconds)
+        return seconds
+
+    def game_prompt(self, bot_color: str, player1: str, player2: str) -> list:
+        return [{
             "role":
             "developer",
             "content":
             f"{self.system_prompt}. Your color is {bot_color}, your opponents' colors are {player1} and {player2}. Never refer to your own color. But you can occasonaly use others' colors to mention them. Provide your response with 1 sentence long."
         }]
+
+    def reply_pipeline(self, bot_color: str) -> Pipeline:
+        """Cleanup of provider replies: newlines, the bot's color and blocked words, spacing, typos, truncation."""
+        pipeline = self._pipelines.get(bot_color)
+        if pipeline is None:
+            pipeline = self._pipelines[bot_color] = Pipeline(
+                Replace("\n", " "),
+                Remove(bot_color + ":", bot_color),
+                Remove(*self.blocked_words, ignore_case=True),
+                CollapseSpaces(),
+                self.introduce_typo,
+                Truncate(REPLY_MAX_LENGTH),
+            )
+        return pipeline
+
+    def add_game(self, game_id: int, bot_color: str, player1: str, player2: str):
+        game = self.games.add(game_id, self.game_prompt(bot_color, player1, player2), bot_color)
+        game.postprocess = self.reply_pipeline(bot_color)
+        return game
+
+    def start_game(self, game_id: int, bot_color: str, player1: str, player2: str) -> bool:
+        logging.info("Starting the game with the ID %s.", game_id, extra={"game_id": game_id})
+        self.add_game(game_id, bot_color, player1, player2)
+        if self.journal is not None:
+            try:
+                self.journal.record_start(game_id, bot_color, player1, player2)
+            except OSError as e:
+                # the game is played all the same; it is just not resumed after a restart
+                logging.error("Could not journal game %s: %s", game_id, e, extra={"game_id": game_id})
+                METRICS.inc('bot_journal_errors_total')
+        METRICS.set_gauge('bot_active_games', len(self.games))
         # Start the inactivity monitor for this game
         # self.start_silence_timer(game_id)
         return True
 
     def end_game(self, game_id: int) -> None:
-        logging.info(f"Ending the game with the ID {game_id}.")
-        self.active_games.discard(game_id)
-        del self.chat_store[game_id]
+        logging.info("Ending the game with the ID %s.", game_id, extra={"game_id": game_id})
+        self.games.pop(game_id)
+        if self.speculator is not None:
+            self.speculator.end_game(game_id)
+        if self.response_cache is not None:
+            self.response_cache.end_game(game_id)
+        if self.journal is not None:
+            self.journal.record_end(game_id)
+        METRICS.set_gauge('bot_active_games', len(self.games))
         # del self.silence_tasks[game_id]
 
+    def _on_game_evicted(self, game_id: int) -> None:
+        if self.speculator is not None:
+            self.speculator.end_game(game_id)
+        if self.response_cache is not None:
+            self.response_cache.end_game(game_id)
+        if self.journal is not None:
+            self.journal.record_end(game_id)
+        METRICS.inc('bot_evicted_games_total')
+        METRICS.set_gauge('bot_active_games', len(self.games))
+
+    def skip_reply(self, game_id: int, game) -> None:
+        game.not_responding += 1
+        if self.journal is not None:
+            self.journal.record_skip(game_id)
+
+    def restore_games(self) -> int:
+        """Resume the games recorded in the journal. Returns how many were resumed."""
+        if self.journal is None:
+            return 0
+        started = time.perf_counter()
+        journaled = self.journal.replay()
+        now = time.time()
+        for game_id, record in journaled.items():
+            game = self.add_game(game_id, record.bot_color, record.player1, record.player2)
+            game.not_responding = record.skips
+            game.started_at -= max(0.0, now - record.started_at)
+        # mostly ended games and skips: rewrite the journal with the live games only
+        if self.journal.replayed_records > 2 * len(journaled):
+            self.journal.compact()
+        METRICS.set_gauge('bot_active_games', len(self.games))
+        logging.info("Resumed %d games from the journal in %.1f ms.", len(journaled),
+                     (time.perf_counter() - started) * 1000)
+        return len(journaled)
+
     def calculate_typing_delay(self, message_length: int) -> float:
         # Base typing speed: 4 characters per second (240 chars per minute)
         # Add some randomness to make it more natural
-        chars_per_second = random.uniform(3.0, 5.0)
+        chars_per_second = self.rng.uniform(3.0, 5.0)
         
         # Calculate delay in seconds
         delay = message_length / chars_per_second
         
         # Add a small random "thinking time" between 0.5 and 2 seconds
-        thinking_time = random.uniform(0.5, 2.0)
+        thinking_time = self.rng.uniform(0.5, 2.0)
         
         # Cap maximum delay at 8 seconds to prevent too long waits
         total_delay = min(delay + thinking_time, 6.0)
         
         return total_delay
 
+    def admit(self, game_id: int, game, chat_history) -> bool:
+        """Under provider saturation, only messages addressed to the bot get a reply."""
+        if self.admission is None or self.admission.admit(is_addressed_to_bot(chat_history, game.bot_color)):
+            return True
+        logging.info("Provider is saturated; bot stays silent.", extra={"game_id": game_id})
+        return False
+
+    def provider_slot(self, game, chat_history):
+        """A provider slot; accusations, mentions and games close to their end go first."""
+        if self.admission is None:
+            return nullcontext()
+        remaining = self.game_duration - (self.games.clock() - game.started_at)
+        return self.admission.llm_slot(urgency(chat_history, game.bot_color, remaining, self.game_duration))
 
-    def on_message_groq(self, game_id: int, chat_history) -> str:
+    def wait_typing_delay(self, delay: float, cancel_event=None) -> bool:
+        """Sleep for the typing delay. Returns True if the request was cancelled meanwhile."""
+        if cancel_event is None:
+            time.sleep(delay)
+            return False
+        return cancel_event.wait(delay)
+
+
+    def on_message_groq(self, game_id: int, chat_history, cancel_event=None) -> str:
         logging.info('Inside the on_message_groq function')
-        random_int = random.randrange(100)
-        if random_int < 20 and self.bot_not_responding[game_id] < 3:
+        game = self.games.get(game_id)
+        if game is None:
+            logging.error("Game %s is not active.", game_id, extra={"game_id": game_id})
+            return ""
+        random_int = self.rng.randrange(100)
+        if random_int < 20 and game.not_responding < 3:
             logging.info("Bot will not respond at this time.")
-            self.bot_not_responding[game_id] += 1
+            METRICS.inc('bot_skips_total', provider='groq', model=self.model_name)
+            self.skip_reply(game_id, game)
             return ""
-        logging.info(f"On Message for the game with the ID {game_id}")
-        message = self.chat_store[game_id] + chat_history
-        logging.info(f"Bot send the data to Groq: {message}")
-        bot_color_ingame = self.bot_colors[game_id]
-        # logging.debug(f"### api key: {self.groq_api_key}")
-        logging.debug(f"### model name: {self.model_name}")
+        if not self.admit(game_id, game, chat_history):
+            return ""
+        logging.info("On Message for the game with the ID %s", game_id, extra={"game_id": game_id})
+        message = game.prompt + chat_history
+        if is_history_sampled(game_id):
+            logging.debug("Bot send the data to Groq: %s", message, extra={"game_id": game_id})
+        logging.debug("### model name: %s", self.model_name)
         try:
-            client = Groq(
-                api_key=self.groq_api_key,
-            )
-            chat_completion = client.chat.completions.create(
-                messages=message,
-                model=self.model_name,
-            )
-            logging.debug(f'0 - {chat_completion.choices[0]}')
-            logging.debug(f'1 - {chat_completion.choices[0].message}')
-            logging.debug(f'2 - {chat_completion.choices[0].message.content}')
-            answer = chat_completion.choices[0].message.content
-            logging.debug('#######')
-            logging.debug(answer)
-            logging.debug('#######')
-            logging.info(f'Bot\'s response: {answer}')
-            logging.debug(f'answer type is: {type(answer)}')
+            if cancel_event is not None and cancel_event.is_set():
+                return ""
+            client = self.get_groq_client()
+            with self.provider_slot(game, chat_history), \
+                    METRICS.timer('bot_phase_seconds', phase='provider', provider='groq', model=self.model_name):
+                chat_completion = client.chat.completions.create(
+                    messages=message,
+                    model=self.model_name,
+                    **self.generation_limits(chat_history)
+                )
+            self.count_tokens(chat_completion, 'groq')
+            answer = self.reply_text(chat_completion)
+            logging.info("Bot's response: %s", answer, extra={"game_id": game_id})
             if isinstance(answer, str): 
-                answer = answer.strip().replace("\n", "").replace(bot_color_ingame + ":", "").replace(bot_color_ingame, "")
-                modified_answer = self.introduce_typo(self.clear_blocked_words(answer))
-                delay = self.calculate_typing_delay(len(modified_answer))
-                logging.info(f'Applying typing delay of {delay:.2f} seconds for message length {len(modified_answer)}')
-                time.sleep(delay)
+                with METRICS.timer('bot_phase_seconds', phase='postprocess', provider='groq', model=self.model_name):
+                    modified_answer = game.postprocess(answer.strip())
+                    delay = self.calculate_typing_delay(len(modified_answer))
+                if not modified_answer:
+                    METRICS.inc('bot_empty_answers_total', provider='groq', model=self.model_name)
+                logging.info('Applying typing delay of %.2f seconds for message length %d', delay, len(modified_answer))
+                with METRICS.timer('bot_phase_seconds', phase='typing_delay', provider='groq', model=self.model_name):
+                    if self.wait_typing_delay(delay, cancel_event):
+                        return ""
                 return modified_answer
             else:
-                logging.error(f'Answer {answer} is not a string!')
+                logging.error('Answer %r is not a string!', answer)
+                METRICS.inc('bot_empty_answers_total', provider='groq', model=self.model_name)
                 return ""
         except Exception as e:
-            logging.error(f"Error making request to LLM API: {e}")
+            logging.error("Error making request to LLM API: %s", e, extra={"game_id": game_id})
+            METRICS.inc('bot_errors_total', provider='groq', model=self.model_name)
             return ""
              
 
-    def on_message_openai(self, game_id: int, chat_history) -> str:
-        logging.info('Inside the on_message_openai function')
-        random_int = random.randrange(100)
-            
-        logging.info(f"On Message for the game with the ID {game_id}")
-        message = self.chat_store[game_id] + chat_history
-        logging.info(f"Bot send the data to OpenAI: {message}")
-        bot_color_ingame = self.bot_colors[game_id]
-        # logging.debug(f"### api key: {self.openai_api_key}")
-        logging.debug(f"### model name: {self.model_name}")
-        
-        try:
-            client = OpenAI(
-                api_key=self.openai_api_key,
-            )
+    def style_prompt(self, chat_history) -> list:
+        """A developer message with human messages similar to the latest one, or nothing."""
+        if self.phrase_index is None or self.style_examples <= 0:
+            return []
+        text = last_user_message(chat_history)
+        if not text:
+            return []
+        with METRICS.timer('bot_phase_seconds', phase='retrieval'):
+            examples = self.phrase_index.query(text, self.style_examples)
+        if not examples:
+            return []
+        lines = "\n".join(f"- {example}" for example in examples)
+        return [{"role": "developer",
+                 "content": f"Messages human players wrote in similar conversations; match their tone and length, not their content:\n{lines}"}]
+
+    def generation_limits(self, chat_history) -> dict:
+        """max_tokens and stop sequences for a provider call; none without an output budget."""
+        if self.output_budget is None:
+            return {}
+        return self.output_budget.limits(chat_history)
+
+    def reply_text(self, chat_completion):
+        """The completion's text; one stopped by the output budget's max_tokens loses its unfinished word."""
+        choice = chat_completion.choices[0]
+        answer = choice.message.content
+        if self.output_budget is not None and isinstance(answer, str) and getattr(choice, 'finish_reason', None) == 'length':
+            METRICS.inc('bot_replies_cut_total', model=self.model_name)
+            return trim_cut(answer)
+        return answer
+
+    def count_tokens(self, chat_completion, provider: str) -> None:
+        usage = getattr(chat_completion, 'usage', None)
+        if usage is not None and usage.completion_tokens:
+            METRICS.inc('bot_completion_tokens_total', usage.completion_tokens, provider=provider, model=self.model_name)
+
+    def avoid_repetition(self, game, chat_history, answer: str) -> str:
+        """Ask again for a reply that repeats an earlier one; perturb it if the new reply repeats too."""
+        nudge = {"role": "developer", "content": f'You already said something like "{answer}". Say something different.'}
+        with METRICS.timer('bot_phase_seconds', phase='regenerate', provider='openai', model=self.model_name):
+            retry = self.complete_openai(game, chat_history + [nudge])
+        if isinstance(retry, str) and retry and not self.repetition.observe(retry):
+            METRICS.inc('bot_repetitions_total', action='regenerated')
+            return retry
+        METRICS.inc('bot_repetitions_total', action='perturbed')
+        return self.perturb(answer)
+
+    def perturb(self, message: str) -> str:
+        filler = self.rng.choice(['um', 'well', 'hmm', 'idk'])
+        return f"{filler}, {message[:1].lower()}{message[1:]}"
+
+    def complete_openai(self, game, chat_history, speculative: bool = False):
+        """One chat completion for the game's prompt and chat_history; the provider's raw reply."""
+        client = self.get_openai_client()
+        # Candidates take no provider slot and do not count towards saturation: their budget
+        # is the speculator's workers, and they are only started while the provider has room.
+        slot = nullcontext() if speculative else self.provider_slot(game, chat_history)
+        with slot, METRICS.timer('bot_phase_seconds', phase='speculation' if speculative else 'provider',
+                                 provider='openai', model=self.model_name):
             chat_completion = client.chat.completions.create(
-                messages=message,
+                messages=game.prompt + self.style_prompt(chat_history) + chat_history,
                 model=self.model_name,
                 timeout=8,
-                temperature=0.7  # Added temperature parameter (optional)
+                temperature=0.7,  # Added temperature parameter (optional)
+                **self.generation_limits(chat_history)
             )
+        self.count_tokens(chat_completion, 'openai')
+        return self.reply_text(chat_completion)
+
+    def speculate(self, game_id: int, chat_history) -> bool:
+        """Start a candidate reply while a player is typing (see turing_game_bot/speculation.py)."""
+        if self.speculator is None or not chat_history:
+            return False
+        game = self.games.get(game_id)
+        if game is None:
+            return False
+        if self.admission is not None and self.admission.is_saturated():
+            METRICS.inc('bot_speculations_total', outcome='shed')
+            return False
+        return self.speculator.speculate(game_id, chat_history)
+
+    def _speculative_reply(self, game_id: int, chat_history) -> str:
+        game = self.games.get(game_id)
+        if game is None:
+            return ""
+        return self.complete_openai(game, chat_history, speculative=True)
+
+    def on_message_openai(self, game_id: int, chat_history, cancel_event=None) -> str:
+        logging.info('Inside the on_message_openai function')
+        game = self.games.get(game_id)
+        if game is None:
+            logging.error("Game %s is not active.", game_id, extra={"game_id": game_id})
+            return ""
+        random_int = self.rng.randrange(100)
+        # a cached reply to the same conversation state, or a candidate generated while
+        # the player was typing, costs no provider call
+        answer = self.response_cache.get(game_id, chat_history, self.rng) if self.response_cache is not None else None
+        from_cache = answer is not None
+        if answer is None and self.speculator is not None:
+            answer = self.speculator.take(game_id, chat_history, game.bot_color)
+        if answer is None and not self.admit(game_id, game, chat_history):
+            return ""
             
-            logging.debug(f'0 - {chat_completion.choices[0]}')
-            logging.debug(f'1 - {chat_completion.choices[0].message}')
-            logging.debug(f'2 - {chat_completion.choices[0].message.content}')
-            answer = chat_completion.choices[0].message.content
-            
-            logging.debug('#######')
-            logging.debug(answer)
-            logging.debug('#######')
-            logging.info(f'Bot\'s response: {answer}')
-            logging.debug(f'answer type is: {type(answer)}')
+        logging.info("On Message for the game with the ID %s", game_id, extra={"game_id": game_id})
+        if is_history_sampled(game_id):
+            logging.debug("Bot send the data to OpenAI: %s", game.prompt + chat_history, extra={"game_id": game_id})
+        logging.debug("### model name: %s", self.model_name)
+        
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                return ""
+            from_provider = answer is None
+            if from_provider:
+                answer = self.complete_openai(game, chat_history)
+            # cached replies too: the same variant may already have gone out in other games
+            if isinstance(answer, str):
+                if self.repetition is not None and self.repetition.observe(answer):
+                    if from_cache:
+                        METRICS.inc('bot_response_cache_total', result='repeated')
+                    answer = self.avoid_repetition(game, chat_history, answer)
+                elif from_provider and self.response_cache is not None:
+                    self.response_cache.put(game_id, chat_history, answer)
+            logging.info("Bot's response: %s", answer, extra={"game_id": game_id})
             
             if isinstance(answer, str): 
-                answer = answer.replace("\n", "").replace(bot_color_ingame + ":", "").replace(bot_color_ingame, "")
-                modified_answer = self.introduce_typo(self.clear_blocked_words(answer))
-                delay = self.calculate_typing_delay(len(modified_answer))
-                logging.info(f'Applying typing delay of {delay:.2f} seconds for message length {len(modified_answer)}')
-                time.sleep(delay)
+                with METRICS.timer('bot_phase_seconds', phase='postprocess', provider='openai', model=self.model_name):
+                    modified_answer = game.postprocess(answer)
+                    delay = self.calculate_typing_delay(len(modified_answer))
+                if not modified_answer:
+                    METRICS.inc('bot_empty_answers_total', provider='openai', model=self.model_name)
+                logging.info('Applying typing delay of %.2f seconds for message length %d', delay, len(modified_answer))
+                with METRICS.timer('bot_phase_seconds', phase='typing_delay', provider='openai', model=self.model_name):
+                    if self.wait_typing_delay(delay, cancel_event):
+                        return ""
                 return modified_answer
             else:
-                logging.error(f'Answer {answer} is not a string!')
+                logging.error('Answer %r is not a string!', answer)
+                METRICS.inc('bot_empty_answers_total', provider='openai', model=self.model_name)
                 return ""
                 
         except Exception as e:
-            logging.error(f"Error making request to LLM API: {e}")
+            logging.error("Error making request to LLM API: %s", e, extra={"game_id": game_id})
+            METRICS.inc('bot_errors_total', provider='openai', model=self.model_name)
             return ""
 
     
@@ -248,12 +470,12 @@ class TuringBot:
 
         # Special case for question marks
         if message[-1] == '?':
-            if random.random() < 0.7:
+            if self.rng.random() < 0.7:
                 message = message[:-1]
 
         # Apply at most one type of typo
         for probability, typo_func in typo_functions:
-            if random.random() < probability:
+            if self.rng.random() < probability:
                 message = typo_func(message)
                 break
 
@@ -263,21 +485,21 @@ class TuringBot:
     def _swap_adjacent_chars(self, message):
         if len(message) < 2:
             return message
-        index = random.randint(0, len(message) - 2)
+        index = self.rng.randint(0, len(message) - 2)
         return message[:index] + message[index+1] + message[index] + message[index+2:]
 
     def _repeat_letter(self, message):
-        index = random.randint(0, len(message) - 1)
+        index = self.rng.randint(0, len(message) - 1)
         if not message[index].isalpha():  # Only repeat letters, not spaces or punctuation
             return message
-        repeat_count = random.randint(2, 3)  # Repeat 2-3 times
+        repeat_count = self.rng.randint(2, 3)  # Repeat 2-3 times
         return message[:index] + message[index] * repeat_count + message[index+1:]
 
     def _remove_space(self, message):
         spaces = [i for i, char in enumerate(message) if char == ' ']
         if not spaces:
             return message
-        space_to_remove = random.choice(spaces)
+        space_to_remove = self.rng.choice(spaces)
         return message[:space_to_remove] + message[space_to_remove+1:]
 
     def _add_space(self, message):
@@ -287,7 +509,7 @@ class TuringBot:
                         if not (message[i-1].isspace() or message[i].isspace())]
         if not valid_positions:
             return message
-        position = random.choice(valid_positions)
+        position = self.rng.choice(valid_positions)
         return message[:position] + ' ' + message[position:]
 
     def _remove_letter(self, message):
@@ -295,7 +517,7 @@ class TuringBot:
                 if char.isalpha() and i > 0 and i < len(message)-1]
         if not letters:
             return message
-        letter_to_remove = random.choice(letters)
+        letter_to_remove = self.rng.choice(letters)
         return message[:letter_to_remove] + message[letter_to_remove+1:]
 
     def _double_punctuation(self, message):
@@ -303,7 +525,7 @@ class TuringBot:
                     if char in '.,!?']
         if not punctuation:
             return message
-        punct_index = random.choice(punctuation)
+        punct_index = self.rng.choice(punctuation)
         return message[:punct_index] + message[punct_index] * 2 + message[punct_index+1:]
 
     def _capitalize_random(self, message):
@@ -311,13 +533,13 @@ class TuringBot:
                 if char.isalpha() and i > 0]  # Skip first letter
         if not letters:
             return message
-        index = random.choice(letters)
+        index = self.rng.choice(letters)
         return message[:index] + message[index].upper() + message[index+1:]
     
     def add_filler_words(self, message):
         filler_words = ['um', 'well'] # 'like',]
-        if random.random() < 0.1:  # 20% chance of adding a filler
-            message = random.choice(filler_words) + ', ' + message
+        if self.rng.random() < 0.1:  # 20% chance of adding a filler
+            message = self.rng.choice(filler_words) + ', ' + message
         return message
 
     def is_message_accusing(self, message: str) -> bool:
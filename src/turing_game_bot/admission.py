@@ -0,0 +1,132 @@
+"""
+Admission control and priority scheduling for LLM calls of the bot service.
+
+At most `max_in_flight` provider calls run at once; further requests wait for
+a slot, and a freed slot goes to the most urgent waiter rather than the oldest.
+Waiting raises a request's priority (aging), so chatter is delayed but never
+starved. While the provider is saturated (every slot busy or someone already
+waiting), replies nobody asked for are shed - the bot stays silent, which it
+does anyway for a share of messages - and messages that address the bot are
+always served.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import heapq
+import itertools
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from turing_game_bot.metrics import METRICS
+
+# Words that ask about, or accuse, a player of being the bot.
+BOT_QUESTION_PATTERN = re.compile(r"\b(bot|bots|ai|robot|human|chatgpt|gpt)\b|type[sd]? (too )?fast", re.IGNORECASE)
+
+# Urgency weights: an accusation outranks a mention, and the last minute of a
+# game adds up to TIME_PRESSURE_WEIGHT.
+ACCUSATION_WEIGHT = 3.0
+MENTION_WEIGHT = 2.0
+TIME_PRESSURE_WEIGHT = 2.0
+# Priority gained per second of waiting.
+AGING_RATE = 0.1
+
+
+def last_user_message(chat_history) -> str:
+    for message in reversed(chat_history or []):
+        if message.get("role") == "user":
+            content = message.get("content", "")
+            # messages look like "Blue: are you the bot?"; the sender's color is not an address
+            _, _, text = content.partition(": ")
+            return text or content
+    return ""
+
+
+def mentions_color(text: str, bot_color: str) -> bool:
+    return bool(bot_color) and bot_color.lower() in text.lower()
+
+
+def asks_about_bot(text: str) -> bool:
+    return BOT_QUESTION_PATTERN.search(text) is not None
+
+
+def is_addressed_to_bot(chat_history, bot_color: str) -> bool:
+    """True if the latest human message names the bot's color or asks who the bot is."""
+    text = last_user_message(chat_history)
+    return mentions_color(text, bot_color) or asks_about_bot(text)
+
+
+def urgency(chat_history, bot_color: str, remaining: float = None, duration: float = 300.0) -> float:
+    """Priority of a reply: accusation, mention of the bot's color, and little time left."""
+    text = last_user_message(chat_history)
+    score = 0.0
+    if asks_about_bot(text):
+        score += ACCUSATION_WEIGHT
+    if mentions_color(text, bot_color):
+        score += MENTION_WEIGHT
+    if remaining is not None and duration > 0:
+        score += TIME_PRESSURE_WEIGHT * (1.0 - min(max(remaining / duration, 0.0), 1.0))
+    return score
+
+
+class AdmissionController:
+
+    def __init__(self, max_in_flight: int = 8, aging_rate: float = AGING_RATE, clock=time.monotonic):
+        self.max_in_flight = max_in_flight
+        self.aging_rate = aging_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        # (-(priority - aging_rate * enqueue_time), seq, event): with the same
+        # aging rate for everyone, this static key orders waiters by
+        # priority + aging_rate * time waited.
+        self._waiters = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def is_saturated(self) -> bool:
+        return self.in_flight >= self.max_in_flight or self.queued > 0
+
+    def admit(self, addressed: bool) -> bool:
+        """Decide whether a reply is worth an LLM call at the current load."""
+        with self._lock:
+            saturated = self.is_saturated()
+        if saturated and not addressed:
+            METRICS.inc('bot_shed_requests_total')
+            return False
+        return True
+
+    @contextmanager
+    def llm_slot(self, priority: float = 0.0):
+        """Hold one of the provider slots for the duration of the `with` block."""
+        self._acquire(priority)
+        METRICS.set_gauge('bot_llm_in_flight', self.in_flight)
+        try:
+            yield
+        finally:
+            self._release()
+            METRICS.set_gauge('bot_llm_in_flight', self.in_flight)
+
+    def _acquire(self, priority: float) -> None:
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                return
+            event = threading.Event()
+            key = -(priority - self.aging_rate * self.clock())
+            heapq.heappush(self._waiters, (key, next(self._seq), event))
+            METRICS.set_gauge('bot_llm_queue_depth', len(self._waiters))
+        # the releasing thread hands its slot over, so in_flight is already counted
+        event.wait()
+
+    def _release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                _, _, event = heapq.heappop(self._waiters)
+                METRICS.set_gauge('bot_llm_queue_depth', len(self._waiters))
+                event.set()
+            else:
+                self.in_flight -= 1
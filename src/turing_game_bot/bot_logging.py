@@ -0,0 +1,151 @@
+"""
+Logging setup for the bot service.
+
+Records are handed to a bounded queue on the request thread and formatted and
+written by a single QueueListener thread, so neither message formatting nor a
+slow disk is paid for by a /response call. When the queue is full the record is
+dropped and counted rather than blocking the request.
+Messages use lazy %-style arguments and are rendered as one JSON object per line.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from turing_game_bot.metrics import METRICS
+
+LOG_DIR = os.getenv("BOT_LOG_DIR", "/usr/src/app/bot/logs")
+LOG_LEVEL = os.getenv("BOT_LOG_LEVEL", "DEBUG")
+# Fraction of games whose full chat history is dumped on every message.
+HISTORY_SAMPLE_RATE = float(os.getenv("BOT_HISTORY_SAMPLE_RATE", "0.1"))
+# Records waiting for the listener; beyond this they are dropped.
+LOG_QUEUE_SIZE = int(os.getenv("BOT_LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+_log_file_name = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single JSON line, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records as they are, leaving all formatting to the listener.
+
+    The stdlib QueueHandler renders `msg % args` and the traceback in prepare(),
+    on the calling thread, so that records can be pickled. The queue never leaves
+    this process, so the record is forwarded untouched. A full queue drops the
+    record and counts it in bot_log_dropped_total.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.inc("bot_log_dropped_total", level=record.levelname)
+
+
+class DeferredQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room for the sentinel in a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(log_file_name: str, level: str = LOG_LEVEL) -> QueueListener:
+    """Route the root logger through a queue to the rotating file and stdout.
+
+    Calling this more than once replaces the previous listener, so importing
+    several modules that configure logging does not duplicate output.
+    """
+    global _listener, _log_file_name
+    if _listener is not None:
+        _listener.stop()
+    _log_file_name = log_file_name
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    try:
+        handlers.append(
+            RotatingFileHandler(
+                os.path.join(LOG_DIR, log_file_name),
+                maxBytes=8 * 1024 * 1024,  # 8MB per file
+                backupCount=5,  # Keep 5 backup files
+                delay=True))
+    except OSError as e:
+        logging.getLogger(__name__).warning("File logging disabled: %s", e)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    # Remove any existing handlers (to avoid duplicates)
+    root_logger.handlers = [DeferredQueueHandler(log_queue)]
+
+    _listener = DeferredQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_after_fork() -> None:
+    """Start a fresh listener in a forked worker.
+
+    The listener thread of the parent does not survive fork(), so with gunicorn's
+    preload_app each worker must call this from the post_fork hook.
+    """
+    global _listener
+    _listener = None
+    if _log_file_name is not None:
+        setup_logging(_log_file_name)
+
+
+atexit.register(stop_logging)
+
+
+def is_history_sampled(game_id, rate: float = None) -> bool:
+    """Decide once per game whether its full history is worth logging.
+
+    The decision is a hash of the game id, so every worker agrees on it and a
+    sampled game is logged completely rather than in fragments.
+    """
+    rate = HISTORY_SAMPLE_RATE if rate is None else rate
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    return zlib.crc32(str(game_id).encode()) % 10000 < rate * 10000
@@ -0,0 +1,235 @@
+"""
+Record/replay of LLM provider calls, for deterministic and offline runs.
+
+While a Cassette is installed, chat completions made through the OpenAI and
+Groq SDKs and `requests.post` calls (Ollama) are keyed by a hash of the request
+(provider, URL path, model, messages and parameters). In record mode the real
+call is made and its reply stored; in replay mode the stored reply is returned
+without touching the network, and a request that was never recorded raises
+CassetteMiss. Identical requests are answered in the order they were recorded.
+Streamed completions (stream=True) are not supported and raise ValueError.
+The cassette file is zlib-compressed JSON.
+
+The bots also draw skips, typos and typing delays from `random`; seed it (or
+pass `rng=random.Random(seed)` to TuringBot) so a replay takes the same path.
+
+usage:
+  python -m turing_game_bot.cassette record --cassette games.cassette script.py [args...]
+  python -m turing_game_bot.cassette replay --cassette games.cassette --repeat 10 --skip-sleep script.py [args...]
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+
+
+class CassetteMiss(KeyError):
+    """A request in replay mode that the cassette has no recording for."""
+
+
+def request_key(provider: str, request: dict) -> str:
+    canonical = json.dumps({"provider": provider, **request}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def _completion(recorded: dict):
+    """An object shaped like an SDK ChatCompletion, from a recorded reply."""
+    message = SimpleNamespace(role="assistant", content=recorded["content"])
+    choice = SimpleNamespace(index=0, message=message, finish_reason=recorded.get("finish_reason"))
+    usage = SimpleNamespace(**recorded["usage"]) if recorded.get("usage") else None
+    return SimpleNamespace(choices=[choice], model=recorded.get("model"), usage=usage)
+
+
+class _Response:
+    """The parts of requests.Response the bots use."""
+
+    def __init__(self, recorded: dict):
+        self.status_code = recorded["status"]
+        self.text = recorded["text"]
+        self.ok = self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            import requests
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error (replayed)", response=self)
+
+
+class Cassette:
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._interactions = defaultdict(list)  # request key -> replies in recording order
+        self._cursor = defaultdict(int)  # request key -> next reply to replay
+        self._patches = []
+        if mode == "replay":
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path, "rb") as file:
+            data = json.loads(zlib.decompress(file.read()))
+        self._interactions = defaultdict(list, data["interactions"])
+        self.rewind()
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps({"version": 1, "interactions": self._interactions}, separators=(",", ":"))
+        with open(self.path, "wb") as file:
+            file.write(zlib.compress(data.encode(), 9))
+
+    def rewind(self) -> None:
+        """Replay from the first recorded reply again."""
+        with self._lock:
+            self._cursor.clear()
+
+    def __len__(self) -> int:
+        return sum(len(replies) for replies in self._interactions.values())
+
+    def _replay(self, key: str, description: str) -> dict:
+        with self._lock:
+            replies = self._interactions.get(key)
+            if not replies:
+                raise CassetteMiss(f"No recording for {description} (key {key})")
+            index = self._cursor[key]
+            self._cursor[key] = index + 1
+            # a replay asking more often than the recording repeats the last reply
+            return replies[min(index, len(replies) - 1)]
+
+    def _record(self, key: str, recorded: dict) -> None:
+        with self._lock:
+            self._interactions[key].append(recorded)
+
+    def _chat_create(self, provider: str, original):
+        cassette = self
+
+        def create(completions, *args, **kwargs):
+            if kwargs.get("stream"):
+                raise ValueError(f"Cassettes do not support streaming: {provider} completion called with stream=True")
+            request = {k: v for k, v in kwargs.items() if k not in ("timeout", "extra_headers")}
+            key = request_key(provider, request)
+            if cassette.mode == "replay":
+                return _completion(cassette._replay(key, f"{provider} {kwargs.get('model')}"))
+            response = original(completions, *args, **kwargs)
+            usage = getattr(response, "usage", None)
+            cassette._record(key, {
+                "content": response.choices[0].message.content,
+                "finish_reason": response.choices[0].finish_reason,
+                "model": getattr(response, "model", None),
+                "usage": usage.model_dump() if hasattr(usage, "model_dump") else None,
+            })
+            return response
+
+        return create
+
+    def _requests_post(self, original):
+        cassette = self
+
+        def post(url, data=None, json=None, **kwargs):
+            from urllib.parse import urlsplit
+            # the path, not the host: a recording made against one Ollama replays against any
+            key = request_key("http", {"path": urlsplit(url).path, "json": json, "data": data})
+            if cassette.mode == "replay":
+                return _Response(cassette._replay(key, f"POST {url}"))
+            response = original(url, data=data, json=json, **kwargs)
+            cassette._record(key, {"status": response.status_code, "text": response.text})
+            return response
+
+        return post
+
+    def install(self) -> "Cassette":
+        """Patch the provider SDKs and requests that are installed."""
+        for module_name, provider in (("openai.resources.chat.completions", "openai"),
+                                      ("groq.resources.chat.completions", "groq")):
+            try:
+                module = __import__(module_name, fromlist=["Completions"])
+            except ImportError:
+                continue
+            original = module.Completions.create
+            self._patches.append((module.Completions, "create", original))
+            module.Completions.create = self._chat_create(provider, original)
+        try:
+            import requests
+        except ImportError:
+            pass
+        else:
+            self._patches.append((requests, "post", requests.post))
+            requests.post = self._requests_post(requests.post)
+        return self
+
+    def uninstall(self) -> None:
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+        if self.mode == "record":
+            self.save()
+
+    def __enter__(self) -> "Cassette":
+        return self.install()
+
+    def __exit__(self, *exc_info) -> None:
+        self.uninstall()
+
+
+def main(argv=None) -> int:
+    import argparse
+    import random
+    import runpy
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Run a script with LLM calls recorded to, or replayed from, a cassette")
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the global random module for every run")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the script this many times")
+    parser.add_argument("--skip-sleep", action="store_true",
+                        help="make time.sleep return at once in the script's thread (typing delays, backoffs)")
+    parser.add_argument("--profile", type=str, default=None, help="write cProfile stats of the runs to this file")
+    parser.add_argument("script")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    if args.skip_sleep:
+        # only the script's own thread: background threads (sweepers, flushers) keep their pace
+        sleep, main_thread = time.sleep, threading.main_thread()
+        time.sleep = lambda seconds: None if threading.current_thread() is main_thread else sleep(seconds)
+    cassette = Cassette(args.cassette, args.mode)
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    runs = 1 if args.mode == "record" else args.repeat
+    with cassette:
+        for run in range(runs):
+            random.seed(args.seed)
+            cassette.rewind()
+            sys.argv = [args.script] + args.script_args
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                runpy.run_path(args.script, run_name="__main__")
+            finally:
+                if profiler:
+                    profiler.disable()
+            print(f"[cassette] {args.mode} run {run + 1}/{runs}: {time.perf_counter() - started:.3f}s, "
+                  f"{len(cassette)} recorded replies", file=sys.stderr)
+    if profiler:
+        profiler.dump_stats(args.profile)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""
+Per-game request coalescing for the bot service.
+
+Only the newest /response request of a game is worth answering: the server
+drops back-to-back bot messages, so older answers are wasted provider calls.
+Each request waits a short debounce window; a newer request for the same game
+supersedes it, during the window or while it is still generating.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import threading
+
+from turing_game_bot.metrics import METRICS
+
+
+class RequestCoalescer:
+
+    def __init__(self, window: float = 0.75):
+        self.window = window
+        self._lock = threading.Lock()
+        self._latest = {}  # game_id -> cancel event of the newest request
+
+    def submit(self, game_id, chat_history, generate) -> str:
+        """Run `generate(game_id, chat_history, cancel_event=...)` unless superseded.
+
+        Returns "" when a newer request for the same game arrives first, which the
+        server already treats as "the bot stays silent".
+        """
+        cancel_event = threading.Event()
+        with self._lock:
+            previous = self._latest.get(game_id)
+            if previous is not None:
+                previous.set()
+            self._latest[game_id] = cancel_event
+
+        if cancel_event.wait(self.window):
+            logging.info("Request superseded during the debounce window.", extra={"game_id": game_id})
+            METRICS.inc('bot_coalesced_requests_total', stage='debounce')
+            return ""
+
+        try:
+            response = generate(game_id, chat_history, cancel_event=cancel_event)
+        finally:
+            with self._lock:
+                if self._latest.get(game_id) is cancel_event:
+                    del self._latest[game_id]
+
+        if cancel_event.is_set():
+            logging.info("Request superseded while generating.", extra={"game_id": game_id})
+            METRICS.inc('bot_coalesced_requests_total', stage='in_flight')
+            return ""
+        return response
+
+    def end_game(self, game_id) -> None:
+        with self._lock:
+            cancel_event = self._latest.pop(game_id, None)
+        if cancel_event is not None:
+            cancel_event.set()
@@ -0,0 +1,113 @@
+"""
+Per-game state of the TuringBot with bounded memory.
+
+Games that are abandoned never receive /end-game, so every game records its
+last activity. A sweeper drops games idle for longer than the TTL, and the
+store never holds more than `max_games`: the least recently active game is
+evicted first.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class GameState:
+    __slots__ = ("prompt", "bot_color", "postprocess", "not_responding", "started_at", "last_activity")
+
+    def __init__(self, prompt: list, bot_color: str, now: float):
+        self.prompt = prompt  # [system message] prepended to every chat history
+        self.bot_color = bot_color
+        self.postprocess = None  # reply cleanup Pipeline, set by the bot
+        self.not_responding = 0
+        self.started_at = now
+        self.last_activity = now
+
+
+class GameStateStore:
+
+    def __init__(self, ttl: float = 1800.0, max_games: int = 10000, sweep_interval: float = 60.0,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.max_games = max_games
+        self.sweep_interval = sweep_interval  # None disables the background sweeper
+        self.clock = clock
+        # called with the game id of every game removed by TTL or the cap
+        self.eviction_listeners = []
+        self._lock = threading.Lock()
+        self._games = OrderedDict()  # least recently active first
+        self._sweeper = None
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id) -> bool:
+        return game_id in self._games
+
+    def add(self, game_id, prompt: list, bot_color: str) -> GameState:
+        self._ensure_sweeper()
+        state = GameState(prompt, bot_color, self.clock())
+        with self._lock:
+            self._games.pop(game_id, None)
+            self._games[game_id] = state
+            evicted = []
+            while len(self._games) > self.max_games:
+                evicted.append(self._games.popitem(last=False)[0])
+        for evicted_id in evicted:
+            logging.warning("Game %s evicted: more than %d active games.", evicted_id, self.max_games,
+                            extra={"game_id": evicted_id})
+            self._notify(evicted_id)
+        return state
+
+    def get(self, game_id):
+        """Return the game's state and mark it active, or None if it is unknown."""
+        with self._lock:
+            state = self._games.get(game_id)
+            if state is not None:
+                state.last_activity = self.clock()
+                self._games.move_to_end(game_id)
+        return state
+
+    def pop(self, game_id):
+        with self._lock:
+            return self._games.pop(game_id, None)
+
+    def sweep(self) -> int:
+        """Drop every game idle for longer than the TTL. Returns how many were dropped."""
+        deadline = self.clock() - self.ttl
+        expired = []
+        with self._lock:
+            # ordered by last activity, so expired games are all at the front
+            for game_id, state in self._games.items():
+                if state.last_activity > deadline:
+                    break
+                expired.append(game_id)
+            for game_id in expired:
+                del self._games[game_id]
+        for game_id in expired:
+            logging.info("Game %s expired after %.0f seconds of inactivity.", game_id, self.ttl,
+                         extra={"game_id": game_id})
+            self._notify(game_id)
+        return len(expired)
+
+    def _ensure_sweeper(self) -> None:
+        # Started lazily (and again after fork, where the thread does not survive).
+        if self.sweep_interval is None or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(self.sweep_interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logging.error("Game state sweep failed: %s", e)
+
+        self._sweeper = threading.Thread(target=run, name="game-state-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _notify(self, game_id) -> None:
+        for listener in self.eviction_listeners:
+            listener(game_id)
@@ -0,0 +1,64 @@
+"""
+Consistent hashing of game ids onto bot processes.
+
+Every node is placed on the ring at `replicas` virtual points; a game belongs to
+the first point clockwise from its hash. Adding or removing one of N nodes
+moves only about 1/N of the games.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import bisect
+import hashlib
+import threading
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+
+    def __init__(self, nodes=(), replicas: int = 256):
+        self.replicas = replicas
+        self._lock = threading.Lock()
+        self._points = []  # sorted hashes
+        self._owners = []  # node of the point at the same index
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list:
+        return sorted(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(self, node: str) -> None:
+        with self._lock:
+            if node in self._nodes:
+                return
+            self._nodes.add(node)
+            for i in range(self.replicas):
+                point = _hash(f"{node}#{i}")
+                index = bisect.bisect(self._points, point)
+                self._points.insert(index, point)
+                self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        with self._lock:
+            if node not in self._nodes:
+                return
+            self._nodes.discard(node)
+            kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+            self._points = [p for p, _ in kept]
+            self._owners = [o for _, o in kept]
+
+    def get(self, key) -> str:
+        """The node owning `key`, or None if the ring is empty."""
+        point = _hash(str(key))
+        with self._lock:
+            if not self._points:
+                return None
+            index = bisect.bisect(self._points, point) % len(self._points)
+            return self._owners[index]
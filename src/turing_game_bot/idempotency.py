@@ -0,0 +1,80 @@
+"""
+Idempotent /response handling.
+
+The same chat state can be posted more than once (server retries, client
+reconnects). Requests are keyed by game and chat state; a repeated key returns
+the cached reply, or waits for the computation that is already running,
+instead of paying for another LLM call.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from turing_game_bot.metrics import METRICS
+
+
+class _Entry:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = ""
+
+
+def make_idempotency_key(chat_history) -> str:
+    """Message count plus a digest of the history, for clients that send no key."""
+    digest = hashlib.blake2b(json.dumps(chat_history, sort_keys=True).encode(), digest_size=8)
+    return f"{len(chat_history)}:{digest.hexdigest()}"
+
+
+class IdempotentResponses:
+
+    def __init__(self, max_entries_per_game: int = 8):
+        self.max_entries_per_game = max_entries_per_game
+        self._lock = threading.Lock()
+        self._games = {}  # game_id -> OrderedDict(key -> _Entry), least recent first
+
+    def get_or_compute(self, game_id, key: str, compute) -> str:
+        """Return the reply for (game_id, key), calling `compute()` at most once."""
+        with self._lock:
+            entries = self._games.get(game_id)
+            if entries is None:
+                entries = self._games[game_id] = OrderedDict()
+            entry = entries.get(key)
+            is_owner = entry is None
+            if is_owner:
+                entry = entries[key] = _Entry()
+                while len(entries) > self.max_entries_per_game:
+                    entries.popitem(last=False)
+            else:
+                entries.move_to_end(key)
+
+        if not is_owner:
+            METRICS.inc('bot_idempotent_hits_total', state='cached' if entry.done.is_set() else 'in_flight')
+            entry.done.wait()
+            return entry.result
+
+        try:
+            entry.result = compute()
+        finally:
+            # Failures and silent replies are not cached: the server polls the same
+            # history again later and should get a fresh chance at an answer.
+            if not entry.result:
+                self._discard(game_id, key, entry)
+            entry.done.set()
+        return entry.result
+
+    def _discard(self, game_id, key: str, entry: _Entry) -> None:
+        with self._lock:
+            entries = self._games.get(game_id)
+            if entries is not None and entries.get(key) is entry:
+                del entries[key]
+                if not entries:
+                    del self._games[game_id]
+
+    def end_game(self, game_id) -> None:
+        with self._lock:
+            self._games.pop(game_id, None)
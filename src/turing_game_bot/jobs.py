@@ -0,0 +1,113 @@
+"""
+Asynchronous /response jobs.
+
+In async mode the bot answers /response with 202 and a job id right away and
+generates in a background thread, so the server's connection is not held open
+for the provider call and the typing delay. The finished reply is POSTed to the
+request's callback URL, and can also be polled at /result/<job_id>.
+
+Callbacks only go to http(s) URLs on the hosts in `callback_hosts`, without
+following redirects, so a request cannot make the bot POST to arbitrary
+internal addresses.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from turing_game_bot.metrics import METRICS
+
+
+class Job:
+    __slots__ = ("game_id", "done", "response")
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.done = False
+        self.response = ""
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None  # a redirect would lead the callback off the allowed hosts
+
+
+class JobStore:
+
+    def __init__(self, max_workers: int = 16, max_jobs: int = 10000, callback_attempts: int = 3,
+                 callback_timeout: float = 5.0, callback_hosts=()):
+        self.max_jobs = max_jobs
+        self.callback_attempts = callback_attempts
+        self.callback_timeout = callback_timeout
+        self.callback_hosts = {host.lower() for host in callback_hosts}
+        self._opener = urllib.request.build_opener(_NoRedirect)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-job")
+        self._lock = threading.Lock()
+        # Oldest first. Beyond max_jobs the oldest finished jobs are dropped; pending ones
+        # are kept until they finish, so the store exceeds max_jobs while more are queued.
+        self._jobs = OrderedDict()
+
+    def allows_callback(self, callback_url: str) -> bool:
+        """Whether replies may be POSTed to `callback_url`: http(s) on one of `callback_hosts`."""
+        try:
+            url = urlsplit(callback_url)
+            hostname = url.hostname
+        except ValueError:
+            return False
+        return url.scheme in ("http", "https") and hostname is not None and hostname in self.callback_hosts
+
+    def submit(self, game_id, compute, callback_url: str = None) -> str:
+        job_id = uuid.uuid4().hex
+        job = Job(game_id)
+        with self._lock:
+            self._jobs[job_id] = job
+            excess = len(self._jobs) - self.max_jobs
+            if excess > 0:
+                finished = []
+                for old_id, old in self._jobs.items():
+                    if old.done:
+                        finished.append(old_id)
+                        if len(finished) == excess:
+                            break
+                for old_id in finished:
+                    del self._jobs[old_id]
+        METRICS.inc('bot_async_jobs_total')
+        self._executor.submit(self._run, job_id, job, compute, callback_url)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job_id: str, job: Job, compute, callback_url: str) -> None:
+        try:
+            job.response = compute()
+        except Exception as e:
+            logging.error("Job %s failed: %s", job_id, e, extra={"game_id": job.game_id})
+            job.response = ""
+        job.done = True
+        if callback_url and self.allows_callback(callback_url):
+            self._deliver(job_id, job, callback_url)
+
+    def _deliver(self, job_id: str, job: Job, callback_url: str) -> None:
+        body = json.dumps({"job_id": job_id, "game_id": job.game_id, "response": job.response}).encode()
+        for attempt in range(self.callback_attempts):
+            try:
+                request = urllib.request.Request(callback_url, data=body, method='POST',
+                                                 headers={'Content-Type': 'application/json'})
+                with self._opener.open(request, timeout=self.callback_timeout):
+                    return
+            except OSError as e:
+                logging.warning("Callback for job %s failed (attempt %d): %s", job_id, attempt + 1, e,
+                                extra={"game_id": job.game_id})
+                if attempt + 1 < self.callback_attempts:
+                    time.sleep(0.5 * 2 ** attempt)
+        METRICS.inc('bot_async_callback_failures_total')
@@ -0,0 +1,247 @@
+"""
+Append-only journal of per-game state, replayed when the bot process starts.
+
+Every state change of a game (start, skipped reply, end) is one small binary
+record: a header with the CRC32 of the record, the payload length and the record
+type, followed by length-prefixed fields. Records are buffered and written by a
+flusher thread that fsyncs once per `fsync_interval`, so many changes share one
+fsync. `record_start` waits for its batch to be on disk - a game the server was
+told is started survives a crash; losing the last skip counts does not matter.
+If the write or fsync fails, `record_start` raises the OSError instead of
+waiting; the flusher keeps the records and retries.
+
+On start-up `replay` reads the journal and stops at a torn or corrupt tail
+record. The journal keeps the live games in memory, and `compact` rewrites the
+file with only those; the flusher compacts whenever the file grows past
+`compact_bytes`.
+
+A journal file belongs to one process: gunicorn.conf.py refuses more than one
+worker while the journal is enabled.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+START, SKIP, END = 1, 2, 3
+
+_HEADER = struct.Struct("<IHB")  # crc32 of type + payload, payload length, record type
+_LENGTH = struct.Struct("<H")
+_INT_ID = struct.Struct("<q")
+_TIME = struct.Struct("<d")
+
+
+class JournaledGame:
+    __slots__ = ("bot_color", "player1", "player2", "started_at", "skips")
+
+    def __init__(self, bot_color: str, player1: str, player2: str, started_at: float, skips: int = 0):
+        self.bot_color = bot_color
+        self.player1 = player1
+        self.player2 = player2
+        self.started_at = started_at  # wall clock, time.time()
+        self.skips = skips
+
+
+def _pack_str(value) -> bytes:
+    data = ("" if value is None else str(value)).encode()
+    return _LENGTH.pack(len(data)) + data
+
+
+def _unpack_str(payload: bytes, offset: int):
+    (length,) = _LENGTH.unpack_from(payload, offset)
+    offset += _LENGTH.size
+    return payload[offset:offset + length].decode(), offset + length
+
+
+def _pack_game_id(game_id) -> bytes:
+    # the server sends integer ids; anything else is kept as a string
+    if isinstance(game_id, int):
+        return b"i" + _INT_ID.pack(game_id)
+    return b"s" + _pack_str(game_id)
+
+
+def _unpack_game_id(payload: bytes, offset: int):
+    if payload[offset:offset + 1] == b"i":
+        return _INT_ID.unpack_from(payload, offset + 1)[0], offset + 1 + _INT_ID.size
+    return _unpack_str(payload, offset + 1)
+
+
+def encode_record(record_type: int, payload: bytes) -> bytes:
+    crc = zlib.crc32(payload, zlib.crc32(bytes((record_type,))))
+    return _HEADER.pack(crc, len(payload), record_type) + payload
+
+
+def encode_start(game_id, game: JournaledGame) -> bytes:
+    return encode_record(START, _pack_game_id(game_id) + _TIME.pack(game.started_at) + _pack_str(game.bot_color)
+                         + _pack_str(game.player1) + _pack_str(game.player2) + bytes((min(game.skips, 255),)))
+
+
+def decode_records(data: bytes):
+    """Yield (record_type, game_id, payload, offset) and stop at the first damaged record.
+
+    The offset of each record's end is included so the caller knows how much of
+    the file is intact.
+    """
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        crc, length, record_type = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(bytes((record_type,)))) != crc:
+            return
+        game_id, field_offset = _unpack_game_id(payload, 0)
+        offset = start + length
+        yield record_type, game_id, payload[field_offset:], offset
+
+
+class GameJournal:
+
+    def __init__(self, path: str, fsync_interval: float = 0.05, compact_bytes: int = 4 << 20):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes  # the flusher compacts a file grown past this; 0 never does
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._buffer = bytearray()
+        self._written = 0  # records appended to the buffer
+        self._durable = 0  # records known to be fsynced
+        self._failure = None  # (records appended, OSError) of the last failed flush
+        self._live = {}  # game_id -> JournaledGame, what compact() writes
+        self._flusher = None
+        self.replayed_records = 0  # records read by the last replay
+
+    def record_start(self, game_id, bot_color: str, player1: str, player2: str, wait: bool = True) -> None:
+        """Journal a started game; with `wait`, return once it is on disk. Raises OSError if writing failed."""
+        game = JournaledGame(bot_color, player1, player2, time.time())
+        self._append(encode_start(game_id, game), wait, lambda: self._live.__setitem__(game_id, game))
+
+    def record_skip(self, game_id) -> None:
+        def count():
+            if game_id in self._live:
+                self._live[game_id].skips += 1
+        self._append(encode_record(SKIP, _pack_game_id(game_id)), False, count)
+
+    def record_end(self, game_id) -> None:
+        self._append(encode_record(END, _pack_game_id(game_id)), False, lambda: self._live.pop(game_id, None))
+
+    def _append(self, record: bytes, wait: bool, update) -> None:
+        self._ensure_flusher()
+        with self._lock:
+            update()
+            self._buffer += record
+            self._written += 1
+            sequence = self._written
+            if wait:
+                while self._durable < sequence:
+                    if self._failure is not None and self._failure[0] >= sequence:
+                        raise self._failure[1]
+                    self._flushed.wait()
+
+    def sync(self) -> None:
+        """Write and fsync everything appended so far."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        written = self._written
+        if self._buffer:
+            try:
+                self._file.write(self._buffer)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                # wake the waiters with the error; the buffer is kept and written again next time
+                self._failure = (written, e)
+                self._flushed.notify_all()
+                raise
+            self._size += len(self._buffer)
+            self._buffer.clear()
+        self._durable = written
+        self._failure = None
+        self._flushed.notify_all()
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily, so it runs in the gunicorn worker rather than the master.
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(self.fsync_interval)
+                try:
+                    with self._lock:
+                        if self._durable < self._written:
+                            self._flush_locked()
+                    if self.compact_bytes and self._size > self.compact_bytes:
+                        self.compact()
+                except OSError as e:
+                    logging.error("Game journal write failed: %s", e)
+
+        self._flusher = threading.Thread(target=run, name="game-journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def replay(self) -> dict:
+        """Read the journal and return the live games, game_id -> JournaledGame."""
+        with open(self.path, "rb") as file:
+            data = file.read()
+        games = {}
+        intact = 0
+        self.replayed_records = 0
+        for record_type, game_id, fields, intact in decode_records(data):
+            self.replayed_records += 1
+            if record_type == START:
+                (started_at,) = _TIME.unpack_from(fields, 0)
+                bot_color, offset = _unpack_str(fields, _TIME.size)
+                player1, offset = _unpack_str(fields, offset)
+                player2, offset = _unpack_str(fields, offset)
+                games[game_id] = JournaledGame(bot_color, player1, player2, started_at, fields[offset])
+            elif record_type == SKIP and game_id in games:
+                games[game_id].skips += 1
+            elif record_type == END:
+                games.pop(game_id, None)
+        if intact < len(data):
+            # cut the tail off, or records appended after it would be unreadable
+            logging.warning("Game journal %s: dropped %d bytes of a torn or corrupt tail.", self.path,
+                            len(data) - intact)
+            with self._lock:
+                os.truncate(self.path, intact)
+        with self._lock:
+            self._live = {game_id: JournaledGame(game.bot_color, game.player1, game.player2, game.started_at,
+                                                 game.skips) for game_id, game in games.items()}
+        return games
+
+    def compact(self) -> None:
+        """Replace the journal with one start record per live game.
+
+        Records buffered but not yet written are already part of the live games, so the buffer is dropped.
+        """
+        temporary = f"{self.path}.tmp"
+        with self._lock:
+            data = b"".join(encode_start(game_id, game) for game_id, game in self._live.items())
+            with open(temporary, "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+            self._file.close()
+            self._file = open(self.path, "ab")
+            self._size = len(data)
+            self._buffer.clear()
+            self._durable = self._written
+            self._failure = None
+            self._flushed.notify_all()
+        logging.info("Game journal %s compacted to %d games.", self.path, len(self._live))
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
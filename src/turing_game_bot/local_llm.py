@@ -0,0 +1,114 @@
+"""
+In-process CPU inference backend (llama.cpp) for TuringBot.
+
+TuringBot talks to hosted providers through the OpenAI client. LocalChatClient
+offers the same `client.chat.completions.create(messages=..., model=...)` call
+and response shape (choices[0].message.content, usage) on a quantized GGUF
+model run in the process by llama-cpp-python, so the bot needs no network, API
+key or Ollama daemon - for experiments, and as a latency baseline on CPU
+servers.
+
+- The model is loaded on the first call, after gunicorn forks the workers, and
+  once per process: clients for the same file and settings share it, so every
+  game uses one copy of the weights.
+- llama.cpp runs one generation at a time per model; calls are serialized and
+  each uses `n_threads` CPU threads. Run the bot with one gunicorn worker per
+  model copy that fits in memory, and BOT_MAX_LLM_CALLS=1.
+- KV-cache reuse: llama.cpp keeps the evaluated tokens of the previous call
+  and only evaluates what follows the common prefix. A RAM cache of states
+  (`cache_bytes`) extends this across games: every game's prompt starts with
+  the shared system prompt, so a game's first call resumes from a cached state
+  instead of evaluating the system prompt again. warm_up() evaluates it ahead
+  of the first game.
+
+Roles llama.cpp chat templates do not know ("developer") are sent as "system".
+Arguments of the OpenAI call without a local meaning (timeout, ...) are ignored.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from turing_game_bot.metrics import METRICS
+
+_ROLES = {"developer": "system"}
+
+_models = {}  # (path, n_threads, n_ctx, cache_bytes) -> _LocalModel
+_models_lock = threading.Lock()
+
+
+def _namespace(value):
+    """A llama.cpp response dict as attributes, the way the OpenAI client returns it."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+class _LocalModel:
+
+    def __init__(self, model_path: str, n_threads: int, n_ctx: int, cache_bytes: int):
+        try:
+            from llama_cpp import Llama, LlamaRAMCache  # optional: only needed for the local backend
+        except ImportError:
+            raise RuntimeError("The local backend needs llama-cpp-python: pip install llama-cpp-python")
+        started = time.monotonic()
+        self.llama = Llama(model_path=model_path, n_threads=n_threads, n_threads_batch=n_threads, n_ctx=n_ctx,
+                           verbose=False)
+        if cache_bytes > 0:
+            self.llama.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes))
+        self.lock = threading.Lock()
+        load_seconds = time.monotonic() - started
+        METRICS.observe('bot_local_model_load_seconds', load_seconds)
+        logging.info("Loaded %s with %d threads in %.1fs", model_path, n_threads, load_seconds)
+
+
+def shared_model(model_path: str, n_threads: int = 0, n_ctx: int = 4096, cache_bytes: int = 1 << 30) -> _LocalModel:
+    """The process's model for these settings, loaded on the first call."""
+    n_threads = n_threads or os.cpu_count() or 1
+    key = (os.path.abspath(model_path), n_threads, n_ctx, cache_bytes)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = _LocalModel(model_path, n_threads, n_ctx, cache_bytes)
+        return model
+
+
+class _Completions:
+
+    def __init__(self, client: "LocalChatClient"):
+        self._client = client
+
+    def create(self, messages, model: str = None, max_tokens: int = None, stop=None, temperature: float = 0.7,
+               **ignored):
+        local = self._client.model()
+        messages = [{"role": _ROLES.get(message.get("role"), message.get("role")), "content": message.get("content")}
+                    for message in messages]
+        with local.lock, METRICS.in_flight('bot_local_generations_in_flight'):
+            response = local.llama.create_chat_completion(messages=messages, max_tokens=max_tokens, stop=stop,
+                                                          temperature=temperature)
+        return _namespace(response)
+
+
+class LocalChatClient:
+    """OpenAI-compatible chat client running a GGUF model with llama.cpp on the CPU."""
+
+    def __init__(self, model_path: str, n_threads: int = 0, n_ctx: int = 4096, cache_bytes: int = 1 << 30):
+        self.model_path = model_path
+        self.n_threads = n_threads  # 0: one per CPU
+        self.n_ctx = n_ctx
+        self.cache_bytes = cache_bytes  # RAM cache of KV states across games; 0 disables it
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def model(self) -> _LocalModel:
+        return shared_model(self.model_path, self.n_threads, self.n_ctx, self.cache_bytes)
+
+    def warm_up(self, messages) -> float:
+        """Load the model and evaluate `messages` (the shared prompt) into the cache. Returns the seconds taken."""
+        started = time.monotonic()
+        self.chat.completions.create(messages=messages, max_tokens=1)
+        return time.monotonic() - started
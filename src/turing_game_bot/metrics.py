@@ -0,0 +1,127 @@
+"""
+In-process metrics for the bot service.
+
+Counters, gauges and fixed-bucket histograms are kept in plain dicts behind one
+lock and rendered in the Prometheus text format by the /metrics endpoint.
+Each gunicorn worker has its own registry, so scrape every worker (or sum them).
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds. Covers a fast cache hit up to the 120s gunicorn timeout.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   7.5, 10.0, 15.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def add_gauge(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall-clock duration of the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels):
+        """Gauge of how many callers are currently inside the `with` block."""
+        self.add_gauge(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.add_gauge(name, -1, **labels)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count)
+                          for key, h in self._histograms.items()}
+
+        lines = []
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            seen = set()
+            for (name, labels), value in sorted(metrics.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} {kind}")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        seen = set()
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# One registry per process, shared by TuringBot and the Flask routes.
+METRICS = MetricsRegistry()
@@ -0,0 +1,119 @@
+"""
+Keeps the Ollama model of Llama_Bot loaded while games are played.
+
+Ollama loads a model on its first request and unloads it `keep_alive` after the
+last one (5 minutes by default), so the first reply after an idle period pays
+the model load. OllamaBackend
+  - preloads the model when the bot starts, evaluating the system prompt so
+    that Ollama's prompt cache starts with it; every game's messages begin
+    with the same system prompt and reuse that prefix,
+  - warms it again when a game starts and the model may have been unloaded,
+    before the players have written anything,
+  - pings it every `ping_interval` seconds while games are running, however
+    quiet their chats are,
+  - sends `keep_alive=idle_timeout` with every request, so Ollama unloads the
+    model `idle_timeout` seconds after the last game, and unloads it at once
+    on close().
+Requests also send the same `options` every time: a different num_ctx makes
+Ollama reload the model.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import threading
+import time
+
+import requests
+
+
+class OllamaBackend:
+
+    def __init__(self, endpoint: str = "http://localhost:11434/api/chat", model: str = "llama3.2",
+                 system_prompt: str = "", idle_timeout: float = 600.0, ping_interval: float = 60.0,
+                 options: dict = None, request_timeout: float = 120.0, clock=time.monotonic):
+        self.endpoint = endpoint
+        self.model = model
+        self.system_prompt = system_prompt
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.options = dict(options or {})
+        self.request_timeout = request_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._active_games = set()
+        self._last_request = None  # clock() of the last request, None before the first
+        self._stopped = threading.Event()
+        self._pinger = None
+
+    def _post(self, messages, **fields) -> dict:
+        payload = {"model": self.model, "messages": messages, "stream": False,
+                   "keep_alive": int(self.idle_timeout), **fields}
+        if self.options:
+            payload["options"] = {**self.options, **payload.get("options", {})}
+        response = requests.post(self.endpoint, json=payload, timeout=self.request_timeout)
+        response.raise_for_status()
+        with self._lock:
+            self._last_request = self.clock()
+        return response.json()
+
+    def chat(self, messages) -> str:
+        """The model's reply to `messages`."""
+        return self._post(messages)["message"]["content"]
+
+    def is_resident(self) -> bool:
+        """Whether the model is still loaded, as far as this process knows."""
+        with self._lock:
+            return self._last_request is not None and self.clock() - self._last_request < self.idle_timeout
+
+    def warm_up(self) -> float:
+        """Load the model and evaluate the system prompt. Returns the seconds taken."""
+        started = time.monotonic()
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        self._post(messages, options={"num_predict": 1})
+        seconds = time.monotonic() - started
+        logging.info("Ollama model %s warmed up in %.2fs", self.model, seconds)
+        return seconds
+
+    def _warm_up_quietly(self) -> None:
+        try:
+            self.warm_up()
+        except Exception as e:
+            logging.warning("Could not warm up the Ollama model %s: %s", self.model, e)
+
+    def start(self) -> None:
+        """Preload the model and start the keep-alive pings, both in the background."""
+        threading.Thread(target=self._warm_up_quietly, name="ollama-warm-up", daemon=True).start()
+        if self._pinger is None and self.ping_interval > 0:
+            self._pinger = threading.Thread(target=self._ping_loop, name="ollama-keep-alive", daemon=True)
+            self._pinger.start()
+
+    def game_started(self, game_id) -> None:
+        with self._lock:
+            self._active_games.add(game_id)
+        if not self.is_resident():
+            threading.Thread(target=self._warm_up_quietly, name="ollama-warm-up", daemon=True).start()
+
+    def game_ended(self, game_id) -> None:
+        with self._lock:
+            self._active_games.discard(game_id)
+
+    def _ping_loop(self) -> None:
+        while not self._stopped.wait(self.ping_interval):
+            with self._lock:
+                due = self._active_games and (self._last_request is None or
+                                              self.clock() - self._last_request >= self.ping_interval)
+            if due:
+                try:
+                    self._post([])  # loads the model, or keeps it loaded, without generating
+                except Exception as e:
+                    logging.warning("Ollama keep-alive ping failed: %s", e)
+
+    def close(self) -> None:
+        """Stop the pings and unload the model."""
+        self._stopped.set()
+        try:
+            self._post([], keep_alive=0)
+        except Exception as e:
+            logging.warning("Could not unload the Ollama model %s: %s", self.model, e)
+        with self._lock:
+            self._last_request = None
@@ -0,0 +1,79 @@
+"""
+Output-token budget of bot replies.
+
+Provider calls set no limit, so the model may write a paragraph that the
+pipeline and server.js then cut to 120 characters - every token past the cut
+is generation time and cost for nothing. The budget follows the players: it is
+the average length of the human messages of the game so far (as in
+data_analysis' calculate_message_stats), times `headroom`, within
+[min_length, max_length] characters, converted to `max_tokens`. The floor is
+one whole short sentence, so terse players do not get replies cut after a
+word or two; until a player has written, the budget is `max_length`.
+
+Stop sequences end generation after the first sentence or line, the way
+players write. They are not sent back by the provider, so a reply stopped at
+". " loses its period; chat messages rarely have one anyway. A reply stopped by
+max_tokens (finish_reason "length") ends mid-word; trim_cut() takes it back to
+its last complete clause or word before the pipeline.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import math
+
+# at most 4 stop sequences are accepted by the OpenAI API
+STOP_SEQUENCES = ("\n", ". ", "! ")
+# about four characters per token for English chat
+CHARS_PER_TOKEN = 4.0
+CLAUSE_ENDS = ".!?,;:"
+
+
+def human_message_length(chat_history) -> float:
+    """Average length of the human messages in the history, sender prefix excluded; 0.0 if there are none."""
+    total = count = 0
+    for message in chat_history:
+        if message.get("role") != "user":
+            continue
+        content = message.get("content") or ""
+        _, separator, text = content.partition(": ")
+        total += len(text if separator else content)
+        count += 1
+    return total / count if count else 0.0
+
+
+def trim_cut(text: str) -> str:
+    """A reply cut off by max_tokens, back to its last complete clause, or else its last complete word."""
+    text = text.rstrip()
+    words = text.rsplit(None, 1)
+    if len(words) < 2:
+        return text  # a single word: nothing complete to go back to
+    clause = max(text.rfind(mark) for mark in CLAUSE_ENDS)
+    if clause >= len(text) // 2:
+        return text[:clause + 1].rstrip(",;:")
+    return words[0].rstrip(",;: ")
+
+
+class OutputBudget:
+
+    def __init__(self, max_length: int = 120, min_length: int = 48, headroom: float = 1.5,
+                 stop=STOP_SEQUENCES):
+        self.max_length = max_length
+        self.min_length = min_length  # one short sentence
+        self.headroom = headroom
+        self.stop = list(stop)
+
+    def reply_length(self, chat_history) -> int:
+        """Characters the reply should have at most."""
+        length = human_message_length(chat_history)
+        if not length:
+            return self.max_length
+        return int(min(self.max_length, max(self.min_length, self.headroom * length)))
+
+    def max_tokens(self, chat_history) -> int:
+        return math.ceil(self.reply_length(chat_history) / CHARS_PER_TOKEN)
+
+    def limits(self, chat_history) -> dict:
+        """Arguments of a chat completion call: max_tokens and stop."""
+        limits = {"max_tokens": self.max_tokens(chat_history)}
+        if self.stop:
+            limits["stop"] = self.stop
+        return limits
@@ -0,0 +1,101 @@
+"""
+Declarative post-processing of LLM replies.
+
+A Pipeline is an ordered list of stages, each a callable from str to str. Every
+bot class cleans its replies with one. It is built once - per game for the
+TuringBot, whose stages depend on the bot's color - so everything that does not
+depend on the reply (sorted word lists, lowered words, regular expressions) is
+prepared when the stages are created. Any other callable (e.g.
+TuringBot.introduce_typo) can be a stage.
+
+    clean = Pipeline(Replace("\\n", " "), Remove("Blue:", "Blue"), Remove(*blocked_words, ignore_case=True),
+                     CollapseSpaces(), bot.introduce_typo, Truncate(120))
+    reply = clean(answer)
+
+Literal removals use str.replace and substring tests rather than one fused
+regular expression: on chat-sized strings an alternation in `re` is several
+times slower than these C-level scans (see benchmarks/bench_postprocess.py).
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import re
+
+
+class Remove:
+    """Delete every occurrence of the given strings, one after the other in the order given.
+
+    With ignore_case the words are removed in a single pass, the longest first where several match.
+    """
+
+    def __init__(self, *words: str, ignore_case: bool = False):
+        self.words = tuple(word for word in words if word)
+        self.ignore_case = ignore_case
+        self._lowered = tuple(word.lower() for word in self.words)
+        self._pattern = None
+        if ignore_case and self.words:
+            longest_first = sorted(self.words, key=len, reverse=True)
+            self._pattern = re.compile("|".join(re.escape(word) for word in longest_first), re.IGNORECASE)
+
+    def __call__(self, text: str) -> str:
+        if self.ignore_case:
+            # most replies contain none of the words: test on the lowered text, substitute only on a hit
+            lowered = text.lower()
+            for word in self._lowered:
+                if word in lowered:
+                    return self._pattern.sub("", text)
+            return text
+        for word in self.words:
+            text = text.replace(word, "")
+        return text
+
+
+class Replace:
+    """Replace every occurrence of `old` with `new`."""
+
+    def __init__(self, old: str, new: str):
+        self.old = old
+        self.new = new
+
+    def __call__(self, text: str) -> str:
+        return text.replace(self.old, self.new)
+
+
+class StripPrefix:
+    """Drop one leading prefix (e.g. "A:") and the whitespace after it."""
+
+    def __init__(self, *prefixes: str):
+        self.prefixes = prefixes
+
+    def __call__(self, text: str) -> str:
+        for prefix in self.prefixes:
+            if text.startswith(prefix):
+                return text[len(prefix):].lstrip()
+        return text
+
+
+class CollapseSpaces:
+    """Trim the text and turn every run of whitespace into one space, e.g. where a word was removed."""
+
+    def __call__(self, text: str) -> str:
+        return " ".join(text.split())
+
+
+class Truncate:
+    """Keep at most `length` characters, as the game server shows them."""
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def __call__(self, text: str) -> str:
+        return text[:self.length]
+
+
+class Pipeline:
+
+    def __init__(self, *stages):
+        self.stages = stages
+
+    def __call__(self, text: str) -> str:
+        for stage in self.stages:
+            text = stage(text)
+        return text
@@ -0,0 +1,143 @@
+"""
+Streaming near-duplicate detection of bot replies.
+
+A bot that says the same thing twice - in one game or across games - is easy
+to spot. Every reply is reduced to a MinHash signature over the character
+4-grams of its normalized text, and stored in an LSH table: the signature is
+cut into bands, and replies sharing a band are candidates whose estimated
+Jaccard similarity (the share of equal signature values) is then checked
+against the threshold. Lookups cost one hash per shingle plus a few dict
+reads, whatever the number of stored replies.
+
+Memory is bounded: the detector keeps the signatures of the last `capacity`
+replies in one flat array used as a ring, and a reply leaving the ring is
+removed from its buckets. A bucket holding a single reply stores its slot
+number instead of a list.
+
+The 32 hash values of a shingle are the 16-bit words of one 64-byte blake2b
+digest, so a signature costs one digest per shingle.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import hashlib
+import re
+import threading
+from array import array
+
+NUM_HASHES = 32  # 64-byte blake2b digest = 32 x 16-bit values
+_NON_WORD = re.compile(r"[^\w ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def shingles(text: str, size: int = 4) -> set:
+    text = _SPACES.sub(" ", _NON_WORD.sub("", text.lower())).strip()
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def signature(text: str, size: int = 4):
+    """MinHash signature of the text's shingles as an array of NUM_HASHES values, None for an empty text."""
+    digests = [array("H", hashlib.blake2b(shingle.encode(), digest_size=64).digest()) for shingle in shingles(text, size)]
+    return array("H", map(min, zip(*digests))) if digests else None
+
+
+def similarity(a, b) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+class RepetitionDetector:
+
+    def __init__(self, capacity: int = 100000, bands: int = 8, threshold: float = 0.6, min_length: int = 20,
+                 max_candidates: int = 64):
+        if NUM_HASHES % bands:
+            raise ValueError(f"bands must divide {NUM_HASHES}")
+        self.capacity = capacity
+        self.bands = bands
+        self.rows = NUM_HASHES // bands
+        self.threshold = threshold
+        # short replies ("lol", "haha same") repeat among humans too
+        self.min_length = min_length
+        # bounds a lookup when common phrasing crowds the buckets; the newest replies are compared first
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(bands)]  # per band: band bytes -> slot, or [slot] if shared
+        self._ring = array("H", bytes(2 * NUM_HASHES * capacity))  # signatures, NUM_HASHES values per slot
+        self._next = 0
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    def _band_keys(self, sig) -> list:
+        return [sig[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _store(self, sig) -> None:
+        slot = self._next % self.capacity
+        if self._next >= self.capacity:
+            for buckets, key in zip(self._buckets, self._band_keys(self._stored(slot))):
+                slots = buckets[key]
+                if type(slots) is int or len(slots) == 1:
+                    del buckets[key]
+                else:
+                    slots.remove(slot)
+        self._ring[slot * NUM_HASHES:(slot + 1) * NUM_HASHES] = sig
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            slots = buckets.get(key)
+            if slots is None:
+                buckets[key] = slot
+            elif type(slots) is int:
+                buckets[key] = [slots, slot]
+            else:
+                slots.append(slot)
+        self._next += 1
+
+    def _stored(self, slot: int):
+        return self._ring[slot * NUM_HASHES:(slot + 1) * NUM_HASHES]
+
+    def _best_match(self, sig) -> float:
+        best = 0.0
+        checked = set()
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            slots = buckets.get(key, ())
+            for slot in (slots,) if type(slots) is int else reversed(slots):
+                if slot not in checked:
+                    checked.add(slot)
+                    best = max(best, similarity(sig, self._stored(slot)))
+                    if best >= self.threshold:
+                        return best  # a repetition either way; no need to scan a crowded bucket
+                    if len(checked) >= self.max_candidates:
+                        return best
+        return best
+
+    def _signature(self, text: str):
+        return signature(text) if len(text) >= self.min_length else None
+
+    def check(self, text: str) -> float:
+        """Estimated similarity of `text` to the closest stored reply, or to the first one over the threshold.
+
+        0.0 if no stored reply shares a band with it.
+        """
+        sig = self._signature(text)
+        if sig is None:
+            return 0.0
+        with self._lock:
+            return self._best_match(sig)
+
+    def observe(self, text: str) -> bool:
+        """True if `text` repeats a stored reply; otherwise store it and return False."""
+        sig = self._signature(text)
+        if sig is None:
+            return False
+        with self._lock:
+            if self._best_match(sig) >= self.threshold:
+                return True
+            self._store(sig)
+        return False
+
+    def add(self, text: str) -> None:
+        """Remember a reply the bot sent."""
+        sig = self._signature(text)
+        if sig is not None:
+            with self._lock:
+                self._store(sig)
@@ -0,0 +1,114 @@
+"""
+Cache of provider replies for recurring conversation states.
+
+Games open the same way again and again ("hi", "are you the bot", "where are
+you from"), and each of these costs a completion with the full system prompt.
+Replies are cached under a normalized form of the last few turns: sender
+prefixes dropped, color names replaced by a placeholder, lower case, no
+punctuation, letters repeated for emphasis collapsed, and the words of each
+turn sorted, so "Are you the BOT??" and "you are the bot" share an entry.
+
+An entry keeps up to `max_variants` replies. A game gets one of the variants it
+has not had yet, drawn at random, so games do not all open with the same words;
+once it has seen every variant the provider is asked again and the new reply is
+added. Replies naming a color are not cached, as they would name
+the players of another game. Entries expire after `ttl` seconds, and at most
+`max_entries` are kept, the least recently used evicted first.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from turing_game_bot.metrics import METRICS
+
+COLORS = ('Orange', 'Purple', 'Blue', 'Red', 'Green', 'Black')
+
+_COLOR_PATTERN = re.compile(r"\b(%s)\b" % "|".join(COLORS), re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w<>]+")
+_REPEATS = re.compile(r"(\w)\1{2,}")
+
+
+def normalize_turn(message: dict) -> str:
+    content = message.get("content") or ""
+    prefix, separator, text = content.partition(": ")
+    if separator and _COLOR_PATTERN.fullmatch(prefix):
+        content = text
+    content = _COLOR_PATTERN.sub(" <color> ", content.lower())
+    words = _NON_WORD.sub(" ", _REPEATS.sub(r"\1", content)).split()
+    return f"{message.get('role', 'user')}:{' '.join(sorted(set(words)))}"
+
+
+def cache_key(chat_history, turns: int = 2) -> str:
+    """Normalized form of the last `turns` messages."""
+    return "|".join(normalize_turn(message) for message in chat_history[-turns:])
+
+
+class _Entry:
+    __slots__ = ("variants", "expires")
+
+    def __init__(self, expires: float):
+        self.variants = []
+        self.expires = expires
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 3600.0, max_variants: int = 4, turns: int = 2,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_variants = max_variants
+        self.turns = turns
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> _Entry, least recently used first
+        self._used = {}  # game_id -> {(key, variant index)} already served to the game
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, game_id, chat_history, rng=random):
+        """A cached reply this game has not had yet, drawn with `rng`, or None."""
+        if not chat_history:
+            return None
+        key = cache_key(chat_history, self.turns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                del self._entries[key]
+                entry = None
+            answer = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                used = self._used.setdefault(game_id, set())
+                unused = [index for index in range(len(entry.variants)) if (key, index) not in used]
+                if unused:
+                    index = rng.choice(unused)
+                    used.add((key, index))
+                    answer = entry.variants[index]
+        METRICS.inc('bot_response_cache_total', result='hit' if answer is not None else 'miss')
+        return answer
+
+    def put(self, game_id, chat_history, answer: str) -> None:
+        """Add the provider's reply to the entry of this history."""
+        if not chat_history or not answer or _COLOR_PATTERN.search(answer):
+            return
+        key = cache_key(chat_history, self.turns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= self.clock():
+                entry = self._entries[key] = _Entry(self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            if len(entry.variants) < self.max_variants and answer not in entry.variants:
+                entry.variants.append(answer)
+                self._used.setdefault(game_id, set()).add((key, len(entry.variants) - 1))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def end_game(self, game_id) -> None:
+        with self._lock:
+            self._used.pop(game_id, None)
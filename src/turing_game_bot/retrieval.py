@@ -0,0 +1,212 @@
+"""
+Memory-mapped TF-IDF index of human chat messages.
+
+The bot's style otherwise comes only from the prompt files. This index holds
+the messages human players wrote in past games (the `messages` table of
+turing.db), built offline into one file. TuringBot queries it with the latest
+human message and puts a few similar human-written messages into the prompt
+as examples of tone and length.
+
+The file is memory-mapped and read in place: postings, weights and message
+texts are never loaded as Python objects, only the vocabulary is. Each term's
+postings are sorted by weight and cut to `max_postings`, and a query reads at
+most `budget` postings, so its cost is bounded whatever the corpus size.
+
+File layout (native byte order, sections padded to 4 bytes):
+  header   magic, version, documents, terms, offsets of the sections below
+  vocab    terms, newline separated (UTF-8)
+  terms    per term: postings start (u32), postings count (u32), idf (f32)
+  postings document ids (u32), then their weights (f32), per term
+  docs     text offset per document (u32), plus the end offset
+  texts    message texts (UTF-8)
+
+usage:
+  python -m turing_game_bot.retrieval build --db ./turing_chat_server/database/turing.db --out phrases.idx
+  python -m turing_game_bot.retrieval query --index phrases.idx "where are you from"
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import heapq
+import math
+import mmap
+import re
+import struct
+from array import array
+from collections import Counter, defaultdict
+
+MAGIC = b"TGPHRASE"
+VERSION = 1
+_HEADER = struct.Struct("=8sIIIQQQQQ")
+_TERM = struct.Struct("=IIf")
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+
+def human_messages(db_path: str, min_length: int = 2, max_length: int = 120) -> list:
+    """Distinct messages players wrote in turing.db, in the order first written; the bot's are left out."""
+    import sqlite3  # only the offline build reads the database
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT m.message_content FROM messages m JOIN games g ON g.game_id = m.game_id "
+            "WHERE m.player_username != g.bot_color ORDER BY m.game_id, m.message_id")
+        seen = {}
+        for (content,) in rows:
+            content = (content or "").strip()
+            if min_length <= len(content) <= max_length:
+                seen.setdefault(content, None)
+        return list(seen)
+    finally:
+        conn.close()
+
+
+def _pad(buffer: bytearray) -> int:
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+    return len(buffer)
+
+
+def build_index(messages, path: str, max_postings: int = 256) -> dict:
+    """Write the index of `messages` to `path`. Returns its document and term counts and size."""
+    messages = list(messages)
+    term_frequencies = [Counter(tokenize(message)) for message in messages]
+    document_frequency = Counter(term for frequencies in term_frequencies for term in frequencies)
+    terms = sorted(document_frequency)
+    term_ids = {term: index for index, term in enumerate(terms)}
+    idf = [math.log((1 + len(messages)) / (1 + document_frequency[term])) + 1.0 for term in terms]
+
+    postings = defaultdict(list)  # term id -> [(weight, document id)]
+    for document, frequencies in enumerate(term_frequencies):
+        weights = {term_ids[term]: (1.0 + math.log(count)) * idf[term_ids[term]]
+                   for term, count in frequencies.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for term, weight in weights.items():
+            postings[term].append((weight / norm, document))
+
+    buffer = bytearray(_HEADER.size)
+    vocab_offset = len(buffer)
+    buffer.extend("\n".join(terms).encode())
+    terms_offset = _pad(buffer)
+    document_ids, weights = array("I"), array("f")
+    for term in range(len(terms)):
+        entries = heapq.nlargest(max_postings, postings[term])
+        buffer.extend(_TERM.pack(len(document_ids), len(entries), idf[term]))
+        document_ids.extend(document for _, document in entries)
+        weights.extend(weight for weight, _ in entries)
+    postings_offset = _pad(buffer)
+    buffer.extend(document_ids.tobytes())
+    buffer.extend(weights.tobytes())
+    docs_offset = _pad(buffer)
+    texts = [message.encode() for message in messages]
+    offsets = array("I", [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    buffer.extend(offsets.tobytes())
+    texts_offset = len(buffer)
+    buffer.extend(b"".join(texts))
+    _HEADER.pack_into(buffer, 0, MAGIC, VERSION, len(messages), len(terms), vocab_offset, terms_offset,
+                      postings_offset, docs_offset, texts_offset)
+    with open(path, "wb") as file:
+        file.write(buffer)
+    return {"documents": len(messages), "terms": len(terms), "bytes": len(buffer)}
+
+
+class PhraseIndex:
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.documents, terms, vocab_offset, terms_offset, postings_offset, docs_offset,
+         texts_offset) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a phrase index of version {VERSION}")
+        view = memoryview(self._mmap)
+        vocab = bytes(view[vocab_offset:terms_offset]).rstrip(b"\0").decode()
+        self._term_ids = {term: index for index, term in enumerate(vocab.split("\n"))} if terms else {}
+        self._table = view[terms_offset:terms_offset + 12 * terms].cast("I")
+        self._idf = view[terms_offset:terms_offset + 12 * terms].cast("f")
+        total = (docs_offset - postings_offset) // 8
+        self._document_ids = view[postings_offset:postings_offset + 4 * total].cast("I")
+        self._weights = view[postings_offset + 4 * total:postings_offset + 8 * total].cast("f")
+        self._offsets = view[docs_offset:docs_offset + 4 * (self.documents + 1)].cast("I")
+        self._texts_offset = texts_offset
+        self.size = len(self._mmap)
+
+    def __len__(self) -> int:
+        return self.documents
+
+    def text(self, document: int) -> str:
+        start = self._texts_offset + self._offsets[document]
+        end = self._texts_offset + self._offsets[document + 1]
+        return self._mmap[start:end].decode()
+
+    def search(self, query: str, k: int = 3, budget: int = 1024) -> list:
+        """The k most similar messages as (score, document) pairs, best first.
+
+        At most `budget` postings are read: the rarest query terms first, and of
+        each term its highest-weighted messages.
+        """
+        terms = []
+        for term, count in Counter(tokenize(query)).items():
+            index = self._term_ids.get(term)
+            if index is not None:
+                terms.append(((1.0 + math.log(count)) * self._idf[3 * index + 2], index))
+        scores = defaultdict(float)
+        for weight, index in sorted(terms, reverse=True):
+            start = self._table[3 * index]
+            end = start + min(self._table[3 * index + 1], budget)
+            budget -= end - start
+            for document, document_weight in zip(self._document_ids[start:end].tolist(),
+                                                 self._weights[start:end].tolist()):
+                scores[document] += weight * document_weight
+            if budget <= 0:
+                break
+        return heapq.nlargest(k, ((score, document) for document, score in scores.items()))
+
+    def query(self, query: str, k: int = 3, exclude: str = None) -> list:
+        """Texts of the k most similar messages, without an exact copy of the query."""
+        exclude = (exclude or query).strip().lower()
+        texts = [self.text(document) for _, document in self.search(query, k + 1)]
+        return [text for text in texts if text.lower() != exclude][:k]
+
+    def close(self) -> None:
+        self._table.release()
+        self._idf.release()
+        self._document_ids.release()
+        self._weights.release()
+        self._offsets.release()
+        self._mmap.close()
+
+
+def main(argv=None) -> int:
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query the phrase index of human messages")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build")
+    build.add_argument("--db", required=True)
+    build.add_argument("--out", required=True)
+    build.add_argument("--max-postings", type=int, default=256)
+    query = commands.add_parser("query")
+    query.add_argument("--index", required=True)
+    query.add_argument("-k", type=int, default=3)
+    query.add_argument("text")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        stats = build_index(human_messages(args.db), args.out, args.max_postings)
+        print(f"{stats['documents']} messages, {stats['terms']} terms, {stats['bytes'] / 1e6:.1f} MB "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        index = PhraseIndex(args.index)
+        for text in index.query(args.text, args.k):
+            print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
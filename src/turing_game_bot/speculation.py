@@ -0,0 +1,136 @@
+"""
+Speculative reply generation for the bot service.
+
+A reply normally costs the provider latency plus the typing delay, counted from
+the /response poll. When a player starts typing, the bot can already generate a
+candidate reply against the chat history as it is. The next /response of the
+game takes the candidate if the messages added in the meantime do not change
+the context materially - at most `max_new_messages` human messages, none of
+them addressed to the bot, and no bot message - and otherwise discards it and
+generates as usual. A game holds at most one candidate; a newer signal
+replaces it.
+
+/response waits for a candidate only if its generation has already started,
+and for at most `max_wait` seconds; one still queued behind other candidates is
+cancelled and the reply generated as usual.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from turing_game_bot.admission import asks_about_bot, mentions_color
+from turing_game_bot.metrics import METRICS
+
+
+def changes_context(speculated, chat_history, bot_color: str, max_new_messages: int = 1) -> bool:
+    """True if the messages added to `speculated` in `chat_history` could change the reply."""
+    known = len(speculated)
+    if len(chat_history) < known or chat_history[:known] != speculated:
+        return True  # not a continuation of the speculated history
+    added = chat_history[known:]
+    if len(added) > max_new_messages:
+        return True
+    for message in added:
+        if message.get("role") != "user":
+            return True  # the bot spoke meanwhile; the candidate answers a turn that is over
+        content = message.get("content", "")
+        _, _, text = content.partition(": ")
+        text = text or content
+        if mentions_color(text, bot_color) or asks_about_bot(text):
+            return True
+    return False
+
+
+class _Speculation:
+    __slots__ = ("history", "started", "running", "cancelled", "done", "answer")
+
+    def __init__(self, history: list, started: float):
+        self.history = history
+        self.started = started
+        self.running = False  # a worker is generating it
+        self.cancelled = False  # used up or replaced before a worker picked it up
+        self.done = threading.Event()
+        self.answer = ""
+
+
+class Speculator:
+
+    def __init__(self, complete, max_workers: int = 4, max_new_messages: int = 1, max_age: float = 30.0,
+                 max_wait: float = 2.0, clock=time.monotonic):
+        # complete(game_id, chat_history) -> the raw provider reply, "" if there is none
+        self.complete = complete
+        self.max_new_messages = max_new_messages
+        self.max_age = max_age  # older candidates are discarded whatever the history
+        self.max_wait = max_wait  # longest /response waits for a running candidate
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-speculate")
+        self._lock = threading.Lock()
+        self._games = {}  # game_id -> _Speculation
+
+    def speculate(self, game_id, chat_history) -> bool:
+        """Start generating a candidate for this history. False if one for the same history exists."""
+        speculation = _Speculation(list(chat_history), self.clock())
+        with self._lock:
+            previous = self._games.get(game_id)
+            if previous is not None and previous.history == speculation.history:
+                return False
+            self._games[game_id] = speculation
+            if previous is not None:
+                previous.cancelled = True
+        if previous is not None:
+            METRICS.inc('bot_speculations_total', outcome='replaced')
+        METRICS.inc('bot_speculations_total', outcome='started')
+        self._executor.submit(self._run, game_id, speculation)
+        return True
+
+    def _run(self, game_id, speculation: _Speculation) -> None:
+        with self._lock:
+            if speculation.cancelled:
+                speculation.done.set()
+                return
+            speculation.running = True
+        try:
+            speculation.answer = self.complete(game_id, speculation.history) or ""
+        except Exception as e:
+            logging.warning("Speculative reply failed: %s", e, extra={"game_id": game_id})
+        finally:
+            speculation.done.set()
+
+    def take(self, game_id, chat_history, bot_color: str):
+        """The game's candidate reply if it still fits `chat_history`, else None.
+
+        Waits up to `max_wait` for a candidate that is being generated; one not
+        started yet is not waited for. Either way the candidate is used up.
+        """
+        with self._lock:
+            speculation = self._games.pop(game_id, None)
+            if speculation is not None:
+                running = speculation.running
+                speculation.cancelled = True  # a queued candidate is skipped by its worker
+        if speculation is None:
+            return None
+        if self.clock() - speculation.started > self.max_age:
+            outcome = 'expired'
+        elif changes_context(speculation.history, chat_history, bot_color, self.max_new_messages):
+            outcome = 'discarded'
+        elif not running and not speculation.done.is_set():
+            outcome = 'not_started'
+        else:
+            with METRICS.timer('bot_phase_seconds', phase='speculation_wait'):
+                finished = speculation.done.wait(self.max_wait)
+            if not finished:
+                outcome = 'timed_out'
+            else:
+                outcome = 'committed' if speculation.answer else 'failed'
+        METRICS.inc('bot_speculations_total', outcome=outcome)
+        logging.info("Speculative reply %s.", outcome, extra={"game_id": game_id})
+        return speculation.answer if outcome == 'committed' else None
+
+    def end_game(self, game_id) -> None:
+        with self._lock:
+            speculation = self._games.pop(game_id, None)
+            if speculation is not None:
+                speculation.cancelled = True
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A hashed timer wheel for inactivity deadlines of many concurrent games.
+
+Arming, re-arming and cancelling a timer are O(1) dict operations; one asyncio
+task advances the wheel every `tick` seconds and calls `on_expire(key)` for the
+timers that ran out. An armed timer costs one dict entry in its slot plus one
+in the key index. A coroutine returned by `on_expire` runs as its own task, so
+a slow callback does not hold up the wheel; its exceptions are logged.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import asyncio
+import inspect
+import logging
+import math
+import time
+
+
+class TimerWheel:
+
+    def __init__(self, on_expire, tick: float = 1.0, num_slots: int = 512, clock=time.monotonic):
+        self.on_expire = on_expire
+        self.tick = tick
+        self.clock = clock
+        self._slots = [{} for _ in range(num_slots)]  # key -> remaining full rotations
+        self._slot_of = {}  # key -> slot index
+        self._cursor = 0
+        self._task = None
+        self._callbacks = set()  # running on_expire tasks; the loop itself only keeps weak references
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key) -> bool:
+        return key in self._slot_of
+
+    def arm(self, key, delay: float) -> None:
+        """(Re)start the timer of `key` so that it expires after `delay` seconds."""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        num_slots = len(self._slots)
+        slot = (self._cursor + ticks) % num_slots
+        self._slots[slot][key] = (ticks - 1) // num_slots
+        self._slot_of[key] = slot
+
+    def cancel(self, key) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self) -> list:
+        """Move the wheel by one tick and return the keys that expired."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        expired = []
+        for key, rotations in bucket.items():
+            if rotations:
+                bucket[key] = rotations - 1
+            else:
+                expired.append(key)
+        for key in expired:
+            del bucket[key]
+            del self._slot_of[key]
+        return expired
+
+    def start(self) -> None:
+        """Run the wheel on the current event loop; a no-op if it already runs."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        next_tick = self.clock() + self.tick
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - self.clock()))
+            next_tick += self.tick
+            for key in self.advance():
+                try:
+                    result = self.on_expire(key)
+                    if inspect.isawaitable(result):
+                        callback = asyncio.ensure_future(result)
+                        self._callbacks.add(callback)
+                        callback.add_done_callback(self._callback_done(key))
+                except Exception:
+                    logging.exception("Timer callback for %s failed", key)
+
+    def _callback_done(self, key):
+        def done(callback: asyncio.Future) -> None:
+            self._callbacks.discard(callback)
+            if not callback.cancelled() and callback.exception() is not None:
+                logging.error("Timer callback for %s failed", key, exc_info=callback.exception())
+        return done
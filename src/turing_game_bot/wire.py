@@ -0,0 +1,68 @@
+"""
+Request payloads of the bot service: JSON, or msgpack for a smaller, cheaper wire format.
+
+The game server may send `/response`, `/start-game` and `/end-game` bodies as
+`application/msgpack` with the same structure as the JSON bodies. msgpack is
+decoded by its C extension straight into the dicts and lists that are passed
+on to the provider, without an intermediate text representation. A
+`chat_history` must be a list of {"role": str, "content": str} maps.
+"""
+__author__ = "Ebrar Kiziloglu"
+
+import json
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+MSGPACK_CONTENT_TYPES = (MSGPACK_CONTENT_TYPE, "application/x-msgpack")
+
+ROLES = frozenset(("user", "assistant", "system", "developer"))
+
+
+class PayloadError(ValueError):
+    """A body that cannot be decoded; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_msgpack(content_type: str) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+def decode_payload(content_type: str, body: bytes) -> dict:
+    if is_msgpack(content_type):
+        try:
+            import msgpack  # optional: only needed when a client sends msgpack
+        except ImportError:
+            raise PayloadError("msgpack payloads are not supported: the msgpack package is not installed", 415)
+        try:
+            payload = msgpack.unpackb(body, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise PayloadError(f"Invalid msgpack body: {e}")
+    else:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            raise PayloadError(f"Invalid JSON body: {e}")
+    if not isinstance(payload, dict):
+        raise PayloadError("The body must be a map.")
+    if "chat_history" in payload:
+        validate_chat_history(payload["chat_history"])
+    return payload
+
+
+def validate_chat_history(chat_history) -> None:
+    if not isinstance(chat_history, list):
+        raise PayloadError("chat_history must be a list.")
+    for message in chat_history:
+        if not isinstance(message, dict) or message.get("role") not in ROLES \
+                or not isinstance(message.get("content"), str):
+            raise PayloadError(f"Invalid chat_history message: {message!r}")
+
+
+def encode_payload(payload: dict, content_type: str = JSON_CONTENT_TYPE) -> bytes:
+    if is_msgpack(content_type):
+        import msgpack
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload).encode()